@@ -1,5 +1,7 @@
+from functools import lru_cache
 from fastapi import Request, HTTPException
-from app.storage.do_spaces import DOSpacesHandler
+from app.core.config import settings
+from app.core.job_queue import JobQueue
 
 from fastapi import Security, HTTPException, status
 from fastapi.security.api_key import APIKeyHeader
@@ -27,8 +29,20 @@ def get_index(request: Request):
         raise HTTPException(status_code=500, detail="Vector Index not initialized")
     return index
 
+@lru_cache(maxsize=1)
 def get_storage_handler():
     """
-    Returns an instance of the DigitalOcean Spaces handler.
+    Returns the DigitalOcean Spaces handler, one per process so its client
+    connections and registry cache are reused across requests.
+    boto3 is imported here, on the first storage request, not at startup.
     """
-    return DOSpacesHandler()
\ No newline at end of file
+    from app.storage.do_spaces import DOSpacesHandler
+
+    return DOSpacesHandler()
+
+@lru_cache(maxsize=1)
+def get_job_queue() -> JobQueue:
+    """
+    The ingestion job queue shared with the worker process (opened on first use).
+    """
+    return JobQueue(settings.JOB_DB_PATH, lease_seconds=settings.JOB_LEASE_SECONDS)
@@ -1,66 +1,112 @@
-# To call it from your API (app/api/ingestion_endpoints.py):
+# To call it from your API (app/api/routes/ingestion_endpoints.py):
 
+import asyncio
 import os
 import shutil
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Depends
-from app.api.dependencies import verify_api_key
-
-# Import the logic from your ingestion folder
-from ingestion.ato_ruling import ingest_ato_ruling
-from ingestion.trust_deed import process_trust_deed_upload
+import uuid
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
+from app.api.dependencies import get_job_queue, verify_api_key
+from app.core.config import settings
+from app.core.generations import GLOBAL_FUND_ID
+from app.core.job_queue import CANCELLED, JobQueue
 
 # Initialize the router
 router = APIRouter(prefix="/ingest", tags=["Ingestion"])
 
-@router.post("/ruling")
+async def enqueue_upload(queue: JobQueue, kind: str, file: UploadFile, payload: dict) -> dict:
+    """
+    Saves the upload where the worker can read it and queues the job.
+    Parsing and embedding run in the worker process, never in the API.
+    """
+    job_id = uuid.uuid4().hex
+    os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(settings.JOB_UPLOAD_DIR, f"{job_id}_{os.path.basename(file.filename)}")
+
+    def save():
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+    await asyncio.to_thread(save)
+    try:
+        job = await asyncio.to_thread(
+            queue.enqueue, kind, {**payload, "file_path": file_path},
+            settings.JOB_MAX_ATTEMPTS, job_id
+        )
+    except Exception:
+        os.remove(file_path)
+        raise
+    return {
+        "status": "Accepted",
+        "job_id": job["job_id"],
+        "status_url": f"/api/ingest/jobs/{job['job_id']}",
+    }
+
+@router.post("/ruling", status_code=status.HTTP_202_ACCEPTED)
 async def api_ingest_ruling(
     ruling_id: str, 
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    queue: JobQueue = Depends(get_job_queue),
     key: str = Depends(verify_api_key)
 ):
     """
     Endpoint for ATO Rulings. 
-    Saves a local temp copy and triggers the ingestion logic.
+    Saves the upload and queues a ruling job for the ingestion worker.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    # Create a local path for processing
-    temp_dir = "./data/temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"ruling_{file.filename}")
-    
-    # Save the uploaded file locally
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Trigger logic from the ingestion folder in the background
-    background_tasks.add_task(ingest_ato_ruling, temp_path, ruling_id)
-    
-    return {
-        "status": "Accepted", 
-        "ruling_id": ruling_id, 
-        "message": "Ruling ingestion started in background."
-    }
+    accepted = await enqueue_upload(queue, "ruling", file, {"ruling_id": ruling_id, "fund_id": GLOBAL_FUND_ID})
+    return {**accepted, "ruling_id": ruling_id, "message": "Ruling ingestion queued."}
 
-@router.post("/trust-deed/{fund_id}")
+@router.post("/trust-deed/{fund_id}", status_code=status.HTTP_202_ACCEPTED)
 async def api_ingest_trust_deed(
     fund_id: str, 
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    queue: JobQueue = Depends(get_job_queue),
     key: str = Depends(verify_api_key)
 ):
     """
     Endpoint for Trust Deeds.
     """
-    temp_dir = "./data/temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"deed_{fund_id}_{file.filename}")
+    accepted = await enqueue_upload(queue, "trust_deed", file, {"fund_id": fund_id})
+    return {**accepted, "fund_id": fund_id}
 
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+@router.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    limit: int = 50,
+    queue: JobQueue = Depends(get_job_queue),
+    key: str = Depends(verify_api_key)
+):
+    """Most recent jobs first, optionally filtered by status (queued, running, succeeded, failed, cancelled)."""
+    jobs = await asyncio.to_thread(queue.list, status, min(limit, 500))
+    return {"jobs": jobs, "counts": await asyncio.to_thread(queue.counts)}
 
-    background_tasks.add_task(process_trust_deed_upload, temp_path, fund_id)
-    
-    return {"status": "Accepted", "fund_id": fund_id}
\ No newline at end of file
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue),
+    key: str = Depends(verify_api_key)
+):
+    """Status, progress (0-1 plus a message), attempts and the last error of one job."""
+    job = await asyncio.to_thread(queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue),
+    key: str = Depends(verify_api_key)
+):
+    """Queued jobs are cancelled at once; running ones stop at the worker's next heartbeat."""
+    job = await asyncio.to_thread(queue.cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    # A running job's upload is removed by the worker once it stops
+    file_path = job["payload"].get("file_path")
+    if job["status"] == CANCELLED and file_path and os.path.exists(file_path):
+        os.remove(file_path)
+    return job
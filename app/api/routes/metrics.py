@@ -0,0 +1,52 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.dependencies import get_storage_handler
+from app.core.config import get_embedding_cache, settings
+from app.core.metrics import metrics
+from app.engine.answer_cache import answer_cache
+from app.engine.auto_merging import parent_store
+from app.engine.engine_cache import query_engine_cache
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+
+def _cache_stats() -> dict:
+    """cache name -> (hits, misses), from the stats() the caches already keep."""
+    caches = {}
+    for name, stats in (("query_engine", query_engine_cache.stats()), ("answer", answer_cache.stats())):
+        caches[name] = (stats["hits"], stats["misses"])
+    if settings.HIERARCHY_MODE == "auto_merging":
+        stats = parent_store.stats()
+        caches["parent"] = (stats["hits"], stats["misses"])
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        caches["embedding"] = (stats["memory_hits"] + stats["disk_hits"], stats["misses"])
+    # Only report the Spaces caches once a request has created the handler
+    if get_storage_handler.cache_info().currsize:
+        stats = get_storage_handler().listings.stats()
+        caches["file_listing"] = (stats["hits"], stats["misses"])
+    return caches
+
+
+def _collect_caches():
+    caches = _cache_stats()
+    yield ("smsf_cache_hits_total", "Cache hits", "counter",
+           [({"cache": name}, hits) for name, (hits, _) in caches.items()])
+    yield ("smsf_cache_misses_total", "Cache misses", "counter",
+           [({"cache": name}, misses) for name, (_, misses) in caches.items()])
+    yield ("smsf_cache_hit_ratio", "Cache hits / lookups since start", "gauge",
+           [({"cache": name}, hits / (hits + misses) if hits + misses else 0.0)
+            for name, (hits, misses) in caches.items()])
+
+
+metrics.register_collector("caches", _collect_caches)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Per-stage histograms, LLM calls/tokens, node counts (app.core.instrumentation) and cache hit rates
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,6 +1,21 @@
+import asyncio
+import json
+from typing import List
 from fastapi import APIRouter, HTTPException, Request, Depends
-from pydantic import BaseModel
-from app.engine.query_engine import get_smsf_query_engine
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
+from llama_index.core import Settings
+from llama_index.core.schema import QueryBundle
+from llama_index.core.base.response.schema import (
+    AsyncStreamingResponse,
+    StreamingResponse as LlamaStreamingResponse,
+)
+from app.core.config import settings
+from app.core.instrumentation import count_llm_calls
+from app.engine.answer_cache import answer_cache
+from app.engine.engine_cache import query_engine_cache
+from app.engine.query_engine import describe_route
 from app.api.dependencies import verify_api_key
 
 
@@ -10,25 +25,60 @@ class QueryRequest(BaseModel):
     fund_id: str
     question: str
 
+class BatchQueryRequest(BaseModel):
+    fund_id: str
+    questions: List[str] = Field(..., min_length=1)
+
+def _get_vector_index(request: Request):
+    vector_index = getattr(request.app.state, "vector_index", None)
+    if vector_index is None:
+        raise HTTPException(status_code=500, detail="Index not initialized")
+    return vector_index
+
+async def answer_question(fund_id: str, question: str, vector_index, question_embedding=None) -> dict:
+    """
+    Shared by /ask, /query and /ask/batch. question_embedding may be passed in
+    when the caller already embedded it (e.g. in a batch).
+    """
+    # Embed once: used for the answer cache lookup and reused by retrieval
+    query_bundle = QueryBundle(query_str=question, embedding=question_embedding)
+    # The index generations the answer is built from (a re-ingest may land mid-query)
+    generation = answer_cache.generation(fund_id)
+    if settings.ANSWER_CACHE_ENABLED:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await Settings.embed_model.aget_query_embedding(question)
+        cached = answer_cache.lookup(fund_id, query_bundle.embedding)
+        if cached is not None:
+            return {**cached, "fund_id": fund_id}
+
+    engine = query_engine_cache.get(
+        fund_id=fund_id,
+        vector_index=vector_index
+    )
+
+    # aquery keeps the event loop free while retrieval (concurrent across
+    # sources in fan-out mode) and synthesis are in flight
+    with count_llm_calls() as llm_calls:
+        response = await engine.aquery(query_bundle)
+
+    result = {
+        "answer": str(response),
+        "fund_id": fund_id,
+        "sources": [n.node.get_content()[:200] for n in response.source_nodes]
+    }
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache.store(
+            fund_id, query_bundle.embedding, result, llm_calls=llm_calls.count, generation=generation
+        )
+    return result
+
 # 1. We define the logic ONCE in this shared function
 async def execute_rag_logic(query_data: QueryRequest, request: Request):
     try:
-        vector_index = getattr(request.app.state, "vector_index", None)
-        if vector_index is None:
-            raise HTTPException(status_code=500, detail="Index not initialized")
-
-        engine = get_smsf_query_engine(
-            fund_id=query_data.fund_id, 
-            vector_index=vector_index
-        )
-        
-        response = engine.query(query_data.question)
-        
-        return {
-            "answer": str(response),
-            "fund_id": query_data.fund_id,
-            "sources": [n.node.get_content()[:200] for n in response.source_nodes]
-        }
+        vector_index = _get_vector_index(request)
+        return await answer_question(query_data.fund_id, query_data.question, vector_index)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -45,4 +95,118 @@ async def query_endpoint(
     query_data: QueryRequest, request: Request,
     key: str = Depends(verify_api_key)
     ):
-    return await execute_rag_logic(query_data, request)
\ No newline at end of file
+    return await execute_rag_logic(query_data, request)
+
+# 3. Server-sent events variant of /ask: route -> sources -> token* -> done
+CITATION_METADATA_KEYS = ("file_name", "doc_type", "category", "fund_id", "section", "clause", "ruling_id")
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _source_citation(node_with_score) -> dict:
+    metadata = node_with_score.node.metadata or {}
+    citation = {
+        "text": node_with_score.node.get_content()[:200],
+        "score": node_with_score.score,
+    }
+    citation.update({k: metadata[k] for k in CITATION_METADATA_KEYS if k in metadata})
+    return citation
+
+async def _iter_tokens(response):
+    if isinstance(response, AsyncStreamingResponse):
+        async for token in response.async_response_gen():
+            yield token
+    elif isinstance(response, LlamaStreamingResponse):
+        # Sync generators would block the loop; pull them from a worker thread
+        async for token in iterate_in_threadpool(response.response_gen):
+            yield token
+    else:
+        yield str(response)
+
+async def stream_rag_events(engine, query_data: QueryRequest):
+    try:
+        # Returns once retrieval is done (and, in router mode, the route
+        # chosen); answer tokens are generated lazily while we iterate below
+        response = await engine.aquery(query_data.question)
+
+        yield _sse("route", describe_route(engine, response))
+        yield _sse("sources", {
+            "sources": [_source_citation(n) for n in response.source_nodes]
+        })
+
+        async for token in _iter_tokens(response):
+            yield _sse("token", {"text": token})
+
+        yield _sse("done", {"fund_id": query_data.fund_id})
+    except Exception as e:
+        # Headers are already sent, so errors travel as an event
+        yield _sse("error", {"detail": str(e)})
+
+@router.post("/ask/stream")
+async def ask_stream_endpoint(
+    query_data: QueryRequest, request: Request,
+    key: str = Depends(verify_api_key)
+    ):
+    vector_index = _get_vector_index(request)
+
+    engine = query_engine_cache.get(
+        fund_id=query_data.fund_id,
+        vector_index=vector_index,
+        streaming=True
+    )
+    return StreamingResponse(
+        stream_rag_events(engine, query_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# 4. Batch variant: many questions for one fund, answered as NDJSON lines
+#    in completion order ({"index", "question", "answer", "sources"} or
+#    {"index", "question", "error"})
+async def stream_batch_answers(query_data: BatchQueryRequest, vector_index, embeddings):
+    questions = query_data.questions
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run(index: int):
+        async with semaphore:
+            try:
+                result = await answer_question(
+                    query_data.fund_id, questions[index], vector_index,
+                    question_embedding=embeddings[index]
+                )
+                return {"index": index, "question": questions[index], **result}
+            except Exception as e:
+                return {"index": index, "question": questions[index], "error": str(e)}
+
+    tasks = [asyncio.create_task(run(i)) for i in range(len(questions))]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield json.dumps(await finished) + "\n"
+    finally:
+        # Client went away: don't keep spending LLM calls on the rest
+        for task in tasks:
+            task.cancel()
+
+@router.post("/ask/batch")
+async def ask_batch_endpoint(
+    query_data: BatchQueryRequest, request: Request,
+    key: str = Depends(verify_api_key)
+    ):
+    vector_index = _get_vector_index(request)
+    if len(query_data.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_QUESTIONS} questions per batch."
+        )
+    # One embedding request for the whole batch (OpenAI text-embedding-3
+    # models embed queries and documents identically). Done before streaming
+    # starts so a failure is still a proper 5xx, not an empty 200
+    try:
+        embeddings = await Settings.embed_model.aget_text_embedding_batch(query_data.questions)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Embedding failed: {e}")
+    return StreamingResponse(
+        stream_batch_answers(query_data, vector_index, embeddings),
+        media_type="application/x-ndjson"
+    )
@@ -1,22 +1,33 @@
+import asyncio
+from typing import TYPE_CHECKING, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
 from app.api.dependencies import get_storage_handler, get_index
-from app.storage.do_spaces import DOSpacesHandler
-from llama_index.core import Document
 from app.api.dependencies import verify_api_key
+from app.core.config import settings
+from app.core.generations import index_generations
+from app.core.qdrant import collection_bootstrap
+
+if TYPE_CHECKING:
+    # boto3 and the ingestion pipeline are imported on first use, not at startup
+    from app.storage.do_spaces import DOSpacesHandler
 
 
 router = APIRouter()
 
 @router.get("/files")
 async def list_available_files(
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    prefix: str = "",
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(settings.LISTING_PAGE_SIZE, ge=1, le=1000),
+    urls: bool = Query(True, description="include a download_url per file"),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
     ):
     # 'handler' is automatically provided by the dependency
-    files = handler.list_files()
-    return {"files": files}
-    # JSON will look like this:from datetime import datetime
+    # One page per call; keep passing next_cursor back until it is null
+    return await asyncio.to_thread(handler.list_page, prefix, cursor, limit, urls)
+    # JSON will look like this:
     # {
     # "files": [
     #     {
@@ -26,7 +37,8 @@ async def list_available_files(
     #     "last_modified": "2026-01-06T06:43:18+00:00",
     #     "download_url": "https://your-bucket.nyc3.digitaloceanspaces.com/legislation/SIS_Act_VOL_01_2025.pdf?AWSAccessKeyId=..."
     #     }
-    # ]
+    # ],
+    # "next_cursor": "1ueGcxLPRx1Tr/XYExHnhbYLgveDs2J/wm36Hy4vbOwM="
     # }
 
 @router.post("/process-selected")
@@ -35,44 +47,37 @@ async def process_file(
     fund_id: str = "global",  # Default to global for legislation
     doc_type: str = "legislation", # Default to legislation
     index = Depends(get_index), 
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
 ):
     """
-    1. Downloads file from DigitalOcean Spaces.
-    2. Indexes content into Qdrant vector store.
+    1. Streams the file from DigitalOcean Spaces (PDF or text).
+    2. Indexes it into Qdrant a few pages at a time.
     3. Automatically updates registry.json on success.
     """
-    # 1. Fetch file content
-    content = handler.get_file_content(file_key)
-    if not content:
+    from app.ingestion.streaming import UnsupportedFileType, astream_to_index
+
+    # 1. Open the object; the body is read in chunks, never all at once
+    body = await asyncio.to_thread(handler.open_file_stream, file_key)
+    if body is None:
         raise HTTPException(status_code=404, detail=f"File {file_key} not found.")
 
     try:
-        # 2. Index into Qdrant using LlamaIndex
-        # (Assuming text content; update parser if using PDFs)
-        text_content = content.decode('utf-8')
-        doc = Document(
-            text=text_content, 
-            metadata={
-                "file_name": file_key,
-                "fund_id": fund_id,        # Crucial for filtering private deeds
-                "doc_type": doc_type,      # Crucial for routing to 'legislation' or 'trust_deed'
-                "category": "smsf_document",
-                "processed_at": datetime.utcnow().isoformat()
-            }
-        )
-        
-        # Upsert to Qdrant via the index
-        index.insert(doc)
-        
-        # 3. SUCCESS: Update the registry.json file
-        registry = handler.get_registry()
-        
-        # Remove old entry if it exists to avoid duplicates
-        registry["indexed_files"] = [f for f in registry.get("indexed_files", []) if f["name"] != file_key]
+        # 2. Parse page by page, embedding and upserting to Qdrant as we go
+        metadata = {
+            "file_name": file_key,
+            "fund_id": fund_id,        # Crucial for filtering private deeds
+            "doc_type": doc_type,      # Crucial for routing to 'legislation' or 'trust_deed'
+            "category": "smsf_document",
+            "processed_at": datetime.utcnow().isoformat()
+        }
+        stats = await astream_to_index(body, index.vector_store, metadata=metadata, doc_id_prefix=file_key)
+        # Cached engines for this fund are now stale
+        index_generations.bump(fund_id)
+        # A no-op once verified at startup; covers a collection created just now
+        await asyncio.to_thread(collection_bootstrap.ensure_vector_store, index.vector_store)
         
-        # Add new entry
+        # 3. SUCCESS: Record the file in the registry (only its own entry is written)
         new_entry = {
             "name": file_key,
             "indexed_at": datetime.utcnow().isoformat(),
@@ -82,16 +87,16 @@ async def process_file(
                 "target": "qdrant_collection"
             }
         }
-        registry["indexed_files"].append(new_entry)
-        
-        # Save back to Spaces
-        handler.save_registry(registry)
+        await asyncio.to_thread(handler.registry.upsert, new_entry)
         
         return {
             "message": f"Successfully indexed {file_key} and updated registry.",
-            "status": "success"
+            "status": "success",
+            "stats": stats
         }
 
+    except UnsupportedFileType as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         # Log error and return failure
         print(f"Error during processing: {e}")
@@ -100,7 +105,7 @@ async def process_file(
 @router.get("/download")
 async def get_file_download_link(
     file_key: str = Query(..., description="The full path of the file to download"),
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
     ):
     url = handler.generate_download_url(file_key)
@@ -112,23 +117,19 @@ async def get_file_download_link(
 
 @router.get("/registry")
 async def get_index_registry(
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
     ):
     """Returns the list of files already indexed in Qdrant."""
-    return handler.get_registry()
+    return await asyncio.to_thread(handler.get_registry)
 
 @router.post("/registry/update")
 async def update_registry_status(
     file_key: str, 
     status: str = "completed",
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
 ):
-    # 1. Get (Returns template if file doesn't exist)
-    registry = handler.get_registry()
-    
-    # 2. Modify
     new_entry = {
         "name": file_key,
         "indexed_at": datetime.utcnow().isoformat(),
@@ -136,12 +137,11 @@ async def update_registry_status(
         "metadata": {"upsert_type": "qdrant_vector_index"}
     }
     
-    # Update existing or add new
-    registry["indexed_files"] = [f for f in registry["indexed_files"] if f["name"] != file_key]
-    registry["indexed_files"].append(new_entry)
-    
-    # 3. Save
-    if not handler.save_registry(registry):
+    # Update existing or add new; concurrent updates to other files are kept
+    try:
+        await asyncio.to_thread(handler.registry.upsert, new_entry)
+    except Exception as e:
+        print(f"Error updating registry: {e}")
         raise HTTPException(status_code=500, detail="Failed to write registry to cloud")
     
     return {"status": "success", "file": file_key}
@@ -149,7 +149,7 @@ async def update_registry_status(
 @router.delete("/files/delete")
 async def delete_file_and_registry_entry(
     file_key: str, 
-    handler: DOSpacesHandler = Depends(get_storage_handler),
+    handler: "DOSpacesHandler" = Depends(get_storage_handler),
     key: str = Depends(verify_api_key)
 ):
     # 1. Delete the physical file from DigitalOcean
@@ -159,23 +159,12 @@ async def delete_file_and_registry_entry(
     if not physical_delete_success:
         raise HTTPException(status_code=500, detail="Failed to delete file from storage")
 
-    # 2. Update the registry
-    registry = handler.get_registry()
-    
-    # Check if the file actually exists in the registry
-    original_count = len(registry.get("indexed_files", []))
-    
-    # Filter out the deleted file
-    registry["indexed_files"] = [
-        f for f in registry.get("indexed_files", []) 
-        if f["name"] != file_key
-    ]
-    
-    # 3. Save the updated registry back to the Space
-    if len(registry["indexed_files"]) != original_count:
-        save_success = handler.save_registry(registry)
-        if not save_success:
-            raise HTTPException(status_code=500, detail="File deleted, but failed to update registry")
+    # 2. Drop the file's registry entry (if it had one)
+    try:
+        await asyncio.to_thread(handler.registry.remove, file_key)
+    except Exception as e:
+        print(f"Error updating registry: {e}")
+        raise HTTPException(status_code=500, detail="File deleted, but failed to update registry")
     
     return {
         "status": "success", 
@@ -0,0 +1,102 @@
+"""
+Local BM25-style sparse vectors for Qdrant hybrid retrieval.
+
+Dense embeddings blur exact citations ("s 67A", "Clause 12.4"); a sparse
+term vector keeps them. Terms are feature-hashed into Qdrant sparse indices,
+documents carry BM25 term-frequency weights and the collection applies IDF
+server-side (SparseVectorParams(modifier=Modifier.IDF)), so no corpus
+statistics have to be kept here. Dense and sparse hits are merged with
+reciprocal rank fusion.
+"""
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+from qdrant_client.http import models as rest
+
+# Keep dotted numbers and alphanumeric section ids together: "12.4", "67a", "2009"
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a about an and are as at be by can do does for from has have how i if in is it its may "
+    "must my not of on or our say says should that the their this to under what when "
+    "which who will with".split()
+)
+
+# BM25 saturation parameters; AVG_DOC_LENGTH approximates a 128-token leaf in words
+K1 = 1.2
+B = 0.75
+AVG_DOC_LENGTH = 96.0
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def term_index(term: str) -> int:
+    """Stable (process-independent) sparse index for a term."""
+    return zlib.crc32(term.encode("utf-8")) & 0x7FFFFFFF
+
+
+def _to_sparse(weights: dict) -> Tuple[List[int], List[float]]:
+    indices = sorted(weights)
+    return indices, [weights[i] for i in indices]
+
+
+def bm25_doc_encoder(texts: List[str]) -> Tuple[List[List[int]], List[List[float]]]:
+    """sparse_doc_fn for QdrantVectorStore: BM25 term-frequency weights per text."""
+    all_indices, all_values = [], []
+    for text in texts:
+        tokens = tokenize(text)
+        norm = K1 * (1 - B + B * len(tokens) / AVG_DOC_LENGTH)
+        weights = {}
+        for term, tf in Counter(tokens).items():
+            idx = term_index(term)
+            weights[idx] = weights.get(idx, 0.0) + tf * (K1 + 1) / (tf + norm)
+        indices, values = _to_sparse(weights)
+        all_indices.append(indices)
+        all_values.append(values)
+    return all_indices, all_values
+
+
+def bm25_query_encoder(texts: List[str]) -> Tuple[List[List[int]], List[List[float]]]:
+    """sparse_query_fn for QdrantVectorStore: weight 1 per distinct query term."""
+    all_indices, all_values = [], []
+    for text in texts:
+        indices, values = _to_sparse({term_index(t): 1.0 for t in set(tokenize(text))})
+        all_indices.append(indices)
+        all_values.append(values)
+    return all_indices, all_values
+
+
+def reciprocal_rank_fusion(
+    dense_result: VectorStoreQueryResult,
+    sparse_result: VectorStoreQueryResult,
+    alpha: float = 0.5,
+    top_k: int = 2,
+    k: int = 60,
+) -> VectorStoreQueryResult:
+    """
+    hybrid_fusion_fn for QdrantVectorStore. Scores each node by
+    sum(weight / (k + rank)) over the two ranked lists; alpha weights the
+    dense list (1 - alpha the sparse one), as in LlamaIndex's own fusion fns.
+    """
+    scores, nodes = {}, {}
+    for result, weight in ((dense_result, alpha), (sparse_result, 1 - alpha)):
+        for rank, node in enumerate(result.nodes or [], start=1):
+            scores[node.node_id] = scores.get(node.node_id, 0.0) + weight / (k + rank)
+            nodes.setdefault(node.node_id, node)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return VectorStoreQueryResult(
+        nodes=[nodes[node_id] for node_id in ranked],
+        similarities=[scores[node_id] for node_id in ranked],
+        ids=ranked,
+    )
+
+
+def sparse_vector_params() -> rest.SparseVectorParams:
+    """Collection config for the sparse vectors: Qdrant applies IDF at query time."""
+    return rest.SparseVectorParams(modifier=rest.Modifier.IDF)
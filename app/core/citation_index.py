@@ -0,0 +1,163 @@
+"""
+Citation index: SIS Act/Regulations section numbers and per-fund deed clause
+numbers -> docstore node ids, built at ingestion time and persisted next to
+docstore.json, so a question like "what does s 67A say?" can be answered
+from the named provision without an embedding call or a vector search.
+"""
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, threads of one process are still serialised
+    fcntl = None
+
+CITATION_INDEX_FILE = "citation_index.json"
+
+SECTION = "section"
+CLAUSE = "clause"
+
+# Citations in questions: "s 67A", "section 62", "reg 13.22C", "Clause 12.4".
+# No word character or apostrophe may precede the prefix, and a bare s/r
+# needs a dot or space before the number, so "What's 10 percent" is not s 10.
+_QUESTION_PATTERNS = {
+    SECTION: re.compile(
+        r"(?<![\w'’])(?:(?:sec|section|reg|regulation)\.?\s*|(?:ss?|r)(?:\.\s*|\s+))(\d+(?:\.\d+)?[a-z]{0,3})\b",
+        re.IGNORECASE,
+    ),
+    CLAUSE: re.compile(r"(?<![\w'’])(?:cl|clause)\.?\s*(\d+(?:\.\d+)*)\b", re.IGNORECASE),
+}
+
+# Headings that start a provision in ingested text. A line that merely starts
+# with a number ("2 Trustees must not lend.", a table row, a page header) is
+# not one: either the keyword names it ("Section 67A Borrowing", "Clause 12.4:
+# Borrowing"), or the whole line is a heading: a title-case title set apart by
+# two or more spaces or a tab (legislation layout), or a short Title Case one
+# ("12.4 Borrowing Powers"), single-spaced and not ending like a sentence.
+# Lines naming an Act and its year are running headers, not headings.
+_TITLE = r"[A-Z][a-z](?:[^\n\S]?\S)*[^.;:,\s]"
+_TITLE_WORD = r"[A-Z][\w'’()&/-]*"
+_SHORT_TITLE = rf"{_TITLE_WORD}(?: (?:{_TITLE_WORD}|of|and|or|to|the|in|for|on|by|a|an)){{0,5}}"
+
+
+def _heading_pattern(keywords: str, number: str) -> re.Pattern:
+    return re.compile(
+        rf"^[ \t]*(?:(?i:{keywords})[ \t]+({number})[ \t]*[.:\-–—]?[ \t]+[A-Z]"
+        rf"|({number})(?![^\n]*\bAct\s+\d{{4}}\b)(?:(?:[ \t]{{2,}}|\t){_TITLE}| {_SHORT_TITLE})[ \t]*$)",
+        re.MULTILINE,
+    )
+
+
+_HEADING_PATTERNS = {
+    SECTION: _heading_pattern(r"section|regulation", r"\d+(?:\.\d+)?[A-Z]{0,3}"),
+    CLAUSE: _heading_pattern(r"clause", r"\d+(?:\.\d+)+"),
+}
+
+
+_thread_locks = defaultdict(threading.Lock)
+
+
+@contextmanager
+def persist_lock(persist_dir: str):
+    """
+    Hold around a read-modify-write of citation_index.json. Ingestion updates
+    it from several processes (the pipeline's process pool, job workers), so
+    besides a per-directory thread lock this takes an exclusive flock on
+    citation_index.json.lock; os.replace alone would lose one side's entries.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    with _thread_locks[os.path.abspath(persist_dir)]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(persist_dir, CITATION_INDEX_FILE + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def normalize_citation(citation: str) -> str:
+    return citation.strip().rstrip(".").upper()
+
+
+def extract_citations(question: str):
+    """(kind, citation) pairs named in a question, in order of appearance."""
+    found = []
+    for kind, pattern in _QUESTION_PATTERNS.items():
+        for match in pattern.finditer(question):
+            pair = (kind, normalize_citation(match.group(1)))
+            if pair not in found:
+                found.append(pair)
+    return found
+
+
+class CitationIndex:
+    """
+    Dict of "kind|scope|citation" -> [node_id, ...]. Scope is "global" for
+    legislation and the fund_id for deed clauses.
+    """
+
+    def __init__(self, entries: dict = None):
+        self._entries = entries or {}
+
+    @staticmethod
+    def _key(kind: str, scope: str, citation: str) -> str:
+        return f"{kind}|{scope}|{normalize_citation(citation)}"
+
+    def lookup(self, kind: str, scope: str, citation: str) -> list:
+        return list(self._entries.get(self._key(kind, scope, citation), []))
+
+    def index_nodes(self, nodes, kind: str, scope: str):
+        """
+        Maps each node (leaves, in document order) to the provision it belongs
+        to: its "section"/"clause" metadata if set, otherwise the last heading
+        seen. Citations found in this batch replace earlier entries, so
+        re-ingesting a deed or a new compilation does not keep stale node ids.
+        """
+        replaced = set()
+        current = []
+        for node in nodes:
+            cited = node.metadata.get(kind)
+            if cited:
+                citations = [str(cited)]
+            else:
+                text = node.get_content()
+                matches = list(_HEADING_PATTERNS[kind].finditer(text))
+                headings = [m.group(1) or m.group(2) for m in matches]
+                # Text before the first heading still belongs to the previous provision
+                carried = current if not matches or text[:matches[0].start()].strip() else []
+                citations = list(dict.fromkeys(carried + headings))
+                if headings:
+                    current = headings[-1:]
+            for citation in citations:
+                key = self._key(kind, scope, citation)
+                if key not in replaced:
+                    self._entries[key] = []
+                    replaced.add(key)
+                self._entries[key].append(node.node_id)
+        return len(replaced)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def persist(self, persist_dir: str):
+        os.makedirs(persist_dir, exist_ok=True)
+        path = os.path.join(persist_dir, CITATION_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": self._entries}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> "CitationIndex":
+        path = os.path.join(persist_dir, CITATION_INDEX_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f).get("entries", {}))
@@ -1,8 +1,9 @@
 import os
+import threading
+from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from llama_index.core import Settings
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.llms.openai import OpenAI
+from app.core.embedding_cache import EmbeddingCacheStore, embedding_namespace
 
 # 1. Define your Environment Variables (FastAPI/Pydantic)
 class AppSettings(BaseSettings):
@@ -10,25 +11,218 @@ class AppSettings(BaseSettings):
     OPENAI_API_KEY: str
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str = "optional_locally"
-    
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 60
+    QDRANT_POOL_SIZE: int = 20
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 15.0
+
+    # Payload indexes for the filtered keys (fund_id as the tenant key) and
+    # per-payload HNSW links, created at startup and after ingestion upserts.
+    # QDRANT_HNSW_M=0 drops the global graph: only if every search filters by fund.
+    QDRANT_PAYLOAD_INDEXES: bool = True
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_PAYLOAD_M: int = 16
+
+    # Embedding storage: EMBED_DIMENSIONS truncates text-embedding-3-large
+    # (Matryoshka; 0 = native 3072) and QDRANT_QUANTIZATION ("none", "scalar"
+    # int8 or "binary") keeps a compressed copy in RAM, with the originals on
+    # disk for rescoring the oversampled candidates (binary needs ~4x to keep
+    # recall; see benchmarks/bench_quantization.py). Ingestion and queries read
+    # the same settings; changing EMBED_DIMENSIONS needs a re-ingest.
+    EMBED_DIMENSIONS: int = 0
+    QDRANT_QUANTIZATION: str = "none"
+    QDRANT_QUANTIZATION_RESCORE: bool = True
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+    QDRANT_ORIGINALS_ON_DISK: bool = True
+
+    # Router query engine cache (per fund_id)
+    ENGINE_CACHE_MAX_SIZE: int = 128
+    ENGINE_CACHE_TTL_SECONDS: float = 900.0
+
+    # Semantic answer cache (cosine similarity of question embeddings)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_SIZE: int = 1024
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    # Upper bound on staleness after an ingest this process did not see
+    # (e.g. python -m app.ingestion.run_ingestion); 0 disables expiry
+    ANSWER_CACHE_TTL_SECONDS: float = 900.0
+
+    # Embedding cache (memory LRU + SQLite on disk), shared by queries and ingestion
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "./storage/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_SIZE: int = 10000
+
+    # Router selector: "llm" (LLMSingleSelector) or "embedding" (similarity to
+    # tool descriptions/exemplars, LLM only when the top-2 margin is too small)
+    ROUTER_MODE: str = "llm"
+    ROUTER_MARGIN_THRESHOLD: float = 0.05
+
+    # Query path: "fanout" searches every relevant source at once (the served
+    # index by doc_type, plus the ingestion collections below), merges by score
+    # (cosine, or RRF score rescaled to 0-1 in hybrid mode) and synthesizes
+    # once; "router" picks one tool
+    QUERY_MODE: str = "fanout"
+    FANOUT_COLLECTIONS: str = "legislation,ato_rulings,trust_deeds"
+    FANOUT_TOP_K_PER_SOURCE: int = 5
+    FANOUT_TOP_K: int = 8
+    FANOUT_RECHECK_SECONDS: float = 60.0
+
+    # Context packing before synthesis: drop nodes scored below the cutoff (a
+    # cosine similarity, so not applied to hybrid RRF scores or in fan-out),
+    # dedupe, merge overlapping leaves of one parent, and keep the best spans
+    # within the token budget so the answer is one LLM call. Keep the budget
+    # well inside the LLM's window.
+    CONTEXT_PACKING: bool = True
+    CONTEXT_SCORE_CUTOFF: float = 0.2
+    CONTEXT_TOKEN_BUDGET: int = 3000
+
+    # Leaf hierarchy (2048/512/128) at query time: "flat" answers from the
+    # retrieved 128-token leaves; "auto_merging" replaces leaves with their
+    # parent when more than AUTO_MERGE_RATIO of its children were retrieved.
+    # Parents are read from the ingestion docstores (SQLite) and LRU-cached.
+    HIERARCHY_MODE: str = "flat"
+    AUTO_MERGE_RATIO: float = 0.5
+    PARENT_CACHE_SIZE: int = 1024
+
+    # /api/ask/batch: max questions per request and concurrent questions in flight
+    BATCH_MAX_QUESTIONS: int = 100
+    BATCH_MAX_CONCURRENCY: int = 8
+
+    # Retrieval for public_law/private_deed: "dense" or "hybrid" (dense + BM25
+    # sparse vectors fused with reciprocal rank fusion). Hybrid needs collections
+    # (re)ingested with RETRIEVAL_MODE=hybrid so points carry sparse vectors.
+    RETRIEVAL_MODE: str = "dense"
+    HYBRID_SPARSE_TOP_K: int = 10
+    HYBRID_RRF_K: int = 60
+
+    # Citation index: for questions naming a SIS section or deed clause, the
+    # cited nodes (read from the ingestion docstores) are pinned ahead of the
+    # retrieved context
+    CITATION_INDEX_ENABLED: bool = True
+    CITATION_MAX_NODES: int = 8
+    LEGISLATION_PERSIST_DIR: str = "./storage/legislation"
+    ATO_RULING_PERSIST_DIR: str = "./storage/ato_rulings"
+    TRUST_DEED_PERSIST_DIR: str = "./storage/trust_deeds"
+
+    # Ingestion embedding scheduler: token-limited batches, concurrent requests,
+    # token-bucket pacing below the account's tokens-per-minute limit
+    EMBED_MAX_CONCURRENCY: int = 4
+    EMBED_BATCH_MAX_INPUTS: int = 512
+    EMBED_BATCH_MAX_TOKENS: int = 250000  # OpenAI allows 300k tokens per request
+    EMBED_TOKENS_PER_MINUTE: int = 1000000
+    EMBED_MAX_RETRIES: int = 6
+
+    # /api/process-selected streaming ingestion: the Spaces body is copied in
+    # chunks to a temp file (kept in memory up to the spool limit), then parsed
+    # and embedded a few pages at a time so memory does not grow with file size
+    STREAM_CHUNK_BYTES: int = 1024 * 1024
+    STREAM_SPOOL_MAX_MEMORY_BYTES: int = 8 * 1024 * 1024
+    STREAM_PAGES_PER_BATCH: int = 8
+    STREAM_TEXT_PAGE_CHARS: int = 16000
+
+    # run_ingestion orchestrator: concurrent downloads, PDF parsing in a
+    # process pool (0 = one worker per core), retries with exponential backoff
+    INGEST_DOWNLOAD_CONCURRENCY: int = 4
+    INGEST_PARSE_WORKERS: int = 0
+    INGEST_MAX_RETRIES: int = 3
+    INGEST_RETRY_BACKOFF_SECONDS: float = 2.0
+    INGEST_WORK_DIR: str = "./data"
+
+    # Ingestion job queue (SQLite): the API enqueues uploads, `python -m
+    # app.ingestion.worker` runs them. Both processes must see the same disk.
+    JOB_DB_PATH: str = "./storage/jobs.sqlite3"
+    JOB_UPLOAD_DIR: str = "./data/uploads"
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    JOB_WORKER_CONCURRENCY: int = 1     # jobs in flight per worker process
+    JOB_MAX_RUNNING: int = 2            # jobs in flight across all workers
+    JOB_LEASE_SECONDS: float = 120.0    # a job without heartbeat this long is retried
+    JOB_HEARTBEAT_SECONDS: float = 5.0
+    JOB_POLL_SECONDS: float = 2.0
+
+    # Index registry in the Space: "entries" (one object per indexed file, O(1)
+    # updates; an existing registry.json is copied over on first read) or
+    # "single" (registry.json with conditional GET/PUT). Both are cached per
+    # process and safe against concurrent updaters.
+    REGISTRY_LAYOUT: str = "entries"
+    REGISTRY_MAX_RETRIES: int = 8
+
+    # /api/files: cursor-paged listing (one S3 request per page), pages cached
+    # per prefix for a few seconds, presigned links reused until near expiry
+    LISTING_PAGE_SIZE: int = 100
+    LISTING_CACHE_TTL_SECONDS: float = 30.0
+    LISTING_CACHE_MAX_PAGES: int = 256
+    PRESIGNED_URL_EXPIRES_SECONDS: int = 3600
+    PRESIGNED_URL_REFRESH_MARGIN_SECONDS: float = 600.0
+
     # Optional: Load from .env file locally
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_ignore_empty=True)
 
 # Initialize the environment settings
 settings = AppSettings()
 
-# 2. Configure LlamaIndex Global Settings
+EMBED_MODEL_NAME = "text-embedding-3-large"
+EMBED_NATIVE_DIMENSIONS = 3072
 # Note: Ensure the model name is exactly "gpt-4o-mini" (OpenAI standard)
-Settings.llm = OpenAI(
-    model="gpt-4o-mini", 
-    temperature=0.0,
-    api_key=settings.OPENAI_API_KEY
-)
-
-Settings.embed_model = OpenAIEmbedding(
-    model="text-embedding-3-large",
-    api_key=settings.OPENAI_API_KEY
-)
+LLM_MODEL_NAME = "gpt-4o-mini"
+
+def embedding_dimensions(app_settings=settings) -> int:
+    """Stored vector size: the truncated size when EMBED_DIMENSIONS is set."""
+    return app_settings.EMBED_DIMENSIONS or EMBED_NATIVE_DIMENSIONS
+
+# Repeated texts (same question, unchanged SIS Act leaves) are served from here
+@lru_cache(maxsize=1)
+def get_embedding_cache():
+    """The embedding cache shared by queries and ingestion, opened on first use (None when disabled)."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCacheStore(
+        path=settings.EMBEDDING_CACHE_PATH,
+        namespace=embedding_namespace(EMBED_MODEL_NAME, settings.EMBED_DIMENSIONS or None),
+        memory_size=settings.EMBEDDING_CACHE_MEMORY_SIZE
+    )
+
+def build_embed_model(**overrides):
+    """text-embedding-3-large sharing the embedding cache; ingestion overrides retries/batch size."""
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
+    options = dict(
+        model=EMBED_MODEL_NAME,
+        api_key=settings.OPENAI_API_KEY,
+        embeddings_cache=get_embedding_cache()
+    )
+    if settings.EMBED_DIMENSIONS:
+        # The API returns the first N dimensions, renormalised
+        options["dimensions"] = settings.EMBED_DIMENSIONS
+    options.update(overrides)
+    return OpenAIEmbedding(**options)
+
+# 2. Configure LlamaIndex Global Settings
+_models_lock = threading.Lock()
+_models_configured = False
+
+def configure_models():
+    """
+    Sets Settings.llm (gpt-4o-mini) and Settings.embed_model (the cached
+    text-embedding-3-large). Not done at import (the OpenAI SDK is the largest
+    part of the import graph): the API lifespan and the ingestion modules call
+    this before anything reads them. Runs once per process, so calling it
+    again is a no-op (tests and benchmarks set their stub models after it).
+    """
+    global _models_configured
+    with _models_lock:
+        if _models_configured:
+            return
+        from llama_index.llms.openai import OpenAI
+
+        Settings.llm = OpenAI(
+            model=LLM_MODEL_NAME,
+            temperature=0.0,
+            api_key=settings.OPENAI_API_KEY
+        )
+        Settings.embed_model = build_embed_model()
+        _models_configured = True
 
 Settings.chunk_size = 512
 Settings.chunk_overlap = 64
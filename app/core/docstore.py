@@ -0,0 +1,229 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.docstore.utils import json_to_doc
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+
+DOCSTORE_FILE = "docstore.sqlite3"
+LEGACY_DOCSTORE_FILE = "docstore.json"
+
+# SQLite's default limit on "?" parameters is 999 on older builds
+_MAX_PARAMS = 900
+
+
+class SQLiteKVStore(BaseKVStore):
+    """
+    BaseKVStore on one SQLite table (collection, key) -> JSON value.
+    Every write is a transaction; transaction() groups several writes into
+    one, so a crash never leaves half an ingest batch on disk.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # The docstore is a source of truth (unlike the embedding cache): fsync each commit
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " collection TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (collection, key)) WITHOUT ROWID"
+        )
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth == 0:
+                self._db.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._db.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._db.execute("COMMIT")
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put_all([(key, val)], collection=collection)
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put(key, val, collection)
+
+    def put_all(self, kv_pairs: List[Tuple[str, dict]], collection: str = DEFAULT_COLLECTION,
+                batch_size: int = 1) -> None:
+        if not kv_pairs:
+            return
+        rows = [(collection, key, json.dumps(val)) for key, val in kv_pairs]
+        with self.transaction():
+            self._db.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", rows)
+
+    async def aput_all(self, kv_pairs: List[Tuple[str, dict]], collection: str = DEFAULT_COLLECTION,
+                       batch_size: int = 1) -> None:
+        self.put_all(kv_pairs, collection, batch_size)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return self.get(key, collection)
+
+    def get_many(self, keys: Sequence[str], collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT key, value FROM kv WHERE collection = ? AND key IN ({placeholders})",
+                    (collection, *chunk),
+                ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM kv WHERE collection = ?", (collection,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return self.get_all(collection)
+
+    def count(self, collection: str = DEFAULT_COLLECTION) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM kv WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        with self.transaction():
+            cursor = self._db.execute("DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key))
+        return cursor.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class SQLiteDocumentStore(KVDocumentStore):
+    """
+    Docstore kept in <persist_dir>/docstore.sqlite3 instead of docstore.json.
+    Nodes are read on demand (nothing is loaded at startup) and written per
+    node: add_documents skips nodes whose stored hash is unchanged and writes
+    the rest, with their metadata and ref-doc info, in a single transaction.
+    persist() is a no-op kept for callers written against SimpleDocumentStore.
+    """
+
+    def __init__(self, kvstore: SQLiteKVStore, namespace: Optional[str] = None):
+        super().__init__(kvstore, namespace=namespace)
+        self.skipped = 0
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, namespace: Optional[str] = None) -> "SQLiteDocumentStore":
+        sqlite_path = os.path.join(persist_dir, DOCSTORE_FILE)
+        if not os.path.exists(os.path.join(persist_dir, LEGACY_DOCSTORE_FILE)):
+            return cls(SQLiteKVStore(sqlite_path), namespace=namespace)
+        message = (
+            f"{persist_dir} still has a JSON docstore; migrate it first with "
+            f"`python -m app.ingestion.migrate_docstore {persist_dir}`"
+        )
+        if not os.path.exists(sqlite_path):
+            raise RuntimeError(message)
+        docstore = cls(SQLiteKVStore(sqlite_path), namespace=namespace)
+        if docstore.count() == 0:
+            # Left by a failed migration: opening it would re-embed everything
+            docstore.close()
+            raise RuntimeError(f"{message} (remove the empty {DOCSTORE_FILE} first)")
+        return docstore
+
+    def add_documents(self, docs: Sequence[BaseNode], allow_update: bool = True,
+                      batch_size: Optional[int] = None, store_text: bool = True) -> None:
+        stored = self._kvstore.get_many([doc.node_id for doc in docs], collection=self._metadata_collection)
+        changed = [doc for doc in docs if stored.get(doc.node_id, {}).get("doc_hash") != doc.hash]
+        self.skipped += len(docs) - len(changed)
+        with self._kvstore.transaction():
+            super().add_documents(changed, allow_update=allow_update, batch_size=batch_size, store_text=store_text)
+
+    async def async_add_documents(self, docs: Sequence[BaseNode], allow_update: bool = True,
+                                  batch_size: Optional[int] = None, store_text: bool = True) -> None:
+        self.add_documents(docs, allow_update=allow_update, batch_size=batch_size, store_text=store_text)
+
+    def get_nodes(self, node_ids: List[str], raise_error: bool = True) -> List[BaseNode]:
+        # One query for all ids instead of one per node
+        found = self._kvstore.get_many(node_ids, collection=self._node_collection)
+        missing = [node_id for node_id in node_ids if node_id not in found]
+        if missing and raise_error:
+            raise ValueError(f"node_ids {missing} not found.")
+        return [json_to_doc(found[node_id]) for node_id in node_ids if node_id in found]
+
+    def count(self) -> int:
+        return self._kvstore.count(collection=self._node_collection)
+
+    def persist(self, persist_path: Optional[str] = None, fs=None, **kwargs) -> None:
+        """Writes are committed as they happen; nothing to do."""
+
+    def close(self):
+        self._kvstore.close()
+
+
+def _remove_sqlite_files(path: str):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def migrate_json_docstore(persist_dir: str) -> int:
+    """
+    Copies <persist_dir>/docstore.json (SimpleDocumentStore) into
+    docstore.sqlite3 collection by collection, then renames the JSON file to
+    docstore.json.migrated. Returns the number of nodes migrated. The copy is
+    built in a temporary file and only moved into place once complete, so a
+    failed migration leaves no docstore.sqlite3 behind and can be re-run.
+    """
+    json_path = os.path.join(persist_dir, LEGACY_DOCSTORE_FILE)
+    with open(json_path) as f:
+        data = json.load(f)
+
+    sqlite_path = os.path.join(persist_dir, DOCSTORE_FILE)
+    tmp_path = sqlite_path + ".migrating"
+    _remove_sqlite_files(tmp_path)  # left by an interrupted run
+    kvstore = SQLiteKVStore(tmp_path)
+    docstore = SQLiteDocumentStore(kvstore)
+    try:
+        with kvstore.transaction():
+            for collection, entries in data.items():
+                kvstore.put_all(list(entries.items()), collection=collection)
+            migrated = docstore.count()
+            expected = len(data.get(docstore._node_collection, {}))
+            if migrated != expected:
+                raise RuntimeError(f"Migrated {migrated} of {expected} nodes in {persist_dir}")
+    except BaseException:
+        kvstore.close()
+        _remove_sqlite_files(tmp_path)
+        raise
+    # Closing checkpoints the WAL into the file, so the one file is complete
+    kvstore.close()
+
+    os.replace(tmp_path, sqlite_path)
+    os.replace(json_path, json_path + ".migrated")
+    return migrated
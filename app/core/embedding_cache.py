@@ -0,0 +1,145 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC + collapsed whitespace, so trivially different copies share a key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCacheStore(BaseKVStore):
+    """
+    Two-tier embedding cache plugged into BaseEmbedding.embeddings_cache.
+
+    - Memory tier: LRU of the most recent vectors.
+    - Disk tier: SQLite table of float32 blobs that survives restarts.
+
+    Keys are sha256(namespace, normalized text); the namespace identifies the
+    model (name + dimensions), so switching models never returns stale vectors.
+    LlamaIndex stores values as {uuid: embedding}; we only keep the vector.
+    """
+
+    def __init__(self, path: Optional[str], namespace: str, memory_size: int = 10000):
+        self._namespace = namespace
+        self._memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, namespace TEXT NOT NULL,"
+                " dim INTEGER NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        raw = f"{self._namespace}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _remember(self, key: str, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        vector = next(iter(val.values()))
+        cache_key = self._key(key)
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._remember(cache_key, list(vector))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)",
+                    (cache_key, self._namespace, len(vector), blob, time.time()),
+                )
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put(key, val, collection)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        cache_key = self._key(key)
+        with self._lock:
+            vector = self._memory.get(cache_key)
+            if vector is not None:
+                self._memory.move_to_end(cache_key)
+                self.memory_hits += 1
+                return {cache_key: vector}
+
+            row = None
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (cache_key,)
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+            self._remember(cache_key, vector)
+            self.disk_hits += 1
+            return {cache_key: vector}
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        # Only meaningful for the memory tier; the disk tier is never enumerated
+        with self._lock:
+            return {k: {k: v} for k, v in self._memory.items()}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return self.get_all(collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        cache_key = self._key(key)
+        with self._lock:
+            found = self._memory.pop(cache_key, None) is not None
+            if self._db is not None:
+                cursor = self._db.execute("DELETE FROM embeddings WHERE key = ?", (cache_key,))
+                found = found or cursor.rowcount > 0
+            return found
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "namespace": self._namespace,
+                "memory_size": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+
+def embedding_namespace(model_name: str, dimensions: Optional[int] = None) -> str:
+    return f"{model_name}:{dimensions or 'native'}"
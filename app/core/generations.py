@@ -0,0 +1,36 @@
+import threading
+
+GLOBAL_FUND_ID = "global"
+
+
+def normalize_fund_id(fund_id) -> str:
+    """Legislation and rulings live under 'global'; everything else is a fund."""
+    if not fund_id or str(fund_id).lower() == GLOBAL_FUND_ID:
+        return GLOBAL_FUND_ID
+    return str(fund_id)
+
+
+class IndexGenerations:
+    """
+    Per-fund counters that are bumped every time documents for that fund
+    (or 'global' for legislation/rulings) are (re-)ingested.
+    Caches include the generation in their keys so stale entries never match.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def get(self, fund_id) -> int:
+        with self._lock:
+            return self._counters.get(normalize_fund_id(fund_id), 0)
+
+    def bump(self, fund_id) -> int:
+        key = normalize_fund_id(fund_id)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+# Shared instance used by the API routes and the ingestion modules
+index_generations = IndexGenerations()
@@ -0,0 +1,289 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.embedding import EmbeddingEndEvent, EmbeddingStartEvent
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent, LLMChatStartEvent, LLMCompletionEndEvent, LLMCompletionStartEvent,
+)
+from llama_index.core.instrumentation.events.retrieval import RetrievalEndEvent, RetrievalStartEvent
+from llama_index.core.instrumentation.events.synthesis import SynthesizeEndEvent, SynthesizeStartEvent
+from llama_index.core.utils import get_tokenizer
+
+from app.core.metrics import COUNT_BUCKETS, metrics
+
+
+class LLMCallCounter:
+    def __init__(self):
+        self.count = 0
+
+
+# Active counters (outermost first); asyncio tasks spawned inside inherit them
+_active_counters = contextvars.ContextVar("llm_call_counters", default=())
+
+
+class _LLMCallEventHandler(BaseEventHandler):
+    """Counts finished LLM completion/chat calls against every active counter."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMCallEventHandler"
+
+    def handle(self, event, **kwargs):
+        if isinstance(event, (LLMCompletionEndEvent, LLMChatEndEvent)):
+            for counter in _active_counters.get():
+                counter.count += 1
+
+
+get_dispatcher().add_event_handler(_LLMCallEventHandler())
+
+
+@contextmanager
+def count_llm_calls():
+    """
+    Counts LLM calls made inside the block (including awaited sub-tasks).
+    Blocks may nest; every enclosing counter sees the call.
+    Usage:
+        with count_llm_calls() as calls:
+            await engine.aquery(...)
+        calls.count
+    """
+    counter = LLMCallCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+# Per-stage timing, tokens and node counts for /api/metrics and the
+# Server-Timing header. LlamaIndex emits a start/end event pair per
+# retrieval, synthesis, embedding and LLM call; the pair shares a span id.
+_STAGE_EVENTS = {
+    RetrievalStartEvent: ("retrieval", True),
+    RetrievalEndEvent: ("retrieval", False),
+    SynthesizeStartEvent: ("synthesis", True),
+    SynthesizeEndEvent: ("synthesis", False),
+    EmbeddingStartEvent: ("embedding", True),
+    EmbeddingEndEvent: ("embedding", False),
+    LLMCompletionStartEvent: ("llm", True),
+    LLMCompletionEndEvent: ("llm", False),
+    LLMChatStartEvent: ("llm", True),
+    LLMChatEndEvent: ("llm", False),
+}
+
+STAGE_SECONDS = metrics.histogram(
+    "smsf_stage_duration_seconds", "Wall time per stage within one request or ingestion run",
+    ["operation", "stage"],
+)
+OPERATION_SECONDS = metrics.histogram(
+    "smsf_operation_duration_seconds", "Wall time per request or ingestion run", ["operation"]
+)
+LLM_CALLS_PER_OPERATION = metrics.histogram(
+    "smsf_llm_calls_per_operation", "LLM calls per request or ingestion run", ["operation"], buckets=COUNT_BUCKETS
+)
+RETRIEVED_NODES = metrics.histogram(
+    "smsf_retrieved_nodes", "Nodes passed to synthesis per request", ["operation"], buckets=COUNT_BUCKETS
+)
+LLM_CALLS = metrics.counter("smsf_llm_calls_total", "Finished LLM completion/chat calls")
+LLM_TOKENS = metrics.counter("smsf_llm_tokens_total", "LLM tokens (API usage, else tokenizer count)", ["type"])
+EMBEDDED_TEXTS = metrics.counter("smsf_embedded_texts_total", "Texts embedded (cache hits included)")
+
+
+class StageTimings:
+    """
+    What one request (or ingestion run) spent per stage. Stage time is the
+    union of its intervals, so nested or concurrent calls (fan-out searches)
+    count as wall time once.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retrieved_nodes = None
+        self._intervals = defaultdict(list)
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def open(self, key, at: float):
+        with self._lock:
+            self._open[key] = at
+
+    def close(self, key, stage: str, at: float):
+        with self._lock:
+            started = self._open.pop(key, None)
+            if started is not None:
+                self._intervals[stage].append((started, at))
+
+    def add(self, stage: str, started: float, ended: float):
+        with self._lock:
+            self._intervals[stage].append((started, ended))
+
+    def stage_seconds(self) -> Dict[str, float]:
+        with self._lock:
+            intervals = {stage: sorted(spans) for stage, spans in self._intervals.items()}
+        seconds = {}
+        for stage, spans in intervals.items():
+            total, current_start, current_end = 0.0, None, None
+            for start, end in spans:
+                if current_end is None or start > current_end:
+                    if current_end is not None:
+                        total += current_end - current_start
+                    current_start, current_end = start, end
+                else:
+                    current_end = max(current_end, end)
+            if current_end is not None:
+                total += current_end - current_start
+            seconds[stage] = total
+        return seconds
+
+    def breakdown(self) -> dict:
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        report = {
+            "total_ms": round(1000 * elapsed, 1),
+            "stages_ms": {stage: round(1000 * s, 1) for stage, s in self.stage_seconds().items()},
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+        if self.retrieved_nodes is not None:
+            report["retrieved_nodes"] = self.retrieved_nodes
+        return report
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (shown per request in browser dev tools)."""
+        report = self.breakdown()
+        parts = [f"{stage};dur={ms}" for stage, ms in report["stages_ms"].items()]
+        parts.append(f'llm_calls;desc="{self.llm_calls} calls, {self.prompt_tokens}+{self.completion_tokens} tokens"')
+        parts.append(f"total;dur={report['total_ms']}")
+        return ", ".join(parts)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        for stage, seconds in self.stage_seconds().items():
+            STAGE_SECONDS.observe(seconds, operation=self.operation, stage=stage)
+        OPERATION_SECONDS.observe(self.elapsed, operation=self.operation)
+        LLM_CALLS_PER_OPERATION.observe(self.llm_calls, operation=self.operation)
+        if self.retrieved_nodes is not None:
+            RETRIEVED_NODES.observe(self.retrieved_nodes, operation=self.operation)
+
+
+_active_timings = contextvars.ContextVar("stage_timings", default=())
+
+
+def _llm_tokens(event) -> Tuple[int, int]:
+    """(prompt, completion) tokens: the API's usage when reported, else counted with the tokenizer."""
+    response = event.response
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is not None:
+        read = usage.get if isinstance(usage, dict) else (lambda key: getattr(usage, key, None))
+        if read("prompt_tokens") is not None and read("completion_tokens") is not None:
+            return int(read("prompt_tokens")), int(read("completion_tokens"))
+    tokenizer = get_tokenizer()
+    if isinstance(event, LLMChatEndEvent):
+        prompt = "\n".join(str(m.content or "") for m in event.messages)
+        completion = str(response.message.content or "") if response is not None else ""
+    else:
+        prompt, completion = event.prompt, (response.text if response is not None else "")
+    return len(tokenizer(prompt)), len(tokenizer(completion or ""))
+
+
+class _PipelineEventHandler(BaseEventHandler):
+    """Feeds stage intervals, LLM calls/tokens and node counts to the active StageTimings and the global counters."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PipelineEventHandler"
+
+    def handle(self, event, **kwargs):
+        stage = _STAGE_EVENTS.get(type(event))
+        if stage is None:
+            return
+        name, is_start = stage
+        now = time.perf_counter()
+        scopes = _active_timings.get()
+        key = (event.span_id, name)
+        if is_start:
+            for timings in scopes:
+                timings.open(key, now)
+            return
+        for timings in scopes:
+            timings.close(key, name, now)
+
+        if name == "llm":
+            prompt_tokens, completion_tokens = _llm_tokens(event)
+            LLM_CALLS.inc()
+            LLM_TOKENS.inc(prompt_tokens, type="prompt")
+            LLM_TOKENS.inc(completion_tokens, type="completion")
+            for timings in scopes:
+                timings.llm_calls += 1
+                timings.prompt_tokens += prompt_tokens
+                timings.completion_tokens += completion_tokens
+        elif name == "embedding":
+            EMBEDDED_TEXTS.inc(len(event.chunks))
+        elif name == "synthesis":
+            nodes = len(getattr(event.response, "source_nodes", None) or [])
+            for timings in scopes:
+                timings.retrieved_nodes = (timings.retrieved_nodes or 0) + nodes
+
+
+get_dispatcher().add_event_handler(_PipelineEventHandler())
+
+
+@contextmanager
+def track_stages(operation: str):
+    """
+    Records per-stage wall time, LLM calls/tokens and retrieved nodes for the
+    block (awaited sub-tasks and asyncio.to_thread included) and observes them
+    in /api/metrics on exit under `operation`. `timings.operation` may be
+    changed inside the block (e.g. once the route is known).
+    """
+    timings = StageTimings(operation)
+    token = _active_timings.set(_active_timings.get() + (timings,))
+    try:
+        yield timings
+    finally:
+        _active_timings.reset(token)
+        timings.finish()
+
+
+@contextmanager
+def stage(name: str):
+    """Times a stage LlamaIndex has no events for (router selection, chunking, upserts)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        for timings in _active_timings.get():
+            timings.add(name, started, ended)
+
+
+def instrumented(operation: str):
+    """track_stages() around every call of a (sync or async) function, e.g. the ingestion entry points."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_stages(operation):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stages(operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
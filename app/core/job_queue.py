@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _iso(ts: Optional[float]):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts else None
+
+
+class JobQueue:
+    """
+    Durable ingestion job queue on one SQLite table, shared by the API (which
+    only enqueues and reads) and worker processes (which claim and run jobs).
+
+    - claim() hands out the oldest due job, at most `max_running` at a time
+      across all workers, and takes a lease renewed by heartbeat(); a job whose
+      worker died (lease expired) is handed out again.
+    - fail() requeues with exponential backoff until max_attempts is reached.
+    - cancel() drops a queued job at once; a running one is flagged and the
+      worker stops it at its next heartbeat.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 120.0, clock=time.time):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL, progress REAL NOT NULL DEFAULT 0,"
+            " message TEXT, error TEXT, result TEXT, worker_id TEXT,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL, run_after REAL NOT NULL,"
+            " started_at REAL, finished_at REAL, heartbeat_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, run_after)")
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            # IMMEDIATE: two workers never claim the same job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _row(self, job_id: str):
+        return self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = 3, job_id: str = None) -> dict:
+        now = self._clock()
+        job_id = job_id or uuid.uuid4().hex
+        with self._transaction():
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at, updated_at, run_after)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now),
+            )
+            return self._to_dict(self._row(job_id))
+
+    def claim(self, worker_id: str, max_running: int = None, kinds: List[str] = None) -> Optional[dict]:
+        """Marks the next due job running for worker_id and returns it (None if nothing to do)."""
+        now = self._clock()
+        with self._transaction():
+            # Workers that stopped heartbeating lose their jobs (the attempt counts)
+            self._db.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, updated_at = ?,"
+                " error = 'worker lease expired' WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, now, RUNNING, now - self._lease_seconds),
+            )
+            self._db.execute(
+                "UPDATE jobs SET status = CASE WHEN cancel_requested THEN ? ELSE ? END,"
+                " finished_at = ?, updated_at = ? WHERE status = ? AND error = 'worker lease expired'"
+                " AND (cancel_requested OR attempts >= max_attempts)",
+                (CANCELLED, FAILED, now, now, QUEUED),
+            )
+            if max_running is not None:
+                running = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+                if running >= max_running:
+                    return None
+            query = "SELECT id FROM jobs WHERE status = ? AND run_after <= ?"
+            params = [QUEUED, now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params += kinds
+            row = self._db.execute(query + " ORDER BY run_after, created_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?, started_at = ?,"
+                " heartbeat_at = ?, updated_at = ?, progress = 0, message = NULL WHERE id = ?",
+                (RUNNING, worker_id, now, now, now, row["id"]),
+            )
+            return self._to_dict(self._row(row["id"]))
+
+    def heartbeat(self, job_id: str, progress: float = None, message: str = None) -> bool:
+        """Renews the lease (and records progress); returns True if cancellation was requested."""
+        now = self._clock()
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ?, updated_at = ?,"
+                " progress = COALESCE(?, progress), message = COALESCE(?, message)"
+                " WHERE id = ? AND status = ?",
+                (now, now, progress, message, job_id, RUNNING),
+            )
+            row = self._row(job_id)
+        return bool(row and row["cancel_requested"])
+
+    def complete(self, job_id: str, result: dict = None):
+        now = self._clock()
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET status = ?, progress = 1, result = ?, error = NULL,"
+                " finished_at = ?, updated_at = ? WHERE id = ?",
+                (SUCCEEDED, json.dumps(result or {}), now, now, job_id),
+            )
+
+    def fail(self, job_id: str, error: str, backoff_seconds: float = 30.0) -> dict:
+        """Requeues with exponential backoff, or marks the job failed after max_attempts."""
+        now = self._clock()
+        with self._transaction():
+            row = self._row(job_id)
+            if row["attempts"] < row["max_attempts"] and not row["cancel_requested"]:
+                delay = backoff_seconds * 2 ** (row["attempts"] - 1)
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, run_after = ?,"
+                    " updated_at = ? WHERE id = ?",
+                    (QUEUED, error, now + delay, now, job_id),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, error, now, now, job_id),
+                )
+            return self._to_dict(self._row(job_id))
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancels a queued job, or asks the worker to stop a running one. None if unknown."""
+        now = self._clock()
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+                (now, job_id, RUNNING),
+            )
+            row = self._row(job_id)
+        return self._to_dict(row) if row else None
+
+    def release(self, job_id: str):
+        """Puts a running job back in the queue without counting the attempt (worker shutdown)."""
+        now = self._clock()
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), worker_id = NULL,"
+                " run_after = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, now, now, job_id, RUNNING),
+            )
+
+    def mark_cancelled(self, job_id: str):
+        now = self._clock()
+        with self._transaction():
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (CANCELLED, now, now, job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._row(job_id)
+        return self._to_dict(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50) -> List[dict]:
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query, params = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def succeeded_since(self, since: float) -> List[dict]:
+        """Jobs that succeeded after `since` (epoch seconds), oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? AND finished_at > ? ORDER BY finished_at",
+                (SUCCEEDED, since),
+            ).fetchall()
+        return [dict(self._to_dict(row), finished_ts=row["finished_at"]) for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "progress": round(row["progress"], 3),
+            "message": row["message"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "cancel_requested": bool(row["cancel_requested"]),
+            "created_at": _iso(row["created_at"]),
+            "started_at": _iso(row["started_at"]),
+            "finished_at": _iso(row["finished_at"]),
+            "next_attempt_at": _iso(row["run_after"]) if row["status"] == QUEUED else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class FinishedJobWatcher:
+    """
+    Runs in the API process: workers bump index generations in their own
+    process, so the API polls for jobs that succeeded and bumps the fund's
+    generation here, making cached engines/answers for that fund stale.
+    """
+
+    def __init__(self, queue: JobQueue, generations, interval: float = 2.0, clock=time.time):
+        self._queue = queue
+        self._generations = generations
+        self._interval = interval
+        self._since = clock()
+        self._task = None
+
+    def poll(self) -> int:
+        jobs = self._queue.succeeded_since(self._since)
+        for job in jobs:
+            self._generations.bump(job["payload"].get("fund_id"))
+            self._since = max(self._since, job["finished_ts"])
+        return len(jobs)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                print(f"Job watcher error: {e}")
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
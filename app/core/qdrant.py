@@ -0,0 +1,340 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+import qdrant_client
+from qdrant_client import models
+
+from app.core import bm25
+from app.core.config import embedding_dimensions, settings
+
+
+class QdrantClientRegistry:
+    """
+    One sync + one async Qdrant client per process, created on first use and
+    shared by the API (lifespan, routes) and the ingestion modules.
+    Connection pooling/gRPC come from qdrant-client itself (pool_size, prefer_grpc).
+    """
+
+    def __init__(self, url: str, api_key: str, prefer_grpc: bool = False,
+                 grpc_port: int = 6334, timeout: int = 60, pool_size: int = None):
+        self._options = dict(
+            url=url,
+            api_key=api_key,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+            timeout=timeout,
+            pool_size=pool_size,
+        )
+        self._lock = threading.Lock()
+        self._client = None
+        self._aclient = None
+
+    @classmethod
+    def from_settings(cls, app_settings=settings) -> "QdrantClientRegistry":
+        return cls(
+            url=app_settings.QDRANT_URL,
+            api_key=app_settings.QDRANT_API_KEY,
+            prefer_grpc=app_settings.QDRANT_PREFER_GRPC,
+            grpc_port=app_settings.QDRANT_GRPC_PORT,
+            timeout=app_settings.QDRANT_TIMEOUT,
+            pool_size=app_settings.QDRANT_POOL_SIZE,
+        )
+
+    @property
+    def client(self) -> qdrant_client.QdrantClient:
+        with self._lock:
+            if self._client is None:
+                self._client = qdrant_client.QdrantClient(**self._options)
+            return self._client
+
+    @property
+    def aclient(self) -> qdrant_client.AsyncQdrantClient:
+        with self._lock:
+            if self._aclient is None:
+                self._aclient = qdrant_client.AsyncQdrantClient(**self._options)
+            return self._aclient
+
+    async def aclose(self):
+        with self._lock:
+            client, aclient = self._client, self._aclient
+            self._client = self._aclient = None
+        if aclient is not None:
+            await aclient.close()
+        if client is not None:
+            client.close()
+
+    def close(self):
+        with self._lock:
+            client = self._client
+            self._client = None
+        if client is not None:
+            client.close()
+
+
+# Process-wide registry; main.py's lifespan closes it on shutdown
+qdrant_registry = QdrantClientRegistry.from_settings()
+
+
+def quantization_config(app_settings=settings):
+    """Qdrant quantization for QDRANT_QUANTIZATION, or None for full precision."""
+    mode = app_settings.QDRANT_QUANTIZATION
+    if mode == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+        ))
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if mode != "none":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION: {mode!r}")
+    return None
+
+
+def search_params(app_settings=settings):
+    """
+    Query-time counterpart of quantization_config(): search the quantized
+    vectors, then rescore `oversampling` x top_k candidates with the originals.
+    """
+    if quantization_config(app_settings) is None:
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=app_settings.QDRANT_QUANTIZATION_RESCORE,
+        oversampling=app_settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+    ))
+
+
+def vector_store_options(app_settings=settings) -> dict:
+    """
+    Extra QdrantVectorStore kwargs for the configured RETRIEVAL_MODE and
+    quantization. Used by ingestion (sparse vectors are written with each
+    point, new collections are created quantized) and by the API.
+    """
+    options = {}
+    quantization = quantization_config(app_settings)
+    if quantization is not None:
+        options["quantization_config"] = quantization
+    if app_settings.RETRIEVAL_MODE != "hybrid":
+        return options
+    return dict(
+        options,
+        enable_hybrid=True,
+        sparse_doc_fn=bm25.bm25_doc_encoder,
+        sparse_query_fn=bm25.bm25_query_encoder,
+        hybrid_fusion_fn=partial(bm25.reciprocal_rank_fusion, k=app_settings.HYBRID_RRF_K),
+        sparse_config=bm25.sparse_vector_params(),
+    )
+
+
+class HealthProbe:
+    """
+    Checks Qdrant in the background every `interval` seconds and keeps the
+    last result, so /api/health answers from memory instead of doing a
+    network round trip per request.
+    """
+
+    def __init__(self, registry: QdrantClientRegistry, interval: float = 15.0, timeout: float = 5.0):
+        self._registry = registry
+        self._interval = interval
+        self._timeout = timeout
+        self._task = None
+        self._result = {"status": "starting", "checks": {"vector_db": "not yet probed"}}
+        self._checked_at = None
+        self._checked_at_iso = None
+
+    async def probe_once(self) -> dict:
+        try:
+            await asyncio.wait_for(self._registry.aclient.get_collections(), timeout=self._timeout)
+            result = {"status": "healthy", "checks": {"vector_db": "connected"}}
+        except Exception as e:
+            result = {"status": "unhealthy", "checks": {"vector_db": f"error: {str(e) or type(e).__name__}"}}
+        self._result = result
+        self._checked_at = time.monotonic()
+        self._checked_at_iso = datetime.now(timezone.utc).isoformat()
+        return result
+
+    async def _run(self):
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self._interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # wait_for in probe_once can swallow a cancel that lands as the
+            # probe completes (Python < 3.12); cancel again until the task ends
+            while not self._task.done():
+                self._task.cancel()
+                await asyncio.wait({self._task}, timeout=1.0)
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        snapshot = {"status": self._result["status"], "checks": dict(self._result["checks"])}
+        if self._checked_at is not None:
+            snapshot["checked_at"] = self._checked_at_iso
+            snapshot["age_seconds"] = round(time.monotonic() - self._checked_at, 3)
+        return snapshot
+
+
+# Payload keys the query filters use. fund_id is the tenant key: Qdrant keeps
+# each fund's points together on disk and, with payload_m, builds per-fund
+# HNSW links so a filtered search stays inside that fund's graph.
+PAYLOAD_INDEXES = {
+    "fund_id": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+    "doc_type": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD),
+    "category": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD),
+}
+
+
+def _index_matches(info, params: models.KeywordIndexParams) -> bool:
+    if info is None or info.data_type != models.PayloadSchemaType.KEYWORD:
+        return False
+    return bool(getattr(info.params, "is_tenant", False)) == bool(params.is_tenant)
+
+
+class CollectionBootstrap:
+    """
+    Makes sure a collection has the payload indexes its filters need and the
+    configured HNSW settings and quantization, and reports what it found.
+    Collections are created by QdrantVectorStore on first upsert, so this runs
+    at startup and again after ingestion; a verified collection is not
+    checked again. A collection whose vector size is not the configured
+    embedding size is reported as "dimension_mismatch" (it needs a re-ingest).
+    """
+
+    def __init__(self, registry: QdrantClientRegistry, indexes=PAYLOAD_INDEXES, hnsw_m: int = 16,
+                 payload_m: int = 16, enabled: bool = True, quantization=None,
+                 originals_on_disk: bool = True, vector_size: int = None):
+        self._registry = registry
+        self._indexes = indexes
+        self._hnsw_m = hnsw_m
+        self._payload_m = payload_m
+        self._enabled = enabled
+        self._quantization = quantization
+        self._originals_on_disk = originals_on_disk
+        self._vector_size = vector_size
+        self._lock = threading.Lock()
+        self._verified = {}
+
+    @classmethod
+    def from_settings(cls, registry: QdrantClientRegistry = None, app_settings=settings) -> "CollectionBootstrap":
+        return cls(
+            registry or qdrant_registry,
+            hnsw_m=app_settings.QDRANT_HNSW_M,
+            payload_m=app_settings.QDRANT_HNSW_PAYLOAD_M,
+            enabled=app_settings.QDRANT_PAYLOAD_INDEXES,
+            quantization=quantization_config(app_settings),
+            originals_on_disk=app_settings.QDRANT_ORIGINALS_ON_DISK,
+            vector_size=embedding_dimensions(app_settings),
+        )
+
+    def ensure(self, collection_name: str, client: qdrant_client.QdrantClient = None) -> dict:
+        """
+        Creates missing indexes / updates HNSW config; returns a report dict.
+        Indexes only speed up filtered search, so a failure is logged, not raised.
+        """
+        try:
+            return self._ensure(collection_name, client)
+        except Exception as e:
+            print(f"⚠️  Could not verify Qdrant collection {collection_name}: {e}")
+            return {"collection": collection_name, "status": "error", "error": str(e)}
+
+    def ensure_vector_store(self, vector_store) -> dict:
+        """ensure() for a QdrantVectorStore, with the client it writes through."""
+        return self.ensure(vector_store.collection_name, client=vector_store.client)
+
+    def _ensure(self, collection_name: str, client) -> dict:
+        report = {"collection": collection_name, "status": "disabled"}
+        if not self._enabled:
+            return report
+        client = client or self._registry.client
+        key = (id(client), collection_name)
+        with self._lock:
+            if key in self._verified:
+                return self._verified[key]
+
+        if not client.collection_exists(collection_name):
+            # Created by the first upsert; checked again after ingestion
+            return dict(report, status="missing")
+
+        info = client.get_collection(collection_name)
+        created = []
+        for field, params in self._indexes.items():
+            if not _index_matches(info.payload_schema.get(field), params):
+                client.create_payload_index(collection_name, field, field_schema=params, wait=True)
+                created.append(field)
+
+        hnsw = info.config.hnsw_config
+        hnsw_updated = hnsw.m != self._hnsw_m or hnsw.payload_m != self._payload_m
+        if hnsw_updated:
+            # Qdrant rebuilds the HNSW graph in the background
+            client.update_collection(
+                collection_name, hnsw_config=models.HnswConfigDiff(m=self._hnsw_m, payload_m=self._payload_m)
+            )
+
+        vectors = info.config.params.vectors
+        if isinstance(vectors, models.VectorParams):
+            vector_name, dense = "", vectors
+        else:
+            vector_name, dense = next(iter((vectors or {}).items()), (None, None))
+        quantization_updated = self._update_quantization(client, collection_name, info, vector_name, dense)
+
+        status = "ok"
+        vector_size = getattr(dense, "size", None)
+        if self._vector_size and vector_size and vector_size != self._vector_size:
+            # Queries embedded at the configured size would be rejected by Qdrant
+            status = "dimension_mismatch"
+            print(f"⚠️  {collection_name} stores {vector_size}-dim vectors but EMBED_DIMENSIONS "
+                  f"gives {self._vector_size}: re-ingest it")
+        report = {
+            "collection": collection_name,
+            "status": status,
+            "points": info.points_count,
+            "vector_size": vector_size,
+            "distance": str(getattr(dense, "distance", None)),
+            "created_indexes": created,
+            "hnsw_updated": hnsw_updated,
+            "quantization": _quantization_kind(self._quantization),
+            "quantization_updated": quantization_updated,
+        }
+        if created or hnsw_updated or quantization_updated:
+            print(f"🗂️  {collection_name}: created payload indexes {created}, hnsw updated: {hnsw_updated}, "
+                  f"quantization updated: {quantization_updated}")
+        with self._lock:
+            self._verified[key] = report
+        return report
+
+    def _update_quantization(self, client, collection_name: str, info, vector_name, dense) -> bool:
+        """Brings an existing collection to the configured quantization (Qdrant re-quantizes in the background)."""
+        current = _quantization_kind(info.config.quantization_config)
+        wanted = _quantization_kind(self._quantization)
+        changes = {}
+        if current != wanted:
+            changes["quantization_config"] = self._quantization or models.Disabled.DISABLED
+        # With a quantized copy in RAM the originals are only read to rescore
+        if wanted != "none" and self._originals_on_disk and dense is not None and not dense.on_disk:
+            changes["vectors_config"] = {vector_name: models.VectorParamsDiff(on_disk=True)}
+        if changes:
+            client.update_collection(collection_name, **changes)
+        return bool(changes)
+
+
+def _quantization_kind(config) -> str:
+    if isinstance(config, models.ScalarQuantization):
+        return "scalar"
+    if isinstance(config, models.BinaryQuantization):
+        return "binary"
+    if isinstance(config, models.ProductQuantization):
+        return "product"
+    return "none"
+
+
+collection_bootstrap = CollectionBootstrap.from_settings()
@@ -1,35 +1,29 @@
-import qdrant_client
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from llama_index.core import VectorStoreIndex, StorageContext
-from app.core.config import settings
+from app.core.qdrant import qdrant_registry, vector_store_options
 
-# 1. Initialize the Actual Qdrant Client (pointing to Cloud)
-client = qdrant_client.QdrantClient(
-    url=settings.QDRANT_URL,
-    api_key=settings.QDRANT_API_KEY,
-    timeout=60
-)
+# The collection the API answers from (legislation, rulings and deeds told
+# apart by doc_type); the ingestion collections are opened in app.engine.fanout
+SERVED_COLLECTION = "smsf_documents"
 
-# 2. Define the Vector Store
-# This is where the 'not defined' error was happening
-vector_store = QdrantVectorStore(
-    client=client, 
-    collection_name="smsf_docs"
-)
 
-# 3. Setup Storage Context
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
+def build_served_index(registry=qdrant_registry) -> VectorStoreIndex:
+    """
+    The served collection as a VectorStoreIndex, built by main.py's lifespan.
+    Nothing here runs at import: opening the store is a Qdrant round trip, and
+    the index takes Settings.embed_model, so app.core.config.configure_models()
+    must have run first.
+    """
+    # 1. Shared clients (the async one keeps aquery() off the event loop)
+    vector_store = QdrantVectorStore(
+        client=registry.client,
+        aclient=registry.aclient,
+        collection_name=SERVED_COLLECTION,
+        **vector_store_options()
+    )
 
-# 4. Initialize Index
-# If you already have data in the cloud, use 'from_vector_store' 
-# to avoid re-uploading every time Render restarts.
-index = VectorStoreIndex.from_vector_store(
-    vector_store=vector_store,
-    storage_context=storage_context
-)
-
-# 5. Query Engine with Filters
-query_engine = index.as_query_engine(
-    similarity_top_k=6,
-    filters=None # We will define metadata filters during actual queries
-)
\ No newline at end of file
+    # 2. Existing points only: from_vector_store never re-uploads on restart
+    return VectorStoreIndex.from_vector_store(
+        vector_store=vector_store,
+        storage_context=StorageContext.from_defaults(vector_store=vector_store)
+    )
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.generations import GLOBAL_FUND_ID, index_generations, normalize_fund_id
+
+
+class _AnswerEntry:
+    __slots__ = ("fund_id", "vector", "payload", "generation", "llm_calls", "created_at")
+
+    def __init__(self, fund_id, vector, payload, generation, llm_calls, created_at):
+        self.fund_id = fund_id
+        self.vector = vector
+        self.payload = payload
+        self.generation = generation
+        self.llm_calls = llm_calls
+        self.created_at = created_at
+
+
+def _unit(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    LRU cache of answers looked up by cosine similarity of the question
+    embedding, scoped to one fund_id. Entries remember the index generations
+    of their fund and of 'global' (legislation/rulings) at the time they were
+    stored; if either has been bumped since, the entry no longer matches.
+    Generations only see ingests in this process (and worker jobs, via the
+    job watcher), so entries also expire after `ttl_seconds`: a re-ingest
+    run from the command line is picked up within that time.
+    """
+
+    def __init__(self, max_size: int = 1024, threshold: float = 0.95, ttl_seconds: float = 900.0,
+                 generations=index_generations, clock=time.monotonic):
+        self._max_size = max_size
+        self._threshold = threshold
+        self._ttl = ttl_seconds
+        self._generations = generations
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry_id -> _AnswerEntry (LRU order)
+        self._by_fund = {}             # fund_id -> set(entry_id)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_llm_calls = 0
+
+    def generation(self, fund_id: str):
+        """
+        The fund's and 'global' index generations now. Read it before running
+        the query and pass it to store(): a re-ingest during the query then
+        leaves the stored answer stale instead of current.
+        """
+        fund_key = normalize_fund_id(fund_id)
+        return (self._generations.get(fund_key), self._generations.get(GLOBAL_FUND_ID))
+
+    def lookup(self, fund_id: str, embedding):
+        """Returns the cached payload for the closest question, or None."""
+        fund_key = normalize_fund_id(fund_id)
+        generation = self.generation(fund_key)
+        query = _unit(embedding)
+        now = self._clock()
+
+        with self._lock:
+            best_id, best_score = None, self._threshold
+            for entry_id in list(self._by_fund.get(fund_key, ())):
+                entry = self._entries[entry_id]
+                if entry.generation != generation or (self._ttl > 0 and now - entry.created_at >= self._ttl):
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(entry.vector, query))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self.saved_llm_calls += entry.llm_calls
+            return entry.payload
+
+    def store(self, fund_id: str, embedding, payload: dict, llm_calls: int = 0, generation=None):
+        fund_key = normalize_fund_id(fund_id)
+        entry = _AnswerEntry(
+            fund_key, _unit(embedding), payload,
+            self.generation(fund_key) if generation is None else generation, llm_calls, self._clock(),
+        )
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._by_fund.setdefault(fund_key, set()).add(entry_id)
+            while len(self._entries) > self._max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        ids = self._by_fund.get(entry.fund_id)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_fund[entry.fund_id]
+        self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_fund.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "threshold": self._threshold,
+                "ttl_seconds": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "saved_llm_calls": self.saved_llm_calls,
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    max_size=settings.ANSWER_CACHE_MAX_SIZE,
+    threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Sequence
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeRelationship, NodeWithScore, QueryBundle
+
+from app.core.config import settings
+from app.core.docstore import DOCSTORE_FILE, SQLiteDocumentStore
+from app.core.instrumentation import stage
+
+# 128 -> 512 -> 2048: a leaf can be promoted twice
+MAX_MERGE_LEVELS = 2
+
+
+class ParentStore:
+    """
+    Parent nodes (the 512/2048-token levels of the ingestion hierarchy) by
+    id, read from the ingestion docstores: one indexed SQLite query per batch
+    of ids, nothing loaded at startup. A docstore that does not exist yet is
+    looked for again on the next lookup. Parents are cached (LRU); a
+    re-ingest gives new node ids, so cached entries never go stale.
+    """
+
+    def __init__(self, persist_dirs: Sequence[str], cache_size: int = 1024):
+        self._persist_dirs = list(persist_dirs)
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        self._stores: Dict[str, SQLiteDocumentStore] = {}
+        self._cache = OrderedDict()  # node_id -> parent node
+        self.hits = 0
+        self.misses = 0
+
+    def _open_stores(self) -> List[SQLiteDocumentStore]:
+        with self._lock:
+            for persist_dir in self._persist_dirs:
+                if persist_dir not in self._stores and os.path.exists(os.path.join(persist_dir, DOCSTORE_FILE)):
+                    self._stores[persist_dir] = SQLiteDocumentStore.from_persist_dir(persist_dir)
+            return list(self._stores.values())
+
+    def get_many(self, node_ids: Sequence[str]) -> Dict[str, BaseNode]:
+        """The parents found, by id; ids in no docstore are left out."""
+        found, missing = {}, []
+        with self._lock:
+            for node_id in node_ids:
+                node = self._cache.get(node_id)
+                if node is None:
+                    missing.append(node_id)
+                else:
+                    self._cache.move_to_end(node_id)
+                    found[node_id] = node
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return found
+
+        fetched = {}
+        for store in self._open_stores():
+            for node in store.get_nodes(missing, raise_error=False):
+                fetched[node.node_id] = node
+            missing = [node_id for node_id in missing if node_id not in fetched]
+            if not missing:
+                break
+        with self._lock:
+            for node_id, node in fetched.items():
+                self._cache[node_id] = node
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        found.update(fetched)
+        return found
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores, self._cache = {}, OrderedDict()
+
+
+def _parent_id(node: BaseNode):
+    parent = node.relationships.get(NodeRelationship.PARENT)
+    return parent.node_id if parent is not None else None
+
+
+class AutoMergeRetriever(BaseRetriever):
+    """
+    Flat leaf search, then promotes leaves to their parent when more than
+    `ratio` of the parent's children were retrieved (scored with the mean of
+    those children), and again one level up. A group of one leaf is never
+    promoted, so a single hit costs no lookup. Leaves whose parent is in no
+    docstore (e.g. points ingested elsewhere) are returned as they are.
+    """
+
+    def __init__(self, retriever: BaseRetriever, parents: ParentStore, ratio: float = 0.5, callback_manager=None):
+        super().__init__(callback_manager=callback_manager)
+        self._retriever = retriever
+        self._parents = parents
+        self._ratio = ratio
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.merge(self._retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._retriever.aretrieve(query_bundle)
+        # Parent lookups read SQLite; keep them off the event loop
+        return await asyncio.to_thread(self.merge, nodes)
+
+    def merge(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        checked = set()
+        with stage("auto_merge"):
+            for _ in range(MAX_MERGE_LEVELS):
+                groups = defaultdict(dict)
+                for node in nodes:
+                    parent_id = _parent_id(node.node)
+                    if parent_id is not None:
+                        groups[parent_id][node.node.node_id] = node
+                # Parents not promoted last level have the same hits now
+                candidates = [p for p, hits in groups.items() if len(hits) > 1 and p not in checked]
+                if not candidates:
+                    break
+                checked.update(candidates)
+                parents = self._parents.get_many(candidates)
+
+                merged, promoted = set(), []
+                for parent_id in candidates:
+                    parent = parents.get(parent_id)
+                    children = (parent.child_nodes or []) if parent is not None else []
+                    hits = groups[parent_id]
+                    if not children or len(hits) / len(children) <= self._ratio:
+                        continue
+                    merged.update(hits)
+                    scores = [hit.score or 0.0 for hit in hits.values()]
+                    promoted.append(NodeWithScore(node=parent, score=sum(scores) / len(scores)))
+                if not promoted:
+                    break
+                nodes = [node for node in nodes if node.node.node_id not in merged] + promoted
+        return sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+
+
+def merging_retriever(retriever: BaseRetriever, app_settings=settings) -> BaseRetriever:
+    """`retriever` as is in HIERARCHY_MODE "flat", wrapped in an AutoMergeRetriever in "auto_merging"."""
+    if app_settings.HIERARCHY_MODE == "flat":
+        return retriever
+    if app_settings.HIERARCHY_MODE != "auto_merging":
+        raise ValueError(f"Unknown HIERARCHY_MODE: {app_settings.HIERARCHY_MODE!r}")
+    return AutoMergeRetriever(retriever, parent_store, ratio=app_settings.AUTO_MERGE_RATIO)
+
+
+parent_store = ParentStore(
+    persist_dirs=[settings.LEGISLATION_PERSIST_DIR, settings.ATO_RULING_PERSIST_DIR, settings.TRUST_DEED_PERSIST_DIR],
+    cache_size=settings.PARENT_CACHE_SIZE,
+)
@@ -0,0 +1,109 @@
+import os
+import threading
+from typing import List, Optional
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from app.core.citation_index import CITATION_INDEX_FILE, CLAUSE, SECTION, CitationIndex, extract_citations
+from app.core.config import settings
+from app.core.docstore import SQLiteDocumentStore
+from app.core.generations import GLOBAL_FUND_ID, normalize_fund_id
+
+
+class _PersistedCitations:
+    """Citation index + docstore of one persist dir; the index is reloaded when ingestion rewrites it."""
+
+    def __init__(self, persist_dir: str):
+        self._persist_dir = persist_dir
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._index = CitationIndex()
+        self._docstore = None
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(os.path.join(self._persist_dir, CITATION_INDEX_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            self._index = CitationIndex.from_persist_dir(self._persist_dir)
+            if self._docstore is None:
+                # Nodes are read from SQLite on demand; the store never needs reloading
+                self._docstore = SQLiteDocumentStore.from_persist_dir(self._persist_dir)
+            self._mtime = mtime
+
+    def nodes(self, kind: str, scope: str, citation: str) -> list:
+        self._refresh()
+        node_ids = self._index.lookup(kind, scope, citation)
+        if not node_ids or self._docstore is None:
+            return []
+        return self._docstore.get_nodes(node_ids, raise_error=False)
+
+
+class CitationLookup:
+    """
+    Resolves questions that name a SIS section or deed clause to the cited
+    nodes (dict lookup + docstore fetch), found even when vector search
+    would rank the provision low.
+    """
+
+    def __init__(self, legislation_dir: str, trust_deed_dir: str, max_nodes: int = 8):
+        self._sources = {
+            SECTION: _PersistedCitations(legislation_dir),
+            CLAUSE: _PersistedCitations(trust_deed_dir),
+        }
+        self._max_nodes = max_nodes
+        self.hits = 0
+
+    def find_nodes(self, fund_id: str, question: str) -> list:
+        fund_id = normalize_fund_id(fund_id)
+        nodes, seen = [], set()
+        for kind, citation in extract_citations(question):
+            # Clauses only exist in a specific fund's deed
+            scope = GLOBAL_FUND_ID if kind == SECTION else fund_id
+            if kind == CLAUSE and scope == GLOBAL_FUND_ID:
+                continue
+            for node in self._sources[kind].nodes(kind, scope, citation):
+                if node.node_id not in seen:
+                    seen.add(node.node_id)
+                    nodes.append(NodeWithScore(node=node, score=1.0))
+        if nodes:
+            self.hits += 1
+        return nodes[:self._max_nodes]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits}
+
+
+citation_lookup = CitationLookup(
+    legislation_dir=settings.LEGISLATION_PERSIST_DIR,
+    trust_deed_dir=settings.TRUST_DEED_PERSIST_DIR,
+    max_nodes=settings.CITATION_MAX_NODES,
+)
+
+
+class CitationPinner(BaseNodePostprocessor):
+    """
+    Puts the nodes of the sections/clauses a question names ahead of the
+    retrieved nodes (score 1.0, so the context packer keeps them first).
+    Retrieval still runs: "Does my deed allow borrowing under s 67A?" gets
+    s 67A and the deed clauses the search found.
+    """
+
+    fund_id: str
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CitationPinner"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None):
+        if query_bundle is None:
+            return nodes
+        pinned = citation_lookup.find_nodes(self.fund_id, query_bundle.query_str)
+        if not pinned:
+            return nodes
+        pinned_ids = {n.node.node_id for n in pinned}
+        return pinned + [n for n in nodes if n.node.node_id not in pinned_ids]
@@ -0,0 +1,168 @@
+import hashlib
+import re
+from typing import List, Optional
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeRelationship, NodeWithScore, QueryBundle
+from llama_index.core.utils import get_tokenizer
+
+from app.core.config import settings
+from app.core.instrumentation import stage
+from app.core.metrics import metrics
+
+CONTEXT_TOKENS = metrics.histogram(
+    "smsf_context_tokens", "Context tokens per synthesis, as retrieved and as packed", ["phase"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+# Leaves this close (in characters of their parent's text) are one span
+ADJACENT_GAP = 2
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Span:
+    """Contiguous text from one parent: one leaf, or overlapping/adjacent leaves merged."""
+
+    __slots__ = ("node", "text", "start", "end", "score")
+
+    def __init__(self, node_with_score: NodeWithScore):
+        self.node = node_with_score.node
+        self.text = self.node.get_content()
+        # Documents (citation lookups of whole sections) carry no offsets
+        self.start = getattr(self.node, "start_char_idx", None)
+        self.end = getattr(self.node, "end_char_idx", None)
+        self.score = node_with_score.score
+
+    def extend(self, other: "_Span"):
+        """`other` starts at or before our end (+ ADJACENT_GAP); offsets are into the same parent."""
+        if other.end > self.end:
+            # Overlapping leaves repeat the overlap; touching leaves are joined with a space
+            if other.start < self.end:
+                self.text += other.text[self.end - other.start:]
+            else:
+                self.text += " " + other.text
+            self.end = other.end
+        if other.score is not None and (self.score is None or other.score > self.score):
+            self.score = other.score
+
+    def to_node(self) -> NodeWithScore:
+        if self.text == self.node.get_content():
+            return NodeWithScore(node=self.node, score=self.score)
+        node = self.node.model_copy(update={"text": self.text, "start_char_idx": self.start, "end_char_idx": self.end})
+        return NodeWithScore(node=node, score=self.score)
+
+
+def _parent_id(node) -> Optional[str]:
+    parent = node.relationships.get(NodeRelationship.PARENT)
+    return parent.node_id if parent is not None else None
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(_WHITESPACE.sub(" ", text).strip().lower().encode("utf-8")).hexdigest()
+
+
+class ContextPacker(BaseNodePostprocessor):
+    """
+    Turns retrieved leaves into one compact context for a single synthesis
+    call:
+    1. drops nodes scored below `score_cutoff` (the best node always stays;
+       None skips the cutoff),
+    2. drops repeated text (the same leaf from the served index and an
+       ingestion collection),
+    3. merges overlapping or adjacent 128-token leaves of the same parent
+       into one span, so the shared overlap and metadata header are sent once,
+    4. keeps the best-scored spans that fit `token_budget` (LLM-mode content,
+       metadata included, counted with the tokenizer).
+    """
+
+    score_cutoff: Optional[float] = None
+    token_budget: int = 3000
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextPacker"
+
+    @classmethod
+    def from_settings(cls, app_settings=settings, similarity_scores: bool = True) -> "ContextPacker":
+        """
+        CONTEXT_SCORE_CUTOFF is a cosine similarity: it is only applied to
+        dense search scores, not to RRF scores (hybrid, at most 1 / (k + 1))
+        or scores rescaled by the fan-out merge (similarity_scores=False).
+        """
+        cutoff = app_settings.CONTEXT_SCORE_CUTOFF
+        if not similarity_scores or app_settings.RETRIEVAL_MODE == "hybrid":
+            cutoff = None
+        return cls(score_cutoff=cutoff, token_budget=app_settings.CONTEXT_TOKEN_BUDGET)
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None):
+        if not nodes:
+            return nodes
+        with stage("context_packing"):
+            return self.pack(nodes)
+
+    def pack(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        tokenizer = get_tokenizer()
+        CONTEXT_TOKENS.observe(
+            sum(len(tokenizer(n.node.get_content(metadata_mode=MetadataMode.LLM))) for n in nodes), phase="retrieved"
+        )
+        ranked = sorted(nodes, key=lambda n: n.score if n.score is not None else float("inf"), reverse=True)
+
+        # 1. Score cutoff
+        kept = ranked
+        if self.score_cutoff is not None:
+            kept = [ranked[0]] + [n for n in ranked[1:] if n.score is None or n.score >= self.score_cutoff]
+
+        # 2. Exact duplicates
+        unique, seen = [], set()
+        for node in kept:
+            fingerprint = _fingerprint(node.node.get_content())
+            if node.node.node_id in seen or fingerprint in seen:
+                continue
+            seen.update((node.node.node_id, fingerprint))
+            unique.append(node)
+
+        # 3. Merge leaves of the same parent that overlap or touch
+        spans, by_parent = [], {}
+        for node in unique:
+            span, parent_id = _Span(node), _parent_id(node.node)
+            if parent_id is None or span.start is None or span.end is None:
+                spans.append(span)
+            else:
+                by_parent.setdefault(parent_id, []).append(span)
+        for siblings in by_parent.values():
+            siblings.sort(key=lambda s: s.start)
+            current = siblings[0]
+            for span in siblings[1:]:
+                if span.start <= current.end + ADJACENT_GAP:
+                    current.extend(span)
+                else:
+                    spans.append(current)
+                    current = span
+            spans.append(current)
+
+        # Text already contained in a better span (e.g. a leaf re-chunked into another collection)
+        spans.sort(key=lambda s: s.score if s.score is not None else float("inf"), reverse=True)
+        distinct = []
+        for span in spans:
+            folded = _WHITESPACE.sub(" ", span.text)
+            if not any(folded in _WHITESPACE.sub(" ", other.text) for other in distinct):
+                distinct.append(span)
+
+        # 4. Best spans first, while they fit the budget
+        packed, used = [], 0
+        for span in distinct:
+            node = span.to_node()
+            tokens = len(tokenizer(node.node.get_content(metadata_mode=MetadataMode.LLM)))
+            if packed and used + tokens > self.token_budget:
+                continue
+            packed.append(node)
+            used += tokens
+        CONTEXT_TOKENS.observe(used, phase="packed")
+        return packed
+
+
+def context_postprocessors(app_settings=settings, similarity_scores: bool = True) -> list:
+    """node_postprocessors for the query engines: the packer, unless CONTEXT_PACKING is off."""
+    if not app_settings.CONTEXT_PACKING:
+        return []
+    return [ContextPacker.from_settings(app_settings, similarity_scores=similarity_scores)]
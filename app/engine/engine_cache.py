@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.generations import index_generations, normalize_fund_id
+from app.core.instrumentation import stage
+
+
+class _CacheEntry:
+    __slots__ = ("engine", "vector_index", "generation", "created_at")
+
+    def __init__(self, engine, vector_index, generation, created_at):
+        self.engine = engine
+        self.vector_index = vector_index
+        self.generation = generation
+        self.created_at = created_at
+
+
+class QueryEngineCache:
+    """
+    Bounded, thread-safe LRU + TTL cache of query engines per fund_id
+    (streaming and non-streaming engines are cached separately).
+    An entry is only reused if it was built against the same vector index
+    and the fund's index generation has not been bumped since.
+    """
+
+    def __init__(self, builder, max_size: int = 128, ttl_seconds: float = 900.0,
+                 generations=index_generations, clock=time.monotonic):
+        self._builder = builder
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._generations = generations
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, fund_id: str, vector_index, streaming: bool = False):
+        fund_key = normalize_fund_id(fund_id)
+        key = (fund_key, streaming)
+        generation = self._generations.get(fund_key)
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, vector_index, generation, now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.engine
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+
+        # Build outside the lock so one slow fund doesn't block the others
+        with stage("engine_build"):
+            engine = self._builder(fund_id=fund_id, vector_index=vector_index, streaming=streaming)
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(engine, vector_index, generation, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return engine
+
+    def _is_fresh(self, entry, vector_index, generation, now) -> bool:
+        if entry.vector_index is not vector_index:
+            return False
+        if entry.generation != generation:
+            return False
+        return self._ttl <= 0 or (now - entry.created_at) < self._ttl
+
+    def invalidate(self, fund_id=None):
+        """Drops one fund's engine, or every engine when fund_id is None."""
+        with self._lock:
+            if fund_id is None:
+                self.evictions += len(self._entries)
+                self._entries.clear()
+            else:
+                fund_key = normalize_fund_id(fund_id)
+                for key in [k for k in self._entries if k[0] == fund_key]:
+                    del self._entries[key]
+                    self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _build_engine(fund_id: str, vector_index, streaming: bool = False):
+    # Imported lazily so this module stays cheap to import
+    from app.engine.query_engine import get_query_engine
+    return get_query_engine(fund_id=fund_id, vector_index=vector_index, streaming=streaming)
+
+
+query_engine_cache = QueryEngineCache(
+    builder=_build_engine,
+    max_size=settings.ENGINE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.ENGINE_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+
+from app.core.config import settings
+from app.core.generations import GLOBAL_FUND_ID, normalize_fund_id
+
+# Ingestion collections whose points belong to one fund (searched with a fund_id filter)
+FUND_SCOPED_COLLECTIONS = ("trust_deeds",)
+
+
+class SearchSource:
+    __slots__ = ("name", "retriever")
+
+    def __init__(self, name: str, retriever: BaseRetriever):
+        self.name = name
+        self.retriever = retriever
+
+
+def _filters(**values) -> MetadataFilters:
+    return MetadataFilters(filters=[ExactMatchFilter(key=k, value=v) for k, v in values.items()])
+
+
+def build_sources(fund_id: str, vector_index, collection_indexes: Dict[str, VectorStoreIndex],
+                  top_k: int = 5, **retriever_kwargs) -> List[SearchSource]:
+    """
+    Everything a question about `fund_id` may draw on: the served index
+    (legislation, rulings and the fund's deed, told apart by doc_type) and
+    each ingestion collection, the deed collection filtered to the fund.
+    """
+    private = normalize_fund_id(fund_id) != GLOBAL_FUND_ID
+    specs = [
+        ("public_law", vector_index, _filters(doc_type="legislation")),
+        ("rulings", vector_index, _filters(doc_type="ruling")),
+    ]
+    if private:
+        specs.append(("private_deed", vector_index, _filters(fund_id=fund_id, doc_type="trust_deed")))
+    for collection, index in collection_indexes.items():
+        if collection in FUND_SCOPED_COLLECTIONS:
+            if private:
+                specs.append((collection, index, _filters(fund_id=fund_id)))
+        else:
+            specs.append((collection, index, None))
+    return [
+        SearchSource(name, index.as_retriever(similarity_top_k=top_k, filters=filters, **retriever_kwargs))
+        for name, index, filters in specs
+    ]
+
+
+def normalize_scores(nodes: List[NodeWithScore], rrf_k: Optional[int] = None) -> List[float]:
+    """
+    One fixed 0-1 scale for every source, so an irrelevant source's best hit
+    stays low: cosine similarity as is (floored at 0), or with rrf_k (hybrid)
+    the fused score divided by the best possible one, 1 / (rrf_k + 1).
+    """
+    scale = 1.0 if rrf_k is None else rrf_k + 1
+    return [min(1.0, max(0.0, (n.score or 0.0) * scale)) for n in nodes]
+
+
+class FanOutRetriever(BaseRetriever):
+    """
+    Searches every source concurrently (so latency is that of the slowest
+    search, not the sum), then merges by score on one fixed scale (see
+    normalize_scores; pass rrf_k when the sources search in hybrid mode): the
+    best matches reach the single synthesis call, whichever source they come
+    from. The question is embedded once and the embedding shared. A failing
+    source is logged and skipped.
+    """
+
+    def __init__(self, sources: List[SearchSource], embed_model, top_k: int = 8, rrf_k: Optional[int] = None,
+                 callback_manager=None):
+        super().__init__(callback_manager=callback_manager)
+        self._sources = sources
+        self._embed_model = embed_model
+        self._top_k = top_k
+        self._rrf_k = rrf_k
+
+    @property
+    def source_names(self) -> List[str]:
+        return [s.name for s in self._sources]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None and query_bundle.embedding_strs:
+            query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+        results = []
+        with ThreadPoolExecutor(max_workers=len(self._sources) or 1) as pool:
+            futures = [pool.submit(s.retriever.retrieve, query_bundle) for s in self._sources]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        return self._merge(results)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None and query_bundle.embedding_strs:
+            query_bundle.embedding = await self._embed_model.aget_agg_embedding_from_queries(
+                query_bundle.embedding_strs
+            )
+        results = await asyncio.gather(
+            *(s.retriever.aretrieve(query_bundle) for s in self._sources), return_exceptions=True
+        )
+        return self._merge(results)
+
+    def _merge(self, results) -> List[NodeWithScore]:
+        ranked, failures = [], []
+        for source, result in zip(self._sources, results):
+            if isinstance(result, Exception):
+                print(f"⚠️  {source.name} search failed: {type(result).__name__}: {result}")
+                failures.append(result)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            for node, score in zip(result, normalize_scores(result, self._rrf_k)):
+                ranked.append((score, node.score or 0.0, node))
+        if self._sources and len(failures) == len(self._sources):
+            raise failures[0]
+
+        # Ties go to the higher raw score
+        ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        merged, seen = [], set()
+        for score, _, node in ranked:
+            if node.node.node_id in seen:
+                continue
+            seen.add(node.node.node_id)
+            merged.append(NodeWithScore(node=node.node, score=score))
+            if len(merged) == self._top_k:
+                break
+        return merged
+
+
+class CollectionIndexes:
+    """
+    Read-only index per ingestion collection (legislation, ato_rulings,
+    trust_deeds) for the fan-out, opened in the API lifespan. get() only reads
+    memory, so engine builds on the request path make no Qdrant round trips;
+    collections that do not exist yet are looked for again by a background
+    task every `recheck_seconds` until all are open.
+    """
+
+    def __init__(self, collections: List[str], recheck_seconds: float = 60.0):
+        self._collections = collections
+        self._recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        self._client = None
+        self._aclient = None
+        self._store_options = {}
+        self._indexes: Dict[str, VectorStoreIndex] = {}
+        self._task = None
+
+    def open(self, client, aclient=None, **store_options):
+        with self._lock:
+            self._client, self._aclient, self._store_options = client, aclient, store_options
+            self._indexes = {}
+        self.refresh()
+        return self.get()
+
+    def missing(self) -> List[str]:
+        with self._lock:
+            return [c for c in self._collections if c not in self._indexes]
+
+    def refresh(self):
+        """Opens the missing collections that exist now. Blocking Qdrant calls: keep off the event loop."""
+        with self._lock:
+            client, aclient, options = self._client, self._aclient, self._store_options
+        if client is None:
+            return
+        opened = {}
+        for collection in self.missing():
+            try:
+                if not client.collection_exists(collection):
+                    continue
+            except Exception as e:
+                print(f"⚠️  Could not look up collection {collection}: {e}")
+                continue
+            vector_store = QdrantVectorStore(collection_name=collection, client=client, aclient=aclient, **options)
+            opened[collection] = VectorStoreIndex.from_vector_store(vector_store)
+        with self._lock:
+            # Closed or reopened meanwhile: these indexes use the old clients
+            if self._client is client:
+                self._indexes.update(opened)
+
+    def get(self) -> Dict[str, VectorStoreIndex]:
+        with self._lock:
+            return dict(self._indexes)
+
+    async def _run(self):
+        while self.missing():
+            await asyncio.sleep(self._recheck_seconds)
+            await asyncio.to_thread(self.refresh)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def close(self):
+        await self.stop()
+        with self._lock:
+            self._client = self._aclient = None
+            self._indexes = {}
+
+
+collection_indexes = CollectionIndexes(
+    collections=[c.strip() for c in settings.FANOUT_COLLECTIONS.split(",") if c.strip()],
+    recheck_seconds=settings.FANOUT_RECHECK_SECONDS,
+)
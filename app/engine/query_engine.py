@@ -1,15 +1,18 @@
-
-
-from app.core.vectorstore import index as vector_index
-
-from llama_index.core.query_engine import RouterQueryEngine
+from llama_index.core.query_engine import RetrieverQueryEngine, RouterQueryEngine
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
 from llama_index.core.selectors import LLMSingleSelector
 from llama_index.core.vector_stores import MetadataFilters, ExactMatchFilter
-from llama_index.llms.openai import OpenAI
 from llama_index.core import Settings
+from llama_index.core.indices.empty import EmptyIndex
 
 from llama_index.core import PromptTemplate
+from app.core.config import settings
+from app.core.qdrant import search_params
+from app.engine.auto_merging import merging_retriever
+from app.engine.citation_lookup import CitationPinner
+from app.engine.context_packer import context_postprocessors
+from app.engine.fanout import FanOutRetriever, build_sources, collection_indexes
+from app.engine.router_selector import EmbeddingRouterSelector, TimedSelector
 
 SMSF_QA_PROMPT_TEXT = (
     "### ROLE\n"
@@ -65,21 +68,98 @@ SMSF_REFINE_PROMPT_TEXT = (
 
 SMSF_REFINE_PROMPT = PromptTemplate(SMSF_REFINE_PROMPT_TEXT)
 
-def get_smsf_query_engine(fund_id: str, vector_index):
+def build_router_selector(llm):
+    """LLM selector, or the embedding router with the LLM selector as tie-breaker."""
+    llm_selector = LLMSingleSelector.from_defaults(llm=llm)
+    if settings.ROUTER_MODE == "embedding":
+        return TimedSelector(EmbeddingRouterSelector.from_defaults(
+            fallback_selector=llm_selector,
+            margin_threshold=settings.ROUTER_MARGIN_THRESHOLD
+        ))
+    return TimedSelector(llm_selector)
+
+def retrieval_kwargs(top_k: int) -> dict:
+    """
+    Hybrid: exact citations ("s 67A", "Clause 12.4") come from the sparse side.
+    Quantized collections: Qdrant rescores the oversampled candidates.
+    """
+    kwargs = {}
+    params = search_params()
+    if params is not None:
+        kwargs["vector_store_kwargs"] = {"search_params": params}
+    if settings.RETRIEVAL_MODE != "hybrid":
+        return kwargs
+    return dict(
+        kwargs,
+        vector_store_query_mode="hybrid",
+        sparse_top_k=settings.HYBRID_SPARSE_TOP_K,
+        hybrid_top_k=top_k
+    )
+
+def answer_postprocessors(fund_id: str, similarity_scores: bool = True) -> list:
+    """Cited sections/clauses pinned ahead of the retrieved nodes, then context packing."""
+    pinned = [CitationPinner(fund_id=fund_id)] if settings.CITATION_INDEX_ENABLED else []
+    return pinned + context_postprocessors(similarity_scores=similarity_scores)
+
+def get_query_engine(fund_id: str, vector_index, streaming: bool = False):
+    """The engine for settings.QUERY_MODE ("fanout" or "router")."""
+    if settings.QUERY_MODE == "router":
+        return get_smsf_query_engine(fund_id=fund_id, vector_index=vector_index, streaming=streaming)
+    return get_fanout_query_engine(fund_id=fund_id, vector_index=vector_index, streaming=streaming)
+
+def get_fanout_query_engine(fund_id: str, vector_index, streaming: bool = False, collections=None):
+    """
+    Searches legislation, rulings and the fund's deed (in the served index
+    and the ingestion collections) concurrently and answers from the merged
+    nodes in one synthesis step; no routing call. `collections` defaults to
+    the ingestion collections opened at startup.
+    """
+    top_k = settings.FANOUT_TOP_K_PER_SOURCE
+    sources = build_sources(
+        fund_id, vector_index,
+        collection_indexes.get() if collections is None else collections,
+        top_k=top_k, **retrieval_kwargs(top_k)
+    )
+    # Leaves are promoted per source, before the cross-source merge
+    for source in sources:
+        source.retriever = merging_retriever(source.retriever)
+    retriever = FanOutRetriever(
+        sources, embed_model=vector_index._embed_model, top_k=settings.FANOUT_TOP_K,
+        rrf_k=settings.HYBRID_RRF_K if settings.RETRIEVAL_MODE == "hybrid" else None
+    )
+    return RetrieverQueryEngine.from_args(
+        retriever,
+        llm=Settings.llm,
+        # Merged scores are rescaled, so no absolute cutoff; FANOUT_TOP_K bounds the nodes
+        node_postprocessors=answer_postprocessors(fund_id, similarity_scores=False),
+        streaming=streaming,
+        text_qa_template=SMSF_QA_PROMPT,
+        refine_template=SMSF_REFINE_PROMPT
+    )
+
+def get_smsf_query_engine(fund_id: str, vector_index, streaming: bool = False):
     """
     Creates a router that switches between Public Law and Private Fund data.
     The vector_index is passed in from the FastAPI app state.
+    With streaming=True every tool returns a (Async)StreamingResponse.
+    Callers on the request path should go through
+    app.engine.engine_cache.query_engine_cache instead of calling this directly.
     """
     
-    # Configure global LLM settings
-    llm = OpenAI(model="gpt-4o-mini")
-    Settings.llm = llm
+    # Reuse the LLM configured in app.core.config (do not mutate global Settings)
+    llm = Settings.llm
+
+    # Hybrid: the fused top 5 replaces raising similarity_top_k
+    hybrid_kwargs = retrieval_kwargs(5)
 
     # Helper to build the underlying engine for each tool
     def create_compliant_engine(filters):
-        return vector_index.as_query_engine(
-            similarity_top_k=5,
-            filters=filters,
+        retriever = vector_index.as_retriever(similarity_top_k=5, filters=filters, **hybrid_kwargs)
+        return RetrieverQueryEngine.from_args(
+            merging_retriever(retriever),
+            llm=llm,
+            node_postprocessors=answer_postprocessors(fund_id),
+            streaming=streaming,
             text_qa_template=SMSF_QA_PROMPT,
             refine_template=SMSF_REFINE_PROMPT
         )
@@ -116,7 +196,8 @@ def get_smsf_query_engine(fund_id: str, vector_index):
         query_engine_tools.append(deed_tool)
     
     # 3. Fallback Tool (Always available)
-    fallback_engine = llm.as_query_engine()
+    # LLMs have no as_query_engine(); an EmptyIndex gives a plain LLM call
+    fallback_engine = EmptyIndex().as_query_engine(llm=llm, streaming=streaming)
     fallback_tool = QueryEngineTool(
         query_engine=fallback_engine,
         metadata=ToolMetadata(
@@ -127,8 +208,29 @@ def get_smsf_query_engine(fund_id: str, vector_index):
     query_engine_tools.append(fallback_tool)
 
     # 4. Final Router using the dynamically built list of tools
-    return RouterQueryEngine(
-        selector=LLMSingleSelector.from_defaults(),
+    router = RouterQueryEngine(
+        selector=build_router_selector(llm),
         query_engine_tools=query_engine_tools,
         verbose=True
-    )
\ No newline at end of file
+    )
+    # Selector results index into this list (tool order); see selected_tool_name
+    router.tool_metadatas = [tool.metadata for tool in query_engine_tools]
+    return router
+
+def selected_tool_name(engine: RouterQueryEngine, response):
+    """Name of the tool the router picked for this response, if known."""
+    result = (response.metadata or {}).get("selector_result")
+    tool_metadatas = getattr(engine, "tool_metadatas", None)
+    if result is None or not result.selections or tool_metadatas is None:
+        return None
+    return tool_metadatas[result.ind].name
+
+def describe_route(engine, response) -> dict:
+    """The "route" event of /ask/stream: the router's pick, or the sources a fan-out searched."""
+    if isinstance(engine, RouterQueryEngine):
+        selector_result = (response.metadata or {}).get("selector_result")
+        return {
+            "tool": selected_tool_name(engine, response),
+            "reason": selector_result.reason if selector_result else None,
+        }
+    return {"tool": "fanout", "reason": "searched " + ", ".join(engine.retriever.source_names)}
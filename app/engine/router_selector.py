@@ -0,0 +1,192 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.base_selector import BaseSelector, SelectorResult, SingleSelection
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.prompts.mixin import PromptDictType
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools.types import ToolMetadata
+
+from app.core.instrumentation import stage
+
+# Labelled exemplar questions per tool name. Each tool is scored by its best
+# match among its description and these exemplars.
+ROUTER_EXEMPLARS: Dict[str, List[str]] = {
+    "public_law": [
+        "What does the SIS Act say about borrowing?",
+        "What are the limited recourse borrowing arrangement rules in section 67A?",
+        "What is the in-house asset limit under the SIS Act?",
+        "Does the sole purpose test apply to a holiday home?",
+        "Can an SMSF acquire assets from a related party under section 66?",
+        "What do the SIS Regulations require for arm's length investments?",
+        "Which section of the SIS Act prohibits lending to members?",
+        "What are the covenants of trustees in section 52B?",
+    ],
+    "private_deed": [
+        "Does my trust deed allow the fund to borrow?",
+        "What does clause 12.4 of our deed say?",
+        "Does our fund's deed permit investing in property?",
+        "Is the trustee of my fund allowed to pay a pension under the deed?",
+        "Does the deed restrict lending to members?",
+        "Which deed clause covers contributions to my fund?",
+    ],
+    "fallback": [
+        "Hello",
+        "Hi there, thanks for your help",
+        "Good morning",
+        "What is superannuation?",
+        "Thank you",
+    ],
+}
+
+
+def _unit(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingRouterSelector(BaseSelector):
+    """
+    Routes by cosine similarity between the question and each tool's
+    description + labelled exemplar questions (embedded once and reused).
+    Only when the margin between the top two tools is below margin_threshold
+    do we fall back to the LLM selector.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        fallback_selector: Optional[BaseSelector] = None,
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        margin_threshold: float = 0.05,
+    ) -> None:
+        self._embed_model = embed_model
+        self._fallback_selector = fallback_selector
+        self._exemplars = ROUTER_EXEMPLARS if exemplars is None else exemplars
+        self._margin_threshold = margin_threshold
+        self._choice_vectors: Dict[tuple, np.ndarray] = {}
+        self.embedding_selections = 0
+        self.fallback_selections = 0
+
+    @classmethod
+    def from_defaults(
+        cls,
+        embed_model: Optional[BaseEmbedding] = None,
+        fallback_selector: Optional[BaseSelector] = None,
+        margin_threshold: float = 0.05,
+    ) -> "EmbeddingRouterSelector":
+        return cls(
+            embed_model=embed_model or Settings.embed_model,
+            fallback_selector=fallback_selector,
+            margin_threshold=margin_threshold,
+        )
+
+    def _get_prompts(self) -> Dict[str, Any]:
+        return {}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        pass
+
+    def _choice_texts(self, choice: ToolMetadata) -> List[str]:
+        return [choice.description] + list(self._exemplars.get(choice.name, []))
+
+    def _missing_choices(self, choices: Sequence[ToolMetadata]):
+        return [c for c in choices if (c.name, c.description) not in self._choice_vectors]
+
+    def _remember(self, choices, vectors):
+        offset = 0
+        for choice in choices:
+            n = len(self._choice_texts(choice))
+            self._choice_vectors[(choice.name, choice.description)] = _unit(vectors[offset:offset + n])
+            offset += n
+
+    def _ensure_choice_vectors(self, choices: Sequence[ToolMetadata]) -> None:
+        missing = self._missing_choices(choices)
+        if missing:
+            texts = [t for c in missing for t in self._choice_texts(c)]
+            self._remember(missing, self._embed_model.get_text_embedding_batch(texts))
+
+    async def _aensure_choice_vectors(self, choices: Sequence[ToolMetadata]) -> None:
+        missing = self._missing_choices(choices)
+        if missing:
+            texts = [t for c in missing for t in self._choice_texts(c)]
+            self._remember(missing, await self._embed_model.aget_text_embedding_batch(texts))
+
+    def _score(self, choices: Sequence[ToolMetadata], query_embedding) -> np.ndarray:
+        query = _unit(query_embedding)[0]
+        return np.array([
+            float(np.max(self._choice_vectors[(c.name, c.description)] @ query))
+            for c in choices
+        ])
+
+    def _decide(self, choices: Sequence[ToolMetadata], query_embedding) -> Optional[SelectorResult]:
+        """Returns a selection, or None if the margin is too small to trust."""
+        scores = self._score(choices, query_embedding)
+        order = np.argsort(-scores)
+        top = int(order[0])
+        margin = float(scores[top] - scores[order[1]]) if len(choices) > 1 else float("inf")
+        if margin < self._margin_threshold and self._fallback_selector is not None:
+            return None
+
+        self.embedding_selections += 1
+        reason = (
+            f"Embedding router: {choices[top].name} "
+            f"(similarity {scores[top]:.2f}, margin {margin:.2f})"
+        )
+        return SelectorResult(selections=[SingleSelection(index=top, reason=reason)])
+
+    def _select(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        self._ensure_choice_vectors(choices)
+        if query.embedding is None:
+            # Stored on the bundle so the retriever does not embed the question again
+            query.embedding = self._embed_model.get_query_embedding(query.query_str)
+
+        result = self._decide(choices, query.embedding)
+        if result is None:
+            self.fallback_selections += 1
+            return self._fallback_selector.select(choices, query)
+        return result
+
+    async def _aselect(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        if query.embedding is None:
+            query.embedding, _ = await asyncio.gather(
+                self._embed_model.aget_query_embedding(query.query_str),
+                self._aensure_choice_vectors(choices),
+            )
+        else:
+            await self._aensure_choice_vectors(choices)
+
+        result = self._decide(choices, query.embedding)
+        if result is None:
+            self.fallback_selections += 1
+            return await self._fallback_selector.aselect(choices, query)
+        return result
+
+
+class TimedSelector(BaseSelector):
+    """Wraps a selector so its time shows up as the router_selection stage in /api/metrics."""
+
+    def __init__(self, selector: BaseSelector) -> None:
+        self._selector = selector
+
+    @property
+    def selector(self) -> BaseSelector:
+        return self._selector
+
+    def _get_prompts(self) -> Dict[str, Any]:
+        return self._selector.get_prompts()
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        self._selector.update_prompts(prompts)
+
+    def _select(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        with stage("router_selection"):
+            return self._selector.select(choices, query)
+
+    async def _aselect(self, choices: Sequence[ToolMetadata], query: QueryBundle) -> SelectorResult:
+        with stage("router_selection"):
+            return await self._selector.aselect(choices, query)
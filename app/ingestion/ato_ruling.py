@@ -1,17 +1,17 @@
 # ingestion/ato_ruling.py
+import asyncio
 import os
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core import SimpleDirectoryReader
+from .embedding_scheduler import aembed_and_upsert
 from .utils import get_storage_context, get_parent_child_nodes
 from .sis_act import download_from_spaces # Reuse the downloader
+from app.core.config import settings
+from app.core.qdrant import collection_bootstrap
+from app.core.instrumentation import instrumented, stage
+from app.core.generations import index_generations, GLOBAL_FUND_ID
 
-def ingest_ato_ruling(remote_key: str, ruling_id: str):
-    local_path = f"./data/temp_{os.path.basename(remote_key)}"
-    os.makedirs("./data", exist_ok=True)
-
-    # Pull from DO Spaces
-    download_from_spaces(remote_key, local_path)
-    
-    sc, vs = get_storage_context("ato_rulings", persist_dir="./storage/ato_rulings")
+def parse_ato_ruling(local_path: str, ruling_id: str):
+    """CPU-bound step (PDF text extraction + chunking); safe to run in a worker process."""
     documents = SimpleDirectoryReader(input_files=[local_path]).load_data()
     
     for doc in documents:
@@ -22,10 +22,30 @@ def ingest_ato_ruling(remote_key: str, ruling_id: str):
             "is_latest": True
         })
 
-    nodes, leaf_nodes = get_parent_child_nodes(documents)
-    sc.docstore.add_documents(nodes)
-    VectorStoreIndex(leaf_nodes, storage_context=sc)
-    sc.docstore.persist(persist_dir="./storage/ato_rulings")
+    return get_parent_child_nodes(documents)
+
+@instrumented("index_ato_rulings")
+async def aindex_ato_ruling(nodes, leaf_nodes, storage=None, scheduler=None, progress=None):
+    """Docstore, embeddings + Qdrant upsert. Returns the leaf count."""
+    sc, vs = storage or get_storage_context("ato_rulings", persist_dir=settings.ATO_RULING_PERSIST_DIR)
+    with stage("docstore"):
+        await asyncio.to_thread(sc.docstore.add_documents, nodes)
+    # Concurrent, rate-limit-aware embedding with Qdrant upserts pipelined behind it
+    await aembed_and_upsert(leaf_nodes, vs, scheduler=scheduler, progress=progress)
+    # The first upsert creates the collection; give it its payload indexes
+    await asyncio.to_thread(collection_bootstrap.ensure_vector_store, vs)
+    index_generations.bump(GLOBAL_FUND_ID)
+    return len(leaf_nodes)
+
+def ingest_ato_ruling(remote_key: str, ruling_id: str):
+    local_path = f"./data/temp_{os.path.basename(remote_key)}"
+    os.makedirs("./data", exist_ok=True)
+
+    # Pull from DO Spaces
+    download_from_spaces(remote_key, local_path)
+    
+    nodes, leaf_nodes = parse_ato_ruling(local_path, ruling_id)
+    asyncio.run(aindex_ato_ruling(nodes, leaf_nodes))
     
     if os.path.exists(local_path):
-        os.remove(local_path)
\ No newline at end of file
+        os.remove(local_path)
@@ -0,0 +1,265 @@
+# ingestion/embedding_scheduler.py
+import asyncio
+import random
+import re
+import time
+
+from llama_index.core.schema import MetadataMode
+from llama_index.core.utils import get_tokenizer
+
+from app.core.config import build_embed_model, settings
+from app.core.instrumentation import stage
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: str):
+    """OpenAI x-ratelimit-reset-* values ("1s", "6m0s", "250ms") in seconds."""
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError", "TransportError"}
+
+
+def is_retryable(error: Exception) -> bool:
+    """429s, 5xx, dropped connections and timeouts; 400/401/403s etc. won't fix themselves."""
+    if is_rate_limited(error):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: Exception):
+    """Wait time advertised by a 429 response (retry-after / x-ratelimit-reset-tokens), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    if headers.get("retry-after-ms"):
+        return float(headers["retry-after-ms"]) / 1000
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    return parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+
+
+class TokenBucket:
+    """
+    Paces embedding requests below a tokens-per-minute limit, allowing
+    bursts of `burst_seconds` worth of tokens. A 429 empties the bucket,
+    pauses everyone for the advertised wait and halves the rate; each
+    success adds back 5% of the configured rate (AIMD).
+    """
+
+    def __init__(self, tokens_per_minute: int, burst_seconds: float = 10.0,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        self.max_rate = tokens_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = self.max_rate * burst_seconds
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int):
+        # A single batch larger than the bucket would never fit; let it through alone
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                wait = self._paused_until - self._clock()
+                if wait <= 0:
+                    self._refill()
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return
+                    wait = (tokens - self._tokens) / self.rate
+                await self._sleep(wait)
+
+    def on_rate_limited(self, retry_after: float):
+        self.rate = max(self.max_rate / 16, self.rate / 2)
+        self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, self._clock() + retry_after)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class EmbeddingScheduler:
+    """
+    Embeds nodes in batches capped by input count and tokens, with up to
+    `max_concurrency` requests in flight, paced by a TokenBucket.
+    Each finished batch is handed to `on_batch` (e.g. a Qdrant upsert).
+    The embed model should not retry 429s itself (max_retries=0), so the
+    scheduler sees them and slows every request down, not just one.
+    """
+
+    def __init__(self, embed_model, max_concurrency: int = 4, max_batch_inputs: int = 512,
+                 max_batch_tokens: int = 250000, tokens_per_minute: int = 1000000,
+                 max_retries: int = 6, tokenizer=None, bucket: TokenBucket = None):
+        self._embed_model = embed_model
+        self._max_concurrency = max_concurrency
+        # Shared by every run() on this scheduler, so concurrent callers
+        # (e.g. streamed page batches) stay within max_concurrency together
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # One LlamaIndex batch call must stay one HTTP request
+        self._max_batch_inputs = min(max_batch_inputs, embed_model.embed_batch_size)
+        self._max_batch_tokens = max_batch_tokens
+        self._max_retries = max_retries
+        self._tokenizer = tokenizer or get_tokenizer()
+        self.bucket = bucket or TokenBucket(tokens_per_minute)
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.tokens = 0
+
+    @classmethod
+    def from_settings(cls, embed_model=None, app_settings=settings) -> "EmbeddingScheduler":
+        if embed_model is None:
+            embed_model = build_embed_model(
+                max_retries=0, embed_batch_size=app_settings.EMBED_BATCH_MAX_INPUTS
+            )
+        return cls(
+            embed_model=embed_model,
+            max_concurrency=app_settings.EMBED_MAX_CONCURRENCY,
+            max_batch_inputs=app_settings.EMBED_BATCH_MAX_INPUTS,
+            max_batch_tokens=app_settings.EMBED_BATCH_MAX_TOKENS,
+            tokens_per_minute=app_settings.EMBED_TOKENS_PER_MINUTE,
+            max_retries=app_settings.EMBED_MAX_RETRIES,
+        )
+
+    def make_batches(self, nodes):
+        """[(nodes, texts, token_count), ...] in node order."""
+        batches, current, texts, current_tokens = [], [], [], 0
+        for node in nodes:
+            text = node.get_content(metadata_mode=MetadataMode.EMBED)
+            n_tokens = len(self._tokenizer(text))
+            if current and (len(current) >= self._max_batch_inputs
+                            or current_tokens + n_tokens > self._max_batch_tokens):
+                batches.append((current, texts, current_tokens))
+                current, texts, current_tokens = [], [], 0
+            current.append(node)
+            texts.append(text)
+            current_tokens += n_tokens
+        if current:
+            batches.append((current, texts, current_tokens))
+        return batches
+
+    async def _embed_batch(self, texts, n_tokens):
+        for attempt in range(self._max_retries + 1):
+            await self.bucket.acquire(n_tokens)
+            self.requests += 1
+            try:
+                embeddings = await self._embed_model.aget_text_embedding_batch(texts)
+            except Exception as e:
+                if attempt == self._max_retries or not is_retryable(e):
+                    raise
+                self.retries += 1
+                backoff = min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+                if is_rate_limited(e):
+                    self.rate_limited += 1
+                    self.bucket.on_rate_limited(retry_after_seconds(e) or backoff)
+                else:
+                    await asyncio.sleep(backoff)
+                continue
+            self.bucket.on_success()
+            self.tokens += n_tokens
+            return embeddings
+
+    async def run(self, nodes, on_batch=None):
+        """Sets node.embedding on every node; awaits on_batch(nodes) as batches finish."""
+        async def run_batch(batch_nodes, texts, n_tokens):
+            async with self._semaphore:
+                embeddings = await self._embed_batch(texts, n_tokens)
+            for node, embedding in zip(batch_nodes, embeddings):
+                node.embedding = embedding
+            if on_batch is not None:
+                await on_batch(batch_nodes)
+
+        tasks = [asyncio.create_task(run_batch(*batch)) for batch in self.make_batches(nodes)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return nodes
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "tokens": self.tokens,
+            "rate_tokens_per_minute": round(self.bucket.rate * 60),
+        }
+
+
+async def aembed_and_upsert(nodes, vector_store, scheduler: EmbeddingScheduler = None, upsert_queue_size: int = 4,
+                            verbose: bool = True, progress=None):
+    """
+    Replacement for VectorStoreIndex(leaf_nodes, storage_context=sc): embeds
+    through the scheduler while a single writer upserts finished batches to
+    Qdrant, so upserts overlap with the next embedding requests.
+    progress(upserted, total) is called after each upsert.
+    """
+    scheduler = scheduler or EmbeddingScheduler.from_settings()
+    queue = asyncio.Queue(maxsize=upsert_queue_size)
+    upserted, errors = 0, []
+
+    async def writer():
+        nonlocal upserted
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            if errors:
+                # Keep draining so the embedders never block on a full queue
+                continue
+            try:
+                # The sync client also computes sparse vectors (hybrid mode) off the loop
+                with stage("upsert"):
+                    await asyncio.to_thread(vector_store.add, batch)
+                upserted += len(batch)
+                if progress is not None:
+                    progress(upserted, len(nodes))
+            except Exception as e:
+                errors.append(e)
+
+    start = time.perf_counter()
+    writer_task = asyncio.create_task(writer())
+    try:
+        await scheduler.run(nodes, on_batch=queue.put)
+        await queue.put(None)
+        await writer_task
+    finally:
+        writer_task.cancel()
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"Embedded and upserted {upserted} nodes in {elapsed:.1f}s: {scheduler.stats()}")
+    return scheduler.stats()
+
+
+def embed_and_upsert(nodes, vector_store, scheduler: EmbeddingScheduler = None):
+    """Sync entry point for the ingestion functions (CLI and background tasks)."""
+    return asyncio.run(aembed_and_upsert(nodes, vector_store, scheduler=scheduler))
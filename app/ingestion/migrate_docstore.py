@@ -0,0 +1,46 @@
+# ingestion/migrate_docstore.py
+"""
+One-off migration of the JSON docstores (SimpleDocumentStore) written by
+earlier ingests into docstore.sqlite3.
+
+    python -m app.ingestion.migrate_docstore                      # all ingestion persist dirs
+    python -m app.ingestion.migrate_docstore ./storage/legislation
+"""
+import os
+import sys
+import time
+
+from app.core.config import settings
+from app.core.docstore import DOCSTORE_FILE, LEGACY_DOCSTORE_FILE, migrate_json_docstore
+
+DEFAULT_PERSIST_DIRS = [
+    settings.LEGISLATION_PERSIST_DIR,
+    settings.ATO_RULING_PERSIST_DIR,
+    settings.TRUST_DEED_PERSIST_DIR,
+]
+
+
+def main(persist_dirs):
+    failed = 0
+    for persist_dir in persist_dirs:
+        if not os.path.exists(os.path.join(persist_dir, LEGACY_DOCSTORE_FILE)):
+            print(f"⏭️  {persist_dir}: no {LEGACY_DOCSTORE_FILE}, skipping")
+            continue
+        if os.path.exists(os.path.join(persist_dir, DOCSTORE_FILE)):
+            print(f"❌ {persist_dir}: {DOCSTORE_FILE} already exists; remove it to migrate again")
+            failed += 1
+            continue
+        start = time.perf_counter()
+        try:
+            migrated = migrate_json_docstore(persist_dir)
+        except Exception as e:
+            print(f"❌ {persist_dir}: {e}")
+            failed += 1
+            continue
+        print(f"✅ {persist_dir}: {migrated} nodes in {time.perf_counter() - start:.1f}s "
+              f"(JSON kept as {LEGACY_DOCSTORE_FILE}.migrated)")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(sys.argv[1:] or DEFAULT_PERSIST_DIRS) else 0)
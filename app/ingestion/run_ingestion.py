@@ -1,37 +1,184 @@
+# ingestion/run_ingestion.py
+import asyncio
+import multiprocessing
 import os
+import random
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tqdm import tqdm
-from ingestion.sis_act import ingest_sis_act
-from ingestion.ato_ruling import ingest_ato_ruling
+from app.core.config import settings
+from app.ingestion.ato_ruling import aindex_ato_ruling, parse_ato_ruling
+from app.ingestion.embedding_scheduler import EmbeddingScheduler
+from app.ingestion.sis_act import aindex_sis_act, download_from_spaces, parse_sis_act
+from app.ingestion.utils import get_storage_context
 
-def main():
-    # 1. Define the tasks to be performed
-    # Each task: (type, remote_path, unique_id/version)
-    tasks = [
-        ("legislation", "legislation/SIS_Act_2025_v1.pdf", "SIS_Act_2025_V1"),
-        ("ruling", "rulings/TR_2021_3.pdf", "TR 2021/3"),
-        ("ruling", "rulings/TR_2023_4.pdf", "TR 2023/4")
-    ]
+# category -> (parse, run in a worker process; index, run here; Qdrant collection; docstore dir)
+CATEGORIES = {
+    "legislation": (parse_sis_act, aindex_sis_act, "legislation", settings.LEGISLATION_PERSIST_DIR),
+    "ruling": (parse_ato_ruling, aindex_ato_ruling, "ato_rulings", settings.ATO_RULING_PERSIST_DIR),
+}
 
-    print(f"🚀 Starting Ingestion Orchestrator for {len(tasks)} items...")
+# 1. Define the tasks to be performed
+# Each task: (type, remote_path, unique_id/version)
+TASKS = [
+    ("legislation", "legislation/SIS_Act_2025_v1.pdf", "SIS_Act_2025_V1"),
+    ("ruling", "rulings/TR_2021_3.pdf", "TR 2021/3"),
+    ("ruling", "rulings/TR_2023_4.pdf", "TR 2023/4")
+]
 
-    # 2. Progress Bar wrapper
-    for category, remote_key, identifier in tqdm(tasks, desc="Overall Progress"):
+
+class IngestionOrchestrator:
+    """
+    Runs every task through download -> parse -> index concurrently:
+    - downloads in threads, `download_concurrency` at a time, over one boto3 client
+    - PDF parsing + chunking in a process pool (CPU-bound, one worker per core;
+      a single thread when there is only one)
+    - indexing through one shared EmbeddingScheduler (so the tokens-per-minute
+      budget is shared), one Qdrant client and one docstore per collection
+    Each stage is retried with exponential backoff; re-running the index stage
+    is idempotent (docstore hash check, embedding cache, same node ids upserted).
+    A failed task is reported and never stops the others.
+    """
+
+    def __init__(self, download=download_from_spaces, storage_factory=get_storage_context,
+                 scheduler: EmbeddingScheduler = None, parse_workers: int = None,
+                 download_concurrency: int = 4, max_retries: int = 3, retry_backoff: float = 2.0,
+                 work_dir: str = "./data", categories=CATEGORIES, sleep=asyncio.sleep):
+        self._download = download
+        self._storage_factory = storage_factory
+        self._scheduler = scheduler
+        self._parse_workers = parse_workers or os.cpu_count() or 1
+        self._download_concurrency = download_concurrency
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._work_dir = work_dir
+        self._categories = categories
+        self._sleep = sleep
+        self._storage = {}
+
+    @classmethod
+    def from_settings(cls, app_settings=settings, **overrides) -> "IngestionOrchestrator":
+        options = dict(
+            parse_workers=app_settings.INGEST_PARSE_WORKERS,
+            download_concurrency=app_settings.INGEST_DOWNLOAD_CONCURRENCY,
+            max_retries=app_settings.INGEST_MAX_RETRIES,
+            retry_backoff=app_settings.INGEST_RETRY_BACKOFF_SECONDS,
+            work_dir=app_settings.INGEST_WORK_DIR,
+        )
+        options.update(overrides)
+        return cls(**options)
+
+    def _storage_for(self, collection: str, persist_dir: str):
+        if collection not in self._storage:
+            self._storage[collection] = self._storage_factory(collection, persist_dir=persist_dir)
+        return self._storage[collection]
+
+    async def run(self, tasks):
+        """Returns one report dict per task, in task order."""
+        os.makedirs(self._work_dir, exist_ok=True)
+        # Created here, inside the running loop
+        self._scheduler = self._scheduler or EmbeddingScheduler.from_settings()
+        self._downloads = asyncio.Semaphore(self._download_concurrency)
+        if self._parse_workers > 1:
+            # spawn, not fork: this process already runs threads (downloads, upserts)
+            pool = ProcessPoolExecutor(max_workers=self._parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            # One core: a worker process would only add startup and pickling cost
+            pool = ThreadPoolExecutor(max_workers=1)
+        with pool, tqdm(total=len(tasks), desc="Overall Progress") as progress:
+            async def run_one(position, task):
+                report = await self._run_task(pool, position, len(tasks), task)
+                progress.update(1)
+                return report
+
+            return await asyncio.gather(*(run_one(i, task) for i, task in enumerate(tasks, start=1)))
+
+    async def _run_task(self, pool, position: int, total: int, task):
+        category, remote_key, identifier = task
+        report = {
+            "identifier": identifier, "category": category, "status": "failed", "stage": "download",
+            "retries": 0, "leaves": 0, "error": None, "label": f"[{position}/{total}] {identifier}",
+        }
+        # Position in the name: two tasks may share a basename
+        local_path = os.path.join(self._work_dir, f"temp_{position}_{os.path.basename(remote_key)}")
+        loop = asyncio.get_running_loop()
         try:
-            if category == "legislation":
-                # Ingest SIS Act with Versioning logic
-                ingest_sis_act(remote_key=remote_key, version_tag=identifier)
-            
-            elif category == "ruling":
-                # Ingest ATO Ruling with Ruling ID logic
-                ingest_ato_ruling(remote_key=remote_key, ruling_id=identifier)
-            
-            print(f" ✅ Successfully processed {identifier}")
-            
+            if category not in self._categories:
+                raise ValueError(f"Unknown category {category!r}")
+            parse, index, collection, persist_dir = self._categories[category]
+
+            # 1. Download (I/O, threads)
+            async with self._downloads:
+                await self._stage(report, "download",
+                                  lambda: asyncio.to_thread(self._download, remote_key, local_path))
+            tqdm.write(f" ⬇️  {report['label']}: downloaded in {report['download_seconds']}s")
+
+            # 2. Parse + chunk (CPU, worker processes)
+            nodes, leaf_nodes = await self._stage(report, "parse",
+                                                  lambda: loop.run_in_executor(pool, parse, local_path, identifier))
+            tqdm.write(f" 📄 {report['label']}: {len(leaf_nodes)} leaves parsed in {report['parse_seconds']}s")
+
+            # 3. Docstore, embeddings, Qdrant (shared scheduler and clients)
+            storage = self._storage_for(collection, persist_dir)
+            report["leaves"] = await self._stage(report, "index",
+                                                 lambda: index(nodes, leaf_nodes, storage=storage,
+                                                               scheduler=self._scheduler))
+            report["status"] = "ok"
+            tqdm.write(f" ✅ {report['label']}: indexed in {report['index_seconds']}s")
         except Exception as e:
-            print(f" ❌ Failed to process {identifier}: {str(e)}")
+            report["error"] = f"{type(e).__name__}: {e}"
+            tqdm.write(f" ❌ {report['label']}: failed during {report['stage']}: {report['error']}")
+        finally:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+        return report
+
+    async def _stage(self, report: dict, stage: str, attempt):
+        """Awaits attempt() with up to max_retries retries, recording time in report."""
+        report["stage"] = stage
+        start = time.perf_counter()
+        for n in range(self._max_retries + 1):
+            try:
+                result = await attempt()
+            except Exception as e:
+                if n == self._max_retries:
+                    raise
+                report["retries"] += 1
+                delay = self._retry_backoff * 2 ** n * (0.5 + random.random() / 2)
+                tqdm.write(f" ↻ {report['label']}: {stage} failed ({type(e).__name__}: {e}), "
+                           f"retry {n + 1}/{self._max_retries} in {delay:.1f}s")
+                await self._sleep(delay)
+                continue
+            report[f"{stage}_seconds"] = round(time.perf_counter() - start, 2)
+            return result
+
 
-    print("\n✨ All ingestion tasks completed.")
+def print_summary(reports, elapsed: float):
+    print(f"\n{'task':<24} | {'status':<6} | {'retries':>7} | {'download s':>10} | "
+          f"{'parse s':>7} | {'index s':>7} | {'leaves':>6}")
+    for r in reports:
+        print(f"{r['identifier']:<24} | {r['status']:<6} | {r['retries']:>7} | "
+              f"{r.get('download_seconds', '-'):>10} | {r.get('parse_seconds', '-'):>7} | "
+              f"{r.get('index_seconds', '-'):>7} | {r['leaves']:>6}")
+        if r["error"]:
+            print(f"    {r['stage']}: {r['error']}")
+    succeeded = sum(r["status"] == "ok" for r in reports)
+    print(f"\n✨ {succeeded}/{len(reports)} tasks succeeded, "
+          f"{sum(r['leaves'] for r in reports)} leaves indexed in {elapsed:.1f}s.")
+
+
+def main(tasks=TASKS) -> int:
+    print(f"🚀 Starting Ingestion Orchestrator for {len(tasks)} items...")
+
+    # 2. Run the pipeline; progress is reported per task and stage
+    orchestrator = IngestionOrchestrator.from_settings()
+    start = time.perf_counter()
+    reports = asyncio.run(orchestrator.run(tasks))
+
+    # 3. Summary report; a non-zero exit code if anything failed
+    print_summary(reports, time.perf_counter() - start)
+    return 0 if all(r["status"] == "ok" for r in reports) else 1
 
 # from dotenv import load_dotenv
 # load_dotenv()
@@ -49,7 +196,7 @@ if __name__ == "__main__":
         print(f"CRITICAL ERROR: Missing environment variables: {missing}")
         sys.exit(1)
 
-    main()
+    sys.exit(main())
 
     """
     How to use this in Codespaces
@@ -59,7 +206,7 @@ Run as a Module: In the terminal, from the root directory, run:
 
 Bash
 
-python run_ingestion.py
+python -m app.ingestion.run_ingestion
     """
 
 """
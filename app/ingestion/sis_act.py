@@ -1,31 +1,34 @@
 # ingestion/sis_act.py
+import asyncio
 import os
+from functools import lru_cache
 import boto3
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-from .utils import get_storage_context, get_parent_child_nodes
+from llama_index.core import SimpleDirectoryReader
+from .embedding_scheduler import aembed_and_upsert
+from .utils import get_storage_context, get_parent_child_nodes, update_citation_index
+from app.core.citation_index import SECTION
+from app.core.config import settings
+from app.core.qdrant import collection_bootstrap
+from app.core.instrumentation import instrumented, stage
+from app.core.generations import index_generations, GLOBAL_FUND_ID
 
-def download_from_spaces(remote_key, local_path):
-    """Downloads a file from DigitalOcean Spaces."""
-    s3 = boto3.client(
+@lru_cache(maxsize=1)
+def spaces_client():
+    """One boto3 client per process (boto3 clients are thread-safe), reused by every download."""
+    return boto3.client(
         's3',
         region_name='sgp1', # e.g., nyc3, sgp1
         endpoint_url=os.environ["DO_SPACES_ENDPOINT"],
         aws_access_key_id=os.environ["DO_SPACES_KEY"],
         aws_secret_access_key=os.environ["DO_SPACES_SECRET"]
     )
-    s3.download_file(os.environ["DO_SPACES_BUCKET"], remote_key, local_path)
 
-def ingest_sis_act(remote_key: str, version_tag: str):
-    # 1. Prepare local temp path
-    local_filename = os.path.basename(remote_key)
-    local_path = f"./data/temp_{local_filename}"
-    os.makedirs("./data", exist_ok=True)
+def download_from_spaces(remote_key, local_path):
+    """Downloads a file from DigitalOcean Spaces."""
+    spaces_client().download_file(os.environ["DO_SPACES_BUCKET"], remote_key, local_path)
 
-    # 2. Retrieve from DigitalOcean Spaces
-    download_from_spaces(remote_key, local_path)
-    
-    # 3. Standard Ingestion Logic
-    sc, vs = get_storage_context("legislation", persist_dir="./storage/legislation")
+def parse_sis_act(local_path: str, version_tag: str):
+    """CPU-bound step (PDF text extraction + chunking); safe to run in a worker process."""
     documents = SimpleDirectoryReader(input_files=[local_path]).load_data()
     
     for doc in documents:
@@ -36,11 +39,37 @@ def ingest_sis_act(remote_key: str, version_tag: str):
             "is_latest": True
         })
 
-    nodes, leaf_nodes = get_parent_child_nodes(documents)
-    sc.docstore.add_documents(nodes)
-    VectorStoreIndex(leaf_nodes, storage_context=sc)
-    sc.docstore.persist(persist_dir="./storage/legislation")
+    return get_parent_child_nodes(documents)
+
+@instrumented("index_legislation")
+async def aindex_sis_act(nodes, leaf_nodes, storage=None, scheduler=None, progress=None):
+    """Docstore, embeddings + Qdrant upsert, citation index. Returns the leaf count."""
+    sc, vs = storage or get_storage_context("legislation", persist_dir=settings.LEGISLATION_PERSIST_DIR)
+    with stage("docstore"):
+        await asyncio.to_thread(sc.docstore.add_documents, nodes)
+    # Concurrent, rate-limit-aware embedding with Qdrant upserts pipelined behind it
+    await aembed_and_upsert(leaf_nodes, vs, scheduler=scheduler, progress=progress)
+    # The first upsert creates the collection; give it its payload indexes
+    await asyncio.to_thread(collection_bootstrap.ensure_vector_store, vs)
+    await asyncio.to_thread(
+        update_citation_index, settings.LEGISLATION_PERSIST_DIR, leaf_nodes, kind=SECTION, scope=GLOBAL_FUND_ID
+    )
+    index_generations.bump(GLOBAL_FUND_ID)
+    return len(leaf_nodes)
+
+def ingest_sis_act(remote_key: str, version_tag: str):
+    # 1. Prepare local temp path
+    local_filename = os.path.basename(remote_key)
+    local_path = f"./data/temp_{local_filename}"
+    os.makedirs("./data", exist_ok=True)
+
+    # 2. Retrieve from DigitalOcean Spaces
+    download_from_spaces(remote_key, local_path)
+    
+    # 3. Standard Ingestion Logic
+    nodes, leaf_nodes = parse_sis_act(local_path, version_tag)
+    asyncio.run(aindex_sis_act(nodes, leaf_nodes))
     
     # Cleanup
     if os.path.exists(local_path):
-        os.remove(local_path)
\ No newline at end of file
+        os.remove(local_path)
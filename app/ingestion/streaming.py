@@ -0,0 +1,209 @@
+# ingestion/streaming.py
+import asyncio
+import codecs
+import io
+import tempfile
+import time
+
+from llama_index.core import Document, Settings
+from llama_index.core.ingestion import run_transformations
+
+from app.core.config import settings
+from .embedding_scheduler import EmbeddingScheduler, aembed_and_upsert
+
+PDF = "pdf"
+TEXT = "text"
+
+# The PDF header may follow a little junk; 1 KiB is what readers accept
+_SNIFF_BYTES = 1024
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+def spool_stream(body, chunk_size: int = None, max_memory: int = None):
+    """
+    Copies a botocore StreamingBody (anything with read(n)) into a
+    SpooledTemporaryFile chunk by chunk: small objects stay in memory, large
+    ones roll over to disk. Returns (spooled file rewound to 0, bytes copied).
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_BYTES
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory or settings.STREAM_SPOOL_MAX_MEMORY_BYTES)
+    n_bytes = 0
+    try:
+        while True:
+            chunk = body.read(chunk_size)
+            if not chunk:
+                break
+            spool.write(chunk)
+            n_bytes += len(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        body.close()
+    spool.seek(0)
+    return spool, n_bytes
+
+
+def detect_file_type(head: bytes) -> str:
+    """PDF by its %PDF- magic, otherwise UTF-8 text; anything else is rejected."""
+    if b"%PDF-" in head[:_SNIFF_BYTES]:
+        return PDF
+    try:
+        # final=False: the sniffed prefix may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        raise UnsupportedFileType("Unsupported file type: neither PDF nor UTF-8 text")
+    if b"\x00" in head:
+        raise UnsupportedFileType("Unsupported file type: binary content")
+    return TEXT
+
+
+def iter_pages(spool, file_type: str, text_page_chars: int = None):
+    """
+    Yields (page_label, text) one page at a time. PDFs are read through
+    pypdf, which seeks into the spooled file per page instead of loading it;
+    text files are cut at line boundaries into pages of ~text_page_chars.
+    """
+    if file_type == PDF:
+        from pypdf import PdfReader
+
+        reader = PdfReader(spool)
+        for number, page in enumerate(reader.pages, start=1):
+            yield str(number), page.extract_text() or ""
+        return
+
+    text_page_chars = text_page_chars or settings.STREAM_TEXT_PAGE_CHARS
+    text = io.TextIOWrapper(spool, encoding="utf-8")
+    try:
+        number, lines, size = 0, [], 0
+        while True:
+            # Bounded readline: a file without newlines still comes in pieces
+            line = text.readline(text_page_chars)
+            if line:
+                lines.append(line)
+                size += len(line)
+            if size >= text_page_chars or (not line and lines):
+                number += 1
+                yield str(number), "".join(lines)
+                lines, size = [], 0
+            if not line:
+                return
+    finally:
+        # Leave closing the spool to the caller
+        text.detach()
+
+
+def iter_node_batches(spool, file_type: str, metadata: dict, doc_id_prefix: str,
+                      pages_per_batch: int = None, transformations=None):
+    """Parses `pages_per_batch` pages at a time into nodes with page_label metadata."""
+    pages_per_batch = pages_per_batch or settings.STREAM_PAGES_PER_BATCH
+    transformations = transformations or Settings.transformations
+    documents = []
+    for page_label, page_text in iter_pages(spool, file_type):
+        if not page_text.strip():
+            continue  # e.g. scanned pages without a text layer
+        documents.append(Document(
+            id_=f"{doc_id_prefix}#page={page_label}",
+            text=page_text,
+            metadata={**metadata, "page_label": page_label},
+            # Timestamps and pagination stay out of the embedded text, so a
+            # re-upload of an unchanged document hits the embedding cache
+            excluded_embed_metadata_keys=["processed_at", "page_label"],
+        ))
+        if len(documents) >= pages_per_batch:
+            yield run_transformations(documents, transformations)
+            documents = []
+    if documents:
+        yield run_transformations(documents, transformations)
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the whole process so far (ru_maxrss is KiB on
+    Linux). It never goes down, so it is not a per-upload figure. None where
+    the resource module does not exist (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def astream_to_index(body, vector_store, metadata: dict, doc_id_prefix: str,
+                           scheduler: EmbeddingScheduler = None):
+    """
+    Streaming replacement for body.read() -> Document -> index.insert():
+    1. Copies the object body to a spooled temp file in chunks.
+    2. Detects PDF vs text from the first bytes.
+    3. Parses a few pages at a time in a worker thread while earlier page
+       batches are embedded and upserted. At most EMBED_MAX_CONCURRENCY
+       batches are in flight, so memory is bounded by the batch size, not
+       the document size.
+    Returns ingestion stats (bytes, pages, nodes, throughput, and how far
+    this upload raised the process's peak RSS).
+    """
+    scheduler = scheduler or EmbeddingScheduler.from_settings()
+    start = time.perf_counter()
+    rss_before = peak_rss_mb()
+
+    # 1. Download (blocking botocore reads stay off the event loop)
+    spool, n_bytes = await asyncio.to_thread(spool_stream, body)
+    download_seconds = time.perf_counter() - start
+
+    async def embed(nodes):
+        await aembed_and_upsert(nodes, vector_store, scheduler=scheduler, verbose=False)
+        return nodes
+
+    n_nodes, pages, in_flight = 0, set(), set()
+
+    def collect(done):
+        nonlocal n_nodes
+        for task in done:
+            nodes = task.result()  # re-raises an embedding/upsert failure
+            n_nodes += len(nodes)
+            pages.update(node.metadata["page_label"] for node in nodes)
+
+    try:
+        # 2. Sniff the type, then rewind for the parser
+        file_type = detect_file_type(spool.read(_SNIFF_BYTES))
+        spool.seek(0)
+
+        # 3. Parse the next batch while earlier ones embed
+        batches = iter_node_batches(spool, file_type, metadata, doc_id_prefix)
+        while True:
+            nodes = await asyncio.to_thread(next, batches, None)
+            if nodes is None:
+                break
+            if len(in_flight) >= settings.EMBED_MAX_CONCURRENCY:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(asyncio.create_task(embed(nodes)))
+        if in_flight:
+            done, in_flight = await asyncio.wait(in_flight)
+            collect(done)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        spool.close()
+
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+    stats = {
+        "file_type": file_type,
+        "bytes": n_bytes,
+        "pages": len(pages),
+        "nodes": n_nodes,
+        "download_seconds": round(download_seconds, 3),
+        "seconds": round(elapsed, 3),
+        "bytes_per_second": round(n_bytes / elapsed) if elapsed else None,
+        # 0 when an earlier upload already pushed the peak higher
+        "peak_rss_growth_mb": round(rss_after - rss_before, 1) if rss_after is not None else None,
+        "process_peak_rss_mb": round(rss_after, 1) if rss_after is not None else None,
+        "embedding": scheduler.stats(),
+    }
+    print(f"Streamed {doc_id_prefix}: {stats}")
+    return stats
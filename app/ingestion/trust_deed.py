@@ -1,16 +1,18 @@
 # ingestion/trust_deed.py
+import asyncio
 import os
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core import SimpleDirectoryReader
 # Relative import since utils.py is in the same folder
-from .utils import get_storage_context, get_parent_child_nodes
+from .embedding_scheduler import aembed_and_upsert
+from .utils import get_storage_context, get_parent_child_nodes, update_citation_index
+from app.core.citation_index import CLAUSE
+from app.core.config import settings
+from app.core.qdrant import collection_bootstrap
+from app.core.instrumentation import instrumented, stage
+from app.core.generations import index_generations
 
-def process_trust_deed_upload(file_path: str, fund_id: str):
-    """
-    Logic used by the FastAPI background task.
-    """
-    # Store persistent data in a folder dedicated to deeds
-    sc, vs = get_storage_context("trust_deeds", persist_dir="./storage/trust_deeds")
-    
+def parse_trust_deed(file_path: str, fund_id: str):
+    """CPU-bound step (PDF text extraction + chunking)."""
     documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
     
     for doc in documents:
@@ -20,13 +22,34 @@ def process_trust_deed_upload(file_path: str, fund_id: str):
             "is_latest": True
         })
 
-    nodes, leaf_nodes = get_parent_child_nodes(documents)
+    return get_parent_child_nodes(documents)
+
+@instrumented("index_trust_deeds")
+async def aindex_trust_deed(nodes, leaf_nodes, fund_id: str, storage=None, scheduler=None, progress=None):
+    """Docstore, embeddings + Qdrant upsert, clause citation index. Returns the leaf count."""
+    # Store persistent data in a folder dedicated to deeds
+    sc, vs = storage or get_storage_context("trust_deeds", persist_dir=settings.TRUST_DEED_PERSIST_DIR)
     
     # Idempotent indexing: only embeds if doc hash is new
-    sc.docstore.add_documents(nodes)
-    VectorStoreIndex(leaf_nodes, storage_context=sc)
+    with stage("docstore"):
+        await asyncio.to_thread(sc.docstore.add_documents, nodes)
+    # Concurrent, rate-limit-aware embedding with Qdrant upserts pipelined behind it
+    await aembed_and_upsert(leaf_nodes, vs, scheduler=scheduler, progress=progress)
+    # The first upsert creates the collection; give it its payload indexes
+    await asyncio.to_thread(collection_bootstrap.ensure_vector_store, vs)
     
-    sc.docstore.persist(persist_dir="./storage/trust_deeds")
+    await asyncio.to_thread(
+        update_citation_index, settings.TRUST_DEED_PERSIST_DIR, leaf_nodes, kind=CLAUSE, scope=fund_id
+    )
+    index_generations.bump(fund_id)
+    return len(leaf_nodes)
+
+def process_trust_deed_upload(file_path: str, fund_id: str):
+    """
+    Sync entry point (CLI); the API enqueues a trust_deed job for the worker instead.
+    """
+    nodes, leaf_nodes = parse_trust_deed(file_path, fund_id)
+    asyncio.run(aindex_trust_deed(nodes, leaf_nodes, fund_id))
     
     if os.path.exists(file_path):
-        os.remove(file_path)
\ No newline at end of file
+        os.remove(file_path)
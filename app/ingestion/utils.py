@@ -3,32 +3,34 @@ import os
 from llama_index.core import StorageContext
 from llama_index.core.node_parser import HierarchicalNodeParser, get_leaf_nodes
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.core.storage.docstore import SimpleDocumentStore
-from qdrant_client import QdrantClient
+from app.core.config import configure_models
+from app.core.qdrant import qdrant_registry, vector_store_options
+from app.core.citation_index import CitationIndex, persist_lock
+from app.core.docstore import SQLiteDocumentStore
+from app.core.instrumentation import stage
+
+# Configures Settings.embed_model (text-embedding-3-large + embedding cache),
+# so re-ingesting unchanged documents costs no embedding calls
+configure_models()
 
 def get_storage_context(collection_name: str, persist_dir: str):
     """
     Sets up Qdrant and a local Docstore for idempotency.
     """
-    # Initialize Qdrant Client
-    client = QdrantClient(
-        url=os.environ.get("QDRANT_URL"), 
-        api_key=os.environ.get("QDRANT_API_KEY")
-    )
-    
+    # Reuse the process-wide Qdrant client instead of opening one per ingest.
+    # In hybrid mode each point is also written with its BM25 sparse vector.
     vector_store = QdrantVectorStore(
         collection_name=collection_name, 
-        client=client
+        client=qdrant_registry.client,
+        **vector_store_options()
     )
     
     # Ensure the storage directory exists for the Docstore
     os.makedirs(persist_dir, exist_ok=True)
     
-    # Load or create Docstore (handles mid-process failures)
-    try:
-        docstore = SimpleDocumentStore.from_persist_dir(persist_dir)
-    except (FileNotFoundError, Exception):
-        docstore = SimpleDocumentStore()
+    # SQLite docstore: opened lazily, written per node in transactions, so a
+    # failed ingest never leaves a half-written store. Errors are not swallowed.
+    docstore = SQLiteDocumentStore.from_persist_dir(persist_dir)
 
     return StorageContext.from_defaults(
         vector_store=vector_store,
@@ -45,6 +47,18 @@ def get_parent_child_nodes(documents):
     node_parser = HierarchicalNodeParser.from_defaults(
         chunk_sizes=[2048, 512, 128]
     )
-    nodes = node_parser.get_nodes_from_documents(documents)
+    with stage("chunking"):
+        nodes = node_parser.get_nodes_from_documents(documents)
     leaf_nodes = get_leaf_nodes(nodes)
-    return nodes, leaf_nodes
\ No newline at end of file
+    return nodes, leaf_nodes
+
+def update_citation_index(persist_dir: str, leaf_nodes, kind: str, scope: str):
+    """
+    Maps section/clause numbers to the leaf nodes that hold them and writes
+    citation_index.json next to the docstore, for lookups without vector search.
+    """
+    with persist_lock(persist_dir):
+        citations = CitationIndex.from_persist_dir(persist_dir)
+        count = citations.index_nodes(leaf_nodes, kind=kind, scope=scope)
+        citations.persist(persist_dir)
+    print(f"Indexed {count} {kind} citations for {scope}.")
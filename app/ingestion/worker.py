@@ -0,0 +1,194 @@
+# ingestion/worker.py
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from functools import lru_cache
+from app.core.config import settings
+from app.core.instrumentation import track_stages
+from app.core.job_queue import JobQueue
+from .ato_ruling import aindex_ato_ruling, parse_ato_ruling
+from .embedding_scheduler import EmbeddingScheduler
+from .trust_deed import aindex_trust_deed, parse_trust_deed
+from .utils import get_storage_context
+
+# Parsing takes roughly this share of a job; embedding + upserts the rest
+PARSE_SHARE = 0.3
+
+
+@lru_cache(maxsize=None)
+def _storage(collection: str, persist_dir: str):
+    """One docstore + vector store per collection for the worker's lifetime."""
+    return get_storage_context(collection, persist_dir=persist_dir)
+
+
+def _embedding_progress(progress):
+    return lambda done, total: progress(PARSE_SHARE + (1 - PARSE_SHARE) * done / total,
+                                        f"embedded {done}/{total} leaves")
+
+
+# The worker has no /api/metrics; each job's stage breakdown is kept in its result
+async def run_ruling_job(payload: dict, progress, scheduler: EmbeddingScheduler) -> dict:
+    with track_stages("job_ruling") as timings:
+        progress(0.0, "parsing")
+        nodes, leaf_nodes = await asyncio.to_thread(parse_ato_ruling, payload["file_path"], payload["ruling_id"])
+        progress(PARSE_SHARE, f"embedding {len(leaf_nodes)} leaves")
+        leaves = await aindex_ato_ruling(
+            nodes, leaf_nodes, storage=_storage("ato_rulings", settings.ATO_RULING_PERSIST_DIR),
+            scheduler=scheduler, progress=_embedding_progress(progress),
+        )
+    return {"leaves": leaves, "timings": timings.breakdown()}
+
+
+async def run_trust_deed_job(payload: dict, progress, scheduler: EmbeddingScheduler) -> dict:
+    with track_stages("job_trust_deed") as timings:
+        progress(0.0, "parsing")
+        nodes, leaf_nodes = await asyncio.to_thread(parse_trust_deed, payload["file_path"], payload["fund_id"])
+        progress(PARSE_SHARE, f"embedding {len(leaf_nodes)} leaves")
+        leaves = await aindex_trust_deed(
+            nodes, leaf_nodes, payload["fund_id"], storage=_storage("trust_deeds", settings.TRUST_DEED_PERSIST_DIR),
+            scheduler=scheduler, progress=_embedding_progress(progress),
+        )
+    return {"leaves": leaves, "timings": timings.breakdown()}
+
+
+# Job kind -> async handler(payload, progress(fraction, message), scheduler) -> result dict
+JOB_HANDLERS = {
+    "ruling": run_ruling_job,
+    "trust_deed": run_trust_deed_job,
+}
+
+
+class IngestionWorker:
+    """
+    Claims jobs from the queue and runs up to `concurrency` of them, outside
+    the API process. While a job runs, a heartbeat renews its lease, saves
+    progress and picks up cancellation requests. Failures are retried by the
+    queue with backoff; on shutdown running jobs go back to the queue.
+    """
+
+    def __init__(self, queue: JobQueue, handlers=JOB_HANDLERS, scheduler: EmbeddingScheduler = None,
+                 concurrency: int = 1, max_running: int = None, poll_seconds: float = 2.0,
+                 heartbeat_seconds: float = 5.0, retry_backoff: float = 30.0, worker_id: str = None):
+        self._queue = queue
+        self._handlers = handlers
+        self._scheduler = scheduler
+        self._concurrency = concurrency
+        self._max_running = max_running
+        self._poll_seconds = poll_seconds
+        self._heartbeat_seconds = heartbeat_seconds
+        self._retry_backoff = retry_backoff
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.processed = 0
+
+    @classmethod
+    def from_settings(cls, queue: JobQueue = None, app_settings=settings, **overrides) -> "IngestionWorker":
+        options = dict(
+            concurrency=app_settings.JOB_WORKER_CONCURRENCY,
+            max_running=app_settings.JOB_MAX_RUNNING,
+            poll_seconds=app_settings.JOB_POLL_SECONDS,
+            heartbeat_seconds=app_settings.JOB_HEARTBEAT_SECONDS,
+            retry_backoff=app_settings.JOB_RETRY_BACKOFF_SECONDS,
+        )
+        options.update(overrides)
+        queue = queue or JobQueue(app_settings.JOB_DB_PATH, lease_seconds=app_settings.JOB_LEASE_SECONDS)
+        return cls(queue, **options)
+
+    async def run(self, stop: asyncio.Event = None, drain: bool = False):
+        """Processes jobs until `stop` is set (or, with drain=True, until the queue is empty)."""
+        stop = stop or asyncio.Event()
+        # Created inside the loop; shared by every job so they share one token budget
+        self._scheduler = self._scheduler or EmbeddingScheduler.from_settings()
+        running = set()
+        print(f"👷 Worker {self.worker_id} started (concurrency {self._concurrency}).")
+        try:
+            while not stop.is_set():
+                job = None
+                if len(running) < self._concurrency:
+                    job = await asyncio.to_thread(
+                        self._queue.claim, self.worker_id, self._max_running, list(self._handlers)
+                    )
+                if job is not None:
+                    running.add(asyncio.create_task(self._execute(job)))
+                    continue
+                if drain and not running:
+                    return
+                # Wake on a finished job, the next poll, or shutdown
+                waiters = running | {asyncio.create_task(stop.wait())}
+                done, _ = await asyncio.wait(waiters, timeout=self._poll_seconds,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                running -= done
+                for waiter in waiters - running:
+                    waiter.cancel()
+        finally:
+            # Shutdown: running jobs go back to the queue for the next worker
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            print(f"👷 Worker {self.worker_id} stopped after {self.processed} jobs.")
+
+    async def _execute(self, job: dict):
+        job_id, payload = job["job_id"], job["payload"]
+        state = {"progress": 0.0, "message": "started", "cancelled": False}
+
+        def progress(fraction: float, message: str):
+            state["progress"], state["message"] = round(min(max(fraction, 0.0), 1.0), 3), message
+
+        task = asyncio.create_task(self._handlers[job["kind"]](payload, progress, self._scheduler))
+
+        async def heartbeat():
+            while not task.done():
+                if await asyncio.to_thread(self._queue.heartbeat, job_id, state["progress"], state["message"]):
+                    state["cancelled"] = True
+                    task.cancel()
+                    return
+                await asyncio.sleep(self._heartbeat_seconds)
+
+        beat = asyncio.create_task(heartbeat())
+        finished = True
+        print(f"▶️  {job['kind']} job {job_id} (attempt {job['attempts']}/{job['max_attempts']})")
+        try:
+            result = await task
+            await asyncio.to_thread(self._queue.complete, job_id, result)
+            print(f" ✅ {job['kind']} job {job_id}: {result}")
+        except asyncio.CancelledError:
+            if not state["cancelled"]:
+                # Worker shutdown, not a user request
+                task.cancel()
+                finished = False
+                await asyncio.to_thread(self._queue.release, job_id)
+                raise
+            await asyncio.to_thread(self._queue.mark_cancelled, job_id)
+            print(f" ⏹️  {job['kind']} job {job_id} cancelled")
+        except Exception as e:
+            failed = await asyncio.to_thread(self._queue.fail, job_id, f"{type(e).__name__}: {e}", self._retry_backoff)
+            finished = failed["status"] != "queued"
+            print(f" ❌ {job['kind']} job {job_id}: {type(e).__name__}: {e} -> {failed['status']}")
+        finally:
+            beat.cancel()
+            self.processed += 1
+            # The upload is only needed while the job may still run
+            if finished and payload.get("file_path") and os.path.exists(payload["file_path"]):
+                os.remove(payload["file_path"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs queued ingestion jobs (rulings, trust deeds).")
+    parser.add_argument("--drain", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args()
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Render stops workers with SIGTERM
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await IngestionWorker.from_settings().run(stop=stop, drain=args.drain)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@ import json
 import boto3
 from datetime import datetime
 from botocore.exceptions import ClientError
+from app.core.config import settings
+from app.storage.listing import ListingCache, PresignedUrlCache
+from app.storage.registry import RegistryService, is_registry_key
 
 class DOSpacesHandler:
-    def __init__(self):
+    def __init__(self, client=None):
         # 1. Collect variables
         region = os.getenv('DO_SPACES_REGION')
         endpoint = os.getenv('DO_SPACES_ENDPOINT')
@@ -26,9 +29,9 @@ class DOSpacesHandler:
         if missing:
             raise EnvironmentError(f"Missing environment variables: {', '.join(missing)}")
 
-        # 3. Initialize the session and client
+        # 3. Initialize the session and client (or use the one given, e.g. a local stand-in)
         self.session = boto3.session.Session()
-        self.client = self.session.client(
+        self.client = client or self.session.client(
             's3',
             region_name=region,
             endpoint_url=endpoint,
@@ -36,41 +39,75 @@ class DOSpacesHandler:
             aws_secret_access_key=secret
         )
 
-    def list_files(self, prefix=""):
-        """Lists files and generates a temporary download link for each."""
-        try:
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket_name, 
-                Prefix=prefix
-            )
-            
+        # 4. registry.json / registry entries, cached per process
+        self.registry = RegistryService(
+            self.client, self.bucket_name,
+            layout=settings.REGISTRY_LAYOUT,
+            max_retries=settings.REGISTRY_MAX_RETRIES
+        )
+
+        # 5. Listing pages and presigned URLs, cached per process
+        self.listings = ListingCache(
+            ttl_seconds=settings.LISTING_CACHE_TTL_SECONDS,
+            max_pages=settings.LISTING_CACHE_MAX_PAGES
+        )
+        self.presigned_urls = PresignedUrlCache(
+            self._sign_download_url,
+            refresh_margin=settings.PRESIGNED_URL_REFRESH_MARGIN_SECONDS
+        )
+
+    def list_page(self, prefix="", cursor=None, limit=100, with_urls=True):
+        """
+        One page of files (at most `limit`, one S3 request), plus the cursor of
+        the next page (None on the last). Pages are cached for a few seconds;
+        download links are only signed for the files on the page.
+        """
+        limit = max(1, min(limit, 1000))  # S3 returns at most 1000 keys per request
+        cache_key = (prefix, cursor, limit)
+        page = self.listings.get(cache_key)
+        if page is None:
+            try:
+                params = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": limit}
+                if cursor:
+                    params["ContinuationToken"] = cursor
+                response = self.client.list_objects_v2(**params)
+            except ClientError as e:
+                print(f"Error listing files: {e}")
+                return {"files": [], "next_cursor": None}
+
             files = []
             for obj in response.get('Contents', []):
                 key = obj['Key']
-                
-                # Skip the directory markers (0-byte objects ending in '/')
-                if key.endswith('/'):
-                    continue
 
-                # Generate the temporary link (valid for 1 hour)
-                download_url = self.client.generate_presigned_url(
-                    'get_object',
-                    Params={'Bucket': self.bucket_name, 'Key': key},
-                    ExpiresIn=3600
-                )
+                # Skip the directory markers (0-byte objects ending in '/') and the registry
+                if key.endswith('/') or is_registry_key(key):
+                    continue
 
                 files.append({
                     "name": key.split('/')[-1], # Just the filename for the UI
                     "path": key,                # Full path in the Space
                     "size": obj['Size'],
-                    "last_modified": obj['LastModified'].isoformat(),
-                    "download_url": download_url
+                    "last_modified": obj['LastModified'].isoformat()
                 })
-                
-            return files
-        except ClientError as e:
-            print(f"Error listing files: {e}")
-            return []
+            next_cursor = response.get("NextContinuationToken") if response.get("IsTruncated") else None
+            page = {"files": files, "next_cursor": next_cursor}
+            self.listings.put(cache_key, page)
+
+        files = [dict(f) for f in page["files"]]
+        if with_urls:
+            for f in files:
+                f["download_url"] = self.presigned_urls.get(f["path"], settings.PRESIGNED_URL_EXPIRES_SECONDS)
+        return {"files": files, "next_cursor": page["next_cursor"]}
+
+    def list_files(self, prefix=""):
+        """Lists every file under prefix (all pages) with a temporary download link for each."""
+        files, cursor = [], None
+        while True:
+            page = self.list_page(prefix, cursor=cursor, limit=1000)
+            files.extend(page["files"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return files
         
     def get_file_content(self, file_key):
         """Reads a file's content into memory."""
@@ -80,70 +117,56 @@ class DOSpacesHandler:
         except ClientError as e:
             print(f"Error reading file {file_key}: {e}")
             return None
-    
+
+    def open_file_stream(self, file_key):
+        """Returns the object's streaming body (read it in chunks), or None if unreadable."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=file_key)
+            return response['Body']
+        except ClientError as e:
+            print(f"Error opening file {file_key}: {e}")
+            return None
+
+    def _sign_download_url(self, file_key: str, expires_in: int):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket_name,
+                'Key': file_key
+            },
+            ExpiresIn=expires_in
+        )
+
     def generate_download_url(self, file_key: str, expires_in: int = 3600):
         """
-        Generates a temporary URL to download a file.
+        Generates a temporary URL to download a file (reused until close to expiry).
         :param file_key: The full path/name of the file in the Space.
         :param expires_in: Time in seconds before link expires (default 1 hour).
         """
         try:
-            url = self.client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': file_key
-                },
-                ExpiresIn=expires_in
-            )
-            return url
+            return self.presigned_urls.get(file_key, expires_in)
         except ClientError as e:
             print(f"Error generating presigned URL: {e}")
             return None
         
     def get_registry(self):
-        """Reads registry.json from the root of the Space."""
-        # try:
-        #     response = self.client.get_object(Bucket=self.bucket_name, Key='registry.json')
-        #     return json.loads(response['Body'].read().decode('utf-8'))
-        # except ClientError as e:
-        #     # If file doesn't exist, return an empty list or structure
-        #     if e.response['Error']['Code'] == 'NoSuchKey':
-        #         return {"indexed_files": []}
-        #     return {"error": str(e)}
+        """Returns {"indexed_files": [...]}; served from the ETag-validated cache."""
         try:
-            response = self.client.get_object(Bucket=self.bucket_name, Key="registry.json")
-            return json.loads(response['Body'].read().decode('utf-8'))
-        except self.client.exceptions.NoSuchKey:
-            # If the file doesn't exist, return a fresh template
-            return {"indexed_files": []}
+            return self.registry.get()
         except Exception as e:
             print(f"Error fetching registry: {e}")
             return {"indexed_files": []}
 
     def save_registry(self, registry_data):
         """
-        Serializes and uploads the registry dictionary to DigitalOcean Spaces.
+        Replaces the whole registry. Rewrites every entry; use
+        self.registry.upsert()/remove() to change a single file.
         """
         try:
-            # 1. Convert dictionary to a JSON string
-            # indent=2 makes it human-readable if you open it in a text editor
-            json_data = json.dumps(registry_data, indent=2)
-
-            # 2. Upload the string as a file
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key="registry.json",
-                Body=json_data,
-                ContentType='application/json',  # Important for browser viewing
-                ACL='private'                    # Keep your registry private
-            )
+            self.registry.replace(registry_data.get("indexed_files", []))
             return True
-        except ClientError as e:
-            print(f"Error saving registry to Spaces: {e}")
-            return False
         except Exception as e:
-            print(f"General error in save_registry: {e}")
+            print(f"Error saving registry to Spaces: {e}")
             return False
     
     def delete_file(self, file_key: str):
@@ -153,6 +176,8 @@ class DOSpacesHandler:
                 Bucket=self.bucket_name,
                 Key=file_key
             )
+            self.listings.invalidate(file_key)
+            self.presigned_urls.invalidate(file_key)
             return True
         except ClientError as e:
             print(f"Error deleting file from Spaces: {e}")
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ListingCache:
+    """
+    Bounded, thread-safe LRU + TTL cache of list_objects_v2 pages, keyed by
+    (prefix, cursor, page size). A short TTL keeps the UI from re-listing the
+    bucket on every request while new uploads still show up within seconds.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_pages: int = 256, clock=time.monotonic):
+        self._ttl = ttl_seconds
+        self._max_pages = max_pages
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = self._clock()
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None and now - entry[0] < self._ttl:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._pages.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, page):
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._pages[key] = (self._clock(), page)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self._max_pages:
+                self._pages.popitem(last=False)
+
+    def invalidate(self, object_key: str = None):
+        """Drops pages whose prefix covers object_key (every page when None)."""
+        with self._lock:
+            for key in [k for k in self._pages if object_key is None or object_key.startswith(k[0])]:
+                del self._pages[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "pages": len(self._pages),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class PresignedUrlCache:
+    """
+    Presigned GET URLs per (object key, lifetime), reused until `refresh_margin`
+    seconds before they expire, so a link handed out is always valid for at
+    least that long.
+    """
+
+    def __init__(self, sign, refresh_margin: float = 600.0, max_size: int = 10000, clock=time.time):
+        self._sign = sign  # (object key, expires_in) -> url
+        self._refresh_margin = refresh_margin
+        self._max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()
+        self.signed = 0
+
+    def get(self, object_key: str, expires_in: int = 3600) -> str:
+        key = (object_key, expires_in)
+        now = self._clock()
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is not None and entry[1] - now > min(self._refresh_margin, expires_in / 2):
+                self._urls.move_to_end(key)
+                return entry[0]
+        url = self._sign(object_key, expires_in)
+        with self._lock:
+            self.signed += 1
+            self._urls[key] = (url, now + expires_in)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self._max_size:
+                self._urls.popitem(last=False)
+        return url
+
+    def invalidate(self, object_key: str):
+        with self._lock:
+            for key in [k for k in self._urls if k[0] == object_key]:
+                del self._urls[key]
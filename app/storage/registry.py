@@ -0,0 +1,280 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
+
+LEGACY_REGISTRY_KEY = "registry.json"
+ENTRIES_PREFIX = "registry/entries/"
+
+# Layouts
+SINGLE = "single"    # one registry.json, read-modify-write with conditional PUT
+ENTRIES = "entries"  # one small object per indexed file
+
+
+def is_registry_key(key: str) -> bool:
+    """registry.json and registry entries are bookkeeping, not documents."""
+    return key == LEGACY_REGISTRY_KEY or key.startswith(ENTRIES_PREFIX)
+
+
+def error_code(error: ClientError) -> str:
+    return str(error.response.get("Error", {}).get("Code", ""))
+
+
+def _status(error: ClientError) -> int:
+    return error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+
+
+def is_not_found(error: ClientError) -> bool:
+    return error_code(error) in ("NoSuchKey", "404", "NotFound")
+
+
+def is_not_modified(error: ClientError) -> bool:
+    return error_code(error) in ("304", "NotModified") or _status(error) == 304
+
+
+def is_precondition_failed(error: ClientError) -> bool:
+    # 409 ConditionalRequestConflict: another conditional write raced ours
+    return error_code(error) in ("PreconditionFailed", "ConditionalRequestConflict") or _status(error) in (409, 412)
+
+
+class RegistryConflictError(RuntimeError):
+    pass
+
+
+class RegistryService:
+    """
+    The index registry ({"indexed_files": [...]}) kept in the Space.
+
+    - single: registry.json as before, but reads are conditional GETs against
+      an in-process copy (If-None-Match: 304 costs no body transfer) and
+      writes are conditional PUTs (If-Match / If-None-Match: *). On a 412 the
+      update is re-applied to the fresh copy and retried with backoff, so
+      concurrent ingests never drop each other's entries.
+    - entries: one object per indexed file under registry/entries/. An
+      update writes (or deletes) only its own object, O(1) in the number of
+      files, and concurrent updaters never touch the same key. A full read is
+      one paginated LIST whose ETags validate the cached entries; only new
+      or changed entries are fetched. A legacy registry.json is copied into
+      entries on first read.
+    """
+
+    def __init__(self, client, bucket: str, layout: str = ENTRIES, max_retries: int = 8,
+                 retry_backoff: float = 0.05, fetch_concurrency: int = 8, sleep=time.sleep):
+        if layout not in (SINGLE, ENTRIES):
+            raise ValueError(f"Unknown registry layout {layout!r}")
+        self._client = client
+        self._bucket = bucket
+        self.layout = layout
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._fetch_concurrency = fetch_concurrency
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._single = None    # (etag, data) of registry.json
+        self._entries = {}     # object key -> (etag, entry)
+        self.conflicts = 0
+        self.not_modified = 0
+        self.fetches = 0
+
+    # Public API -----------------------------------------------------------
+
+    def get(self) -> dict:
+        if self.layout == SINGLE:
+            _, data = self._read_single()
+            return data
+        return {"indexed_files": self._read_entries()}
+
+    def upsert(self, entry: dict) -> dict:
+        """Adds or replaces the entry with the same name."""
+        if self.layout == SINGLE:
+            def apply(files):
+                return [f for f in files if f.get("name") != entry["name"]] + [entry]
+            self._update_single(apply)
+        else:
+            self._put_entry(entry)
+        return entry
+
+    def remove(self, name: str) -> bool:
+        """Drops the entry for `name`; returns whether one existed."""
+        if self.layout == SINGLE:
+            removed = []
+
+            def apply(files):
+                kept = [f for f in files if f.get("name") != name]
+                removed[:] = [len(kept) != len(files)]
+                return kept
+            self._update_single(apply, skip_unchanged=True)
+            return bool(removed and removed[0])
+        key = self.entry_key(name)
+        existed = self._head(key)
+        self._client.delete_object(Bucket=self._bucket, Key=key)
+        with self._lock:
+            self._entries.pop(key, None)
+        return existed
+
+    def replace(self, files) -> None:
+        """Writes a whole registry (O(number of files)); prefer upsert/remove."""
+        if self.layout == SINGLE:
+            self._update_single(lambda _: list(files))
+            return
+        wanted = {self.entry_key(f["name"]): f for f in files}
+        for key in set(self._list_entry_etags()) - set(wanted):
+            self._client.delete_object(Bucket=self._bucket, Key=key)
+            with self._lock:
+                self._entries.pop(key, None)
+        for entry in wanted.values():
+            self._put_entry(entry)
+
+    def stats(self) -> dict:
+        return {
+            "layout": self.layout,
+            "cached_entries": len(self._entries) if self.layout == ENTRIES else None,
+            "not_modified": self.not_modified,
+            "fetches": self.fetches,
+            "conflicts": self.conflicts,
+        }
+
+    @staticmethod
+    def entry_key(name: str) -> str:
+        return ENTRIES_PREFIX + quote(name, safe="") + ".json"
+
+    # single layout --------------------------------------------------------
+
+    def _read_single(self):
+        """(etag, data) of registry.json; etag None if it does not exist yet."""
+        with self._lock:
+            cached = self._single
+        params = dict(Bucket=self._bucket, Key=LEGACY_REGISTRY_KEY)
+        if cached and cached[0]:
+            params["IfNoneMatch"] = cached[0]
+        try:
+            response = self._client.get_object(**params)
+        except ClientError as e:
+            if cached and is_not_modified(e):
+                self.not_modified += 1
+                return cached[0], json.loads(json.dumps(cached[1]))
+            if is_not_found(e):
+                return None, {"indexed_files": []}
+            raise
+        self.fetches += 1
+        data = json.loads(response["Body"].read().decode("utf-8"))
+        data.setdefault("indexed_files", [])
+        with self._lock:
+            self._single = (response["ETag"], data)
+        # Callers mutate what they get; keep the cached copy pristine
+        return response["ETag"], json.loads(json.dumps(data))
+
+    def _update_single(self, apply, skip_unchanged: bool = False):
+        for attempt in range(self._max_retries + 1):
+            etag, data = self._read_single()
+            files = apply(list(data["indexed_files"]))
+            if skip_unchanged and files == data["indexed_files"]:
+                return
+            data["indexed_files"] = files
+            body = json.dumps(data, indent=2)
+            # Only write over the version we read; create only if still absent
+            condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+            try:
+                response = self._client.put_object(
+                    Bucket=self._bucket, Key=LEGACY_REGISTRY_KEY, Body=body,
+                    ContentType="application/json", ACL="private", **condition
+                )
+            except ClientError as e:
+                if not is_precondition_failed(e):
+                    raise
+                self.conflicts += 1
+                with self._lock:
+                    self._single = None
+                self._sleep(self._retry_backoff * 2 ** attempt * random.random())
+                continue
+            with self._lock:
+                self._single = (response.get("ETag"), data)
+            return
+        raise RegistryConflictError(
+            f"registry.json kept changing underneath us; gave up after {self._max_retries} retries"
+        )
+
+    # entries layout -------------------------------------------------------
+
+    def _head(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=key)
+            return True
+        except ClientError as e:
+            if is_not_found(e):
+                return False
+            raise
+
+    def _put_entry(self, entry: dict):
+        key = self.entry_key(entry["name"])
+        response = self._client.put_object(
+            Bucket=self._bucket, Key=key, Body=json.dumps(entry),
+            ContentType="application/json", ACL="private"
+        )
+        with self._lock:
+            self._entries[key] = (response.get("ETag"), entry)
+
+    def _list_entry_etags(self) -> dict:
+        etags, token = {}, None
+        while True:
+            params = dict(Bucket=self._bucket, Prefix=ENTRIES_PREFIX)
+            if token:
+                params["ContinuationToken"] = token
+            response = self._client.list_objects_v2(**params)
+            for obj in response.get("Contents", []):
+                etags[obj["Key"]] = obj["ETag"]
+            if not response.get("IsTruncated"):
+                return etags
+            token = response["NextContinuationToken"]
+
+    def _fetch_entry(self, key: str):
+        try:
+            response = self._client.get_object(Bucket=self._bucket, Key=key)
+        except ClientError as e:
+            if is_not_found(e):
+                return key, None  # deleted between LIST and GET
+            raise
+        self.fetches += 1
+        return key, (response["ETag"], json.loads(response["Body"].read().decode("utf-8")))
+
+    def _read_entries(self):
+        etags = self._list_entry_etags()
+        if not etags and self._migrate_legacy():
+            etags = self._list_entry_etags()
+        with self._lock:
+            stale = [key for key, etag in etags.items() if self._entries.get(key, (None,))[0] != etag]
+            self.not_modified += len(etags) - len(stale)
+        if stale:
+            with ThreadPoolExecutor(max_workers=self._fetch_concurrency) as pool:
+                fetched = list(pool.map(self._fetch_entry, stale))
+        else:
+            fetched = []
+        with self._lock:
+            for key in list(self._entries):
+                if key not in etags:
+                    del self._entries[key]
+            for key, value in fetched:
+                if value is None:
+                    self._entries.pop(key, None)
+                else:
+                    self._entries[key] = value
+            files = [entry for _, entry in self._entries.values()]
+        return sorted(files, key=lambda f: (f.get("indexed_at") or "", f.get("name", "")))
+
+    def _migrate_legacy(self) -> bool:
+        """Copies a legacy registry.json into per-file entries (it is left in place)."""
+        try:
+            response = self._client.get_object(Bucket=self._bucket, Key=LEGACY_REGISTRY_KEY)
+        except ClientError as e:
+            if is_not_found(e):
+                return False
+            raise
+        files = json.loads(response["Body"].read().decode("utf-8")).get("indexed_files", [])
+        for entry in files:
+            self._put_entry(entry)
+        print(f"Migrated {len(files)} registry.json entries to {ENTRIES_PREFIX}")
+        return bool(files)
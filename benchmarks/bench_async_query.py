@@ -0,0 +1,90 @@
+"""
+Concurrency benchmark for the /ask query path against stubbed backends.
+
+Compares the old blocking call (engine.query inside the async handler) with
+engine.aquery, then drives /api/ask itself through httpx's ASGI transport.
+
+    uv run python -m benchmarks.bench_async_query --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+# Questions repeat across runs; measure the engine, not the answer cache
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+import httpx
+from llama_index.core import Settings, VectorStoreIndex
+
+from benchmarks.corpus import QUESTIONS, build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+
+def build_index(latency: float):
+    # Ingest without latency; only the query path is measured. The index keeps
+    # this embed model for retrieval, so latency is injected after building.
+    embed_model = LatencyEmbedding(embed_dim=64)
+    Settings.embed_model = embed_model
+    index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    embed_model.latency = latency / 5
+    Settings.llm = LatencyLLM(latency=latency)
+    return index
+
+
+async def run_engine(engine, concurrency: int, use_async: bool) -> float:
+    async def one(i):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        if use_async:
+            return await engine.aquery(question)
+        return engine.query(question)  # what execute_rag_logic used to do
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_app(app, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            resp = await client.post("/api/ask", json={
+                "fund_id": "fund_1",
+                "question": QUESTIONS[i % len(QUESTIONS)],
+            })
+            resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        return time.perf_counter() - start
+
+
+async def main(latency: float, levels):
+    # Import after the env default so app.core.config can initialise
+    from main import app
+    from app.api.dependencies import verify_api_key
+    from app.engine.query_engine import get_smsf_query_engine
+
+    index = build_index(latency)
+    engine = get_smsf_query_engine(fund_id="fund_1", vector_index=index)
+
+    app.state.vector_index = index
+    app.dependency_overrides[verify_api_key] = lambda: "bench"
+
+    print(f"stub latency per LLM call: {latency * 1000:.0f} ms")
+    print(f"{'in-flight':>9} | {'blocking req/s':>14} | {'aquery req/s':>12} | {'/api/ask req/s':>14}")
+    for n in levels:
+        blocking = await run_engine(engine, n, use_async=False)
+        concurrent = await run_engine(engine, n, use_async=True)
+        via_app = await run_app(app, n)
+        print(f"{n:>9} | {n / blocking:>14.1f} | {n / concurrent:>12.1f} | {n / via_app:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.levels))
@@ -0,0 +1,122 @@
+"""
+Flat vs auto-merging retrieval (HIERARCHY_MODE): tokens per answer, LLM
+calls, retrieval and answer latency, and the parent-lookup cost.
+
+The corpus is the long fixture sections from bench_context_packing, parsed
+2048/512/128 like ingestion: every node goes to a SQLite docstore (the parent
+store), the leaves to in-memory Qdrant. Answers go through the production
+synthesis path, context packing included (--no-packing to compare raw).
+
+    uv run python -m benchmarks.bench_auto_merging
+    uv run python -m benchmarks.bench_auto_merging --top-k 5 10 20 --ratio 0.3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from benchmarks.bench_context_packing import long_documents
+from benchmarks.corpus import QUESTIONS
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+MODES = ("flat", "auto_merging")
+
+
+def build(persist_dir: str, embed_model):
+    from app.core.docstore import SQLiteDocumentStore
+    from app.ingestion.utils import get_parent_child_nodes
+
+    nodes, leaves = get_parent_child_nodes(long_documents())
+    SQLiteDocumentStore.from_persist_dir(persist_dir).add_documents(nodes)
+    embeddings = embed_model.get_text_embedding_batch([leaf.get_content(metadata_mode="embed") for leaf in leaves])
+    for leaf, embedding in zip(leaves, embeddings):
+        leaf.embedding = embedding
+    vector_store = QdrantVectorStore(collection_name="bench_auto_merging", client=QdrantClient(":memory:"))
+    vector_store.add(leaves)
+    index = VectorStoreIndex.from_vector_store(
+        vector_store, storage_context=StorageContext.from_defaults(vector_store=vector_store)
+    )
+    return index, len(nodes), len(leaves)
+
+
+def run(index, parents, mode: str, top_k: int, ratio: float, packing: bool) -> dict:
+    from app.core.instrumentation import track_stages
+    from app.engine.auto_merging import AutoMergeRetriever
+    from app.engine.context_packer import ContextPacker
+    from app.engine.query_engine import SMSF_QA_PROMPT, SMSF_REFINE_PROMPT
+
+    retriever = index.as_retriever(similarity_top_k=top_k)
+    if mode == "auto_merging":
+        retriever = AutoMergeRetriever(retriever, parents, ratio=ratio)
+    engine = RetrieverQueryEngine.from_args(
+        retriever,
+        llm=Settings.llm,
+        node_postprocessors=[ContextPacker.from_settings()] if packing else [],
+        text_qa_template=SMSF_QA_PROMPT,
+        refine_template=SMSF_REFINE_PROMPT,
+    )
+    retrieval_ms, answer_ms, merge_ms, tokens, calls, nodes = [], [], [], [], [], []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        retriever.retrieve(question)
+        retrieval_ms.append(1000 * (time.perf_counter() - start))
+
+        with track_stages("bench_auto_merging") as timings:
+            start = time.perf_counter()
+            response = engine.query(question)
+            answer_ms.append(1000 * (time.perf_counter() - start))
+        merge_ms.append(1000 * timings.stage_seconds().get("auto_merge", 0.0))
+        tokens.append(timings.prompt_tokens + timings.completion_tokens)
+        calls.append(timings.llm_calls)
+        nodes.append(len(response.source_nodes))
+    return {
+        "tokens": statistics.mean(tokens),
+        "llm_calls": statistics.mean(calls),
+        "nodes": statistics.mean(nodes),
+        "retrieval_ms": statistics.median(retrieval_ms),
+        "answer_ms": statistics.median(answer_ms),
+        "merge_ms": statistics.median(merge_ms),
+    }
+
+
+def main(top_ks, ratio: float, packing: bool, embed_latency: float, llm_latency: float):
+    from app.engine.auto_merging import ParentStore
+
+    Settings.llm = LatencyLLM(latency=llm_latency)
+    Settings.embed_model = LatencyEmbedding(embed_dim=256, latency=embed_latency)
+    with tempfile.TemporaryDirectory() as persist_dir:
+        index, node_count, leaf_count = build(persist_dir, Settings.embed_model)
+        parents = ParentStore([persist_dir])
+        print(f"{node_count} nodes ({leaf_count} leaves), {len(QUESTIONS)} questions, ratio {ratio}, "
+              f"packing {'on' if packing else 'off'}")
+        print(f"{'top_k':>5} | {'mode':>12} | {'tokens/answer':>13} | {'LLM calls':>9} | {'nodes':>5} | "
+              f"{'retrieve ms':>11} | {'merge ms':>8} | {'answer ms':>9}")
+        for top_k in top_ks:
+            for mode in MODES:
+                row = run(index, parents, mode, top_k, ratio, packing)
+                print(f"{top_k:>5} | {mode:>12} | {row['tokens']:>13.0f} | {row['llm_calls']:>9.2f} | "
+                      f"{row['nodes']:>5.1f} | {row['retrieval_ms']:>11.2f} | {row['merge_ms']:>8.2f} | "
+                      f"{row['answer_ms']:>9.2f}")
+        stats = parents.stats()
+        print(f"Parent store: {stats['misses']} SQLite lookups, {stats['hits']} cache hits")
+        parents.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--ratio", type=float, default=0.5, help="AUTO_MERGE_RATIO")
+    parser.add_argument("--no-packing", action="store_true")
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    main(args.top_k, args.ratio, not args.no_packing, args.embed_latency, args.llm_latency)
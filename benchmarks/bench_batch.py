@@ -0,0 +1,66 @@
+"""
+Per-batch throughput of /api/ask/batch vs the back-office loop that posts
+each question to /api/ask one by one, against stubbed backends.
+
+    uv run python -m benchmarks.bench_batch --questions 32 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+# Every question in the batch is distinct work; don't let the answer cache help
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+import httpx
+from llama_index.core import Settings, VectorStoreIndex
+
+from benchmarks.corpus import QUESTIONS, build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+
+async def main(n_questions: int, latency: float, concurrency):
+    from main import app
+    from app.api.dependencies import verify_api_key
+    from app.core.config import settings
+
+    # The index keeps its embed model for retrieval, so inject latency after building
+    embed_model = LatencyEmbedding(embed_dim=64)
+    Settings.embed_model = embed_model
+    app.state.vector_index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    embed_model.latency = latency / 5
+    Settings.llm = LatencyLLM(latency=latency)
+    app.dependency_overrides[verify_api_key] = lambda: "bench"
+
+    questions = [f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})" for i in range(n_questions)]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        embed_model.requests = 0
+        start = time.perf_counter()
+        for question in questions:
+            resp = await client.post("/api/ask", json={"fund_id": "fund_1", "question": question})
+            resp.raise_for_status()
+        sequential = time.perf_counter() - start
+        print(f"{'mode':>22} | {'wall s':>6} | {'q/s':>6} | {'embed requests':>14}")
+        print(f"{'sequential /api/ask':>22} | {sequential:>6.2f} | {n_questions / sequential:>6.1f} | {embed_model.requests:>14}")
+
+        for limit in concurrency:
+            settings.BATCH_MAX_CONCURRENCY = limit
+            embed_model.requests = 0
+            start = time.perf_counter()
+            resp = await client.post("/api/ask/batch", json={"fund_id": "fund_1", "questions": questions})
+            resp.raise_for_status()
+            elapsed = time.perf_counter() - start
+            label = f"batch (concurrency {limit})"
+            print(f"{label:>22} | {elapsed:>6.2f} | {n_questions / elapsed:>6.1f} | {embed_model.requests:>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.latency, args.concurrency))
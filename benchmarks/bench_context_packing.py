@@ -0,0 +1,112 @@
+"""
+Context packing benchmark: LLM calls and prompt tokens per answer with the
+default synthesis over the raw top-k leaves ("before") and with ContextPacker
+(score cutoff, dedupe, merged sibling leaves, CONTEXT_TOKEN_BUDGET; "after").
+
+The corpus is the fixture sections written out at length, so a section spans
+several overlapping 128-token leaves (HierarchicalNodeParser 2048/512/128), and
+every leaf is indexed twice, as when the same document sits in the served index
+and an ingestion collection. Once the retrieved context overflows the LLM
+window, the default compact synthesis turns into a refine chain of sequential
+calls; --context-window sets the window (the app sets Settings.context_window
+= 128000, so there the "before" column is one call with more tokens).
+
+    uv run python -m benchmarks.bench_context_packing
+    uv run python -m benchmarks.bench_context_packing --context-window 128000 --top-k 5 10
+"""
+import argparse
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Document, Settings, VectorStoreIndex
+
+from benchmarks.corpus import QUESTIONS, SIS_SECTIONS
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+ELABORATIONS = (
+    "This requirement applies to every trustee and director of a corporate trustee of the fund.",
+    "The Commissioner of Taxation administers this provision for self managed superannuation funds.",
+    "A contravention may result in the fund being made non-complying and civil or criminal penalties.",
+    "Trustees should document how each decision satisfies this provision in the minutes of the fund.",
+    "The auditor of the fund reports contraventions of this provision to the Commissioner.",
+    "Related party and arm's length considerations must be assessed before any transaction proceeds.",
+)
+
+
+def long_documents(paragraphs: int = 12):
+    """Each fixture SIS section as a long provision: numbered subsections restating and elaborating it."""
+    docs = []
+    for section, text in SIS_SECTIONS:
+        body = [f"Superannuation Industry (Supervision) Act 1993 section {section}. {text}"]
+        for n in range(1, paragraphs + 1):
+            extra = " ".join(ELABORATIONS[(n + i) % len(ELABORATIONS)] for i in range(3))
+            body.append(f"Subsection ({n}) of section {section}: {text} {extra}")
+        docs.append(Document(
+            text="\n\n".join(body),
+            metadata={"doc_type": "legislation", "category": "legislation", "fund_id": "global", "section": section},
+        ))
+    return docs
+
+
+def build_index(embed_model):
+    from app.ingestion.utils import get_parent_child_nodes
+
+    _, leaves = get_parent_child_nodes(long_documents())
+    copies = [leaf.model_copy(update={"id_": f"copy-{leaf.node_id}"}) for leaf in leaves]
+    return VectorStoreIndex(leaves + copies, embed_model=embed_model), len(leaves)
+
+
+def measure(index, top_k: int, postprocessors) -> dict:
+    from app.core.instrumentation import track_stages
+    from app.engine.query_engine import SMSF_QA_PROMPT, SMSF_REFINE_PROMPT
+
+    engine = index.as_query_engine(
+        similarity_top_k=top_k,
+        node_postprocessors=postprocessors,
+        text_qa_template=SMSF_QA_PROMPT,
+        refine_template=SMSF_REFINE_PROMPT,
+    )
+    calls, tokens, nodes = [], [], []
+    for question in QUESTIONS:
+        with track_stages("bench_context_packing") as timings:
+            response = engine.query(question)
+        calls.append(timings.llm_calls)
+        tokens.append(timings.prompt_tokens)
+        nodes.append(len(response.source_nodes))
+    n = len(QUESTIONS)
+    return {"llm_calls": sum(calls) / n, "prompt_tokens": sum(tokens) / n, "nodes": sum(nodes) / n}
+
+
+def main(top_ks, context_window: int, budget: int, cutoff: float):
+    from app.engine.context_packer import ContextPacker
+
+    Settings.llm = LatencyLLM(context_window=context_window)
+    Settings.context_window = context_window  # app.core.config pins the prompt helper to 128k
+    Settings.embed_model = LatencyEmbedding(embed_dim=256)
+    index, leaves = build_index(Settings.embed_model)
+    packer = ContextPacker(score_cutoff=cutoff, token_budget=budget)
+
+    print(f"{leaves} leaves (each indexed twice), {len(QUESTIONS)} questions, LLM window {context_window}, "
+          f"budget {budget}, cutoff {cutoff}")
+    print(f"{'top_k':>5} | {'calls before':>12} | {'calls after':>11} | {'prompt tok before':>17} | "
+          f"{'prompt tok after':>16} | {'nodes before':>12} | {'spans after':>11}")
+    for top_k in top_ks:
+        before = measure(index, top_k, [])
+        after = measure(index, top_k, [packer])
+        print(f"{top_k:>5} | {before['llm_calls']:>12.2f} | {after['llm_calls']:>11.2f} | "
+              f"{before['prompt_tokens']:>17.0f} | {after['prompt_tokens']:>16.0f} | "
+              f"{before['nodes']:>12.1f} | {after['nodes']:>11.1f}")
+
+
+if __name__ == "__main__":
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--context-window", type=int, default=4096)
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--cutoff", type=float, default=settings.CONTEXT_SCORE_CUTOFF)
+    args = parser.parse_args()
+    main(args.top_k, args.context_window, args.budget, args.cutoff)
@@ -0,0 +1,109 @@
+"""
+Ingestion embedding throughput: VectorStoreIndex(leaf_nodes, ...) (sequential
+100-input batches, as the ingestion modules did) vs the EmbeddingScheduler at
+several concurrency levels, embedding SIS-style 128-token leaves with a fake
+embedder (per-request + per-input latency) and upserting into in-memory Qdrant.
+With --tpm the fake embedder also enforces a tokens-per-minute budget and
+answers 429s; set --scheduler-tpm above it (an over-optimistic
+EMBED_TOKENS_PER_MINUTE) to see the token bucket back off.
+
+    uv run python -m benchmarks.bench_embedding_scheduler --copies 400 --concurrency 1 2 4 8 16
+    uv run python -m benchmarks.bench_embedding_scheduler --tpm 1500000 --scheduler-tpm 3000000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from qdrant_client import QdrantClient
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+
+from benchmarks.corpus import build_legislation_documents
+from benchmarks.stubs import RateLimitedEmbedding
+
+# Rate limits are enforced over 1s windows so the benchmark stays short
+WINDOW_SECONDS = 1.0
+
+
+def make_embed_model(args):
+    return RateLimitedEmbedding(
+        embed_dim=64,
+        latency=args.latency,
+        item_latency=args.item_latency,
+        embed_batch_size=args.batch_inputs,
+        tokens_per_minute=args.tpm or 0,
+        window_seconds=WINDOW_SECONDS,
+    )
+
+
+def run_baseline(leaves, client, args):
+    embed_model = make_embed_model(args)
+    embed_model.embed_batch_size = 100  # OpenAIEmbedding default
+    vector_store = QdrantVectorStore(collection_name="baseline", client=client)
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    start = time.perf_counter()
+    try:
+        VectorStoreIndex(leaves, storage_context=storage_context, embed_model=embed_model)
+        status = "ok"
+    except Exception as e:
+        status = f"failed: {type(e).__name__}"
+    return time.perf_counter() - start, embed_model, status
+
+
+def run_scheduler(leaves, client, concurrency, args):
+    from app.ingestion.embedding_scheduler import EmbeddingScheduler, TokenBucket, aembed_and_upsert
+
+    embed_model = make_embed_model(args)
+    scheduler = EmbeddingScheduler(
+        embed_model=embed_model,
+        max_concurrency=concurrency,
+        max_batch_inputs=args.batch_inputs,
+        tokens_per_minute=10**9,
+        bucket=TokenBucket(args.scheduler_tpm, burst_seconds=WINDOW_SECONDS) if args.scheduler_tpm else None,
+    )
+    vector_store = QdrantVectorStore(collection_name=f"scheduler_{concurrency}", client=client)
+    start = time.perf_counter()
+    asyncio.run(aembed_and_upsert(leaves, vector_store, scheduler=scheduler))
+    return time.perf_counter() - start, embed_model, scheduler
+
+
+def main(args):
+    from app.ingestion.utils import get_parent_child_nodes
+
+    _, leaves = get_parent_child_nodes(build_legislation_documents(copies=args.copies))
+    # Pad leaves towards the 128-token chunk size of the real SIS Act
+    for leaf in leaves:
+        leaf.set_content((leaf.get_content() + " ") * 4)
+    client = QdrantClient(":memory:")
+    print(f"{len(leaves)} leaves, request latency {args.latency}s + {args.item_latency}s/input"
+          + (f", limit {args.tpm} tokens/min (scheduler paces to {args.scheduler_tpm})" if args.tpm else ""))
+    print(f"{'mode':>26} | {'wall s':>6} | {'leaves/s':>8} | {'requests':>8} | {'429s':>5}")
+
+    elapsed, embed_model, status = run_baseline(leaves, client, args)
+    label = "VectorStoreIndex" if status == "ok" else f"VectorStoreIndex ({status})"
+    print(f"{label:>26} | {elapsed:>6.2f} | {len(leaves) / elapsed:>8.1f} | "
+          f"{embed_model.requests:>8} | {embed_model.rate_limited:>5}")
+
+    for concurrency in args.concurrency:
+        elapsed, embed_model, scheduler = run_scheduler(leaves, client, concurrency, args)
+        label = f"scheduler (concurrency {concurrency})"
+        print(f"{label:>26} | {elapsed:>6.2f} | {len(leaves) / elapsed:>8.1f} | "
+              f"{embed_model.requests:>8} | {embed_model.rate_limited:>5}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=400, help="copies of the SIS fixture sections")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--item-latency", type=float, default=0.002)
+    parser.add_argument("--batch-inputs", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--tpm", type=int, default=None, help="fake embedder's real limit")
+    parser.add_argument("--scheduler-tpm", type=int, default=None, help="limit the scheduler paces to")
+    args = parser.parse_args()
+    args.scheduler_tpm = args.scheduler_tpm or args.tpm
+    main(args)
@@ -0,0 +1,95 @@
+"""
+Fan-out vs router benchmark: end-to-end /ask latency and which sources reach
+the answer, with injected Qdrant search latency per collection and LLM
+latency. Compares the one-tool router (LLM selection + one search), the same
+sources searched one after another, and the concurrent fan-out.
+
+    uv run python -m benchmarks.bench_fanout --search-latency 0.08 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.schema import QueryBundle
+
+from benchmarks.corpus import QUESTIONS, build_corpus, build_deed_documents, build_legislation_documents, build_ruling_documents
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM, add_search_latency
+
+CROSS_SOURCE_QUESTIONS = [
+    "Does TR 2021/3 affect our deed's clause 12.4 borrowing?",
+    "Can my fund buy business real property from a related party under SMSFR 2009/2 and our deed?",
+    "Does the sole purpose test in SMSFR 2008/2 limit clause 9.3 pension payments?",
+]
+
+
+def _p50(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+async def run_sequential(engine, question: str):
+    """The fan-out's sources searched one after another, then one synthesis."""
+    retriever = engine.retriever
+    bundle = QueryBundle(question)
+    bundle.embedding = await Settings.embed_model.aget_query_embedding(question)
+    results = [await source.retriever.aretrieve(bundle) for source in retriever._sources]
+    nodes = retriever._merge(results)
+    return await engine._response_synthesizer.asynthesize(bundle, nodes=nodes)
+
+
+def main(search_latency: float, llm_latency: float, repeats: int):
+    from app.core.config import settings
+    from app.engine.query_engine import get_fanout_query_engine, get_smsf_query_engine
+
+    Settings.llm = LatencyLLM(latency=llm_latency)
+    Settings.embed_model = LatencyEmbedding(embed_dim=256)
+    served = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1", "fund_2"]))
+    collections = {
+        "legislation": VectorStoreIndex.from_documents(build_legislation_documents()),
+        "ato_rulings": VectorStoreIndex.from_documents(build_ruling_documents()),
+        "trust_deeds": VectorStoreIndex.from_documents(build_deed_documents(["fund_1", "fund_2"])),
+    }
+    for index in [served, *collections.values()]:
+        add_search_latency(index.vector_store, search_latency)
+
+    settings.ROUTER_MODE = "llm"
+    router = get_smsf_query_engine("fund_1", served)
+    fanout = get_fanout_query_engine("fund_1", served, collections=collections)
+    questions = (QUESTIONS + CROSS_SOURCE_QUESTIONS) * repeats
+
+    async def timed(run):
+        latencies, ruling_hits, deed_hits = [], 0, 0
+        for question in questions:
+            start = time.perf_counter()
+            response = await run(question)
+            latencies.append(time.perf_counter() - start)
+            kinds = {n.node.metadata.get("doc_type") for n in response.source_nodes}
+            ruling_hits += "ruling" in kinds
+            deed_hits += "trust_deed" in kinds
+        return _p50(latencies), ruling_hits / len(questions), deed_hits / len(questions)
+
+    modes = [
+        ("router (1 tool)", lambda q: router.aquery(q)),
+        ("sequential", lambda q: run_sequential(fanout, q)),
+        ("fan-out", lambda q: fanout.aquery(q)),
+    ]
+    print(f"{len(fanout.retriever.source_names)} sources: {', '.join(fanout.retriever.source_names)}")
+    print(f"search latency {1000 * search_latency:.0f} ms per source, LLM latency {1000 * llm_latency:.0f} ms")
+    print(f"{'mode':>16} | {'p50 ms':>7} | {'with ruling':>11} | {'with deed':>9}")
+    for name, run in modes:
+        p50, rulings, deeds = asyncio.run(timed(run))
+        print(f"{name:>16} | {1000 * p50:>7.0f} | {rulings:>11.0%} | {deeds:>9.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--search-latency", type=float, default=0.08)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+    main(args.search_latency, args.llm_latency, args.repeats)
@@ -0,0 +1,90 @@
+"""
+Citation retrieval benchmark: recall@k and retrieval latency of dense-only vs
+hybrid (dense + BM25 sparse, reciprocal rank fusion) on look-alike SIS
+sections and deed clauses, using in-memory Qdrant and a stub embedder that
+ignores citation numbers (as real dense models largely do).
+
+    uv run python -m benchmarks.bench_hybrid --sections 200 --clauses 60
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from qdrant_client import QdrantClient
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.vector_stores import ExactMatchFilter, MetadataFilters
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+
+from benchmarks.corpus import build_citation_corpus
+from benchmarks.stubs import CitationBlindEmbedding
+
+K_VALUES = (1, 3, 5)
+
+
+def build_index(client, name, docs, embed_model, **store_options):
+    vector_store = QdrantVectorStore(collection_name=name, client=client, **store_options)
+    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    return VectorStoreIndex.from_documents(docs, storage_context=storage_context, embed_model=embed_model)
+
+
+def evaluate(index, cases, retriever_kwargs):
+    hits = {k: 0 for k in K_VALUES}
+    latencies = []
+    for question, doc_type, key, citation in cases:
+        retriever = index.as_retriever(
+            similarity_top_k=max(K_VALUES),
+            filters=MetadataFilters(filters=[ExactMatchFilter(key="doc_type", value=doc_type)]),
+            **retriever_kwargs,
+        )
+        start = time.perf_counter()
+        nodes = retriever.retrieve(question)
+        latencies.append(time.perf_counter() - start)
+        ranked = [n.node.metadata.get(key) for n in nodes]
+        for k in K_VALUES:
+            hits[k] += citation in ranked[:k]
+    latencies.sort()
+    recall = {k: hits[k] / len(cases) for k in K_VALUES}
+    return recall, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main(n_sections: int, n_clauses: int, embed_latency: float):
+    from app.core.config import settings
+    from app.core.qdrant import vector_store_options
+
+    docs, cases = build_citation_corpus(n_sections, n_clauses)
+    embed_model = CitationBlindEmbedding(embed_dim=256)
+    client = QdrantClient(":memory:")
+
+    settings.RETRIEVAL_MODE = "hybrid"
+    dense_index = build_index(client, "dense", docs, embed_model)
+    hybrid_index = build_index(client, "hybrid", docs, embed_model, **vector_store_options(settings))
+    embed_model.latency = embed_latency
+
+    modes = [
+        ("dense", dense_index, {}),
+        ("hybrid", hybrid_index, dict(
+            vector_store_query_mode="hybrid",
+            sparse_top_k=settings.HYBRID_SPARSE_TOP_K,
+            hybrid_top_k=max(K_VALUES),
+        )),
+        ("sparse", hybrid_index, dict(vector_store_query_mode="sparse", sparse_top_k=max(K_VALUES))),
+    ]
+    header = " | ".join(f"{'recall@' + str(k):>9}" for k in K_VALUES)
+    print(f"{len(cases)} citation questions over {len(docs)} provisions")
+    print(f"{'mode':>7} | {header} | {'p50 ms':>7} | {'p95 ms':>7}")
+    for name, index, retriever_kwargs in modes:
+        recall, p50, p95 = evaluate(index, cases, retriever_kwargs)
+        row = " | ".join(f"{recall[k]:>9.2%}" for k in K_VALUES)
+        print(f"{name:>7} | {row} | {1000 * p50:>7.1f} | {1000 * p95:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--clauses", type=int, default=60)
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    main(args.sections, args.clauses, args.embed_latency)
@@ -0,0 +1,119 @@
+"""
+Full reload wall-clock: the old run_ingestion loop (download, parse, embed
+one task after another) vs IngestionOrchestrator with 1..N parse workers,
+on generated ruling PDFs. Downloads are local copies with injected latency,
+embeddings come from a fake embedder with per-request latency, vectors go
+to in-memory Qdrant and docstores to a temp dir.
+
+    uv run python -m benchmarks.bench_parallel_ingestion --files 8 --pages 150 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import StorageContext
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from benchmarks.corpus import write_pdf_fixture
+from benchmarks.stubs import LatencyEmbedding, serialize_adds
+
+
+def make_env(args, source_dir, run_dir):
+    from app.core.docstore import SQLiteDocumentStore
+    from app.ingestion.embedding_scheduler import EmbeddingScheduler
+
+    client = QdrantClient(":memory:")
+
+    def download(remote_key, local_path):
+        time.sleep(args.download_latency)
+        shutil.copy(os.path.join(source_dir, os.path.basename(remote_key)), local_path)
+
+    def storage_factory(collection, persist_dir):
+        vector_store = serialize_adds(QdrantVectorStore(collection_name=collection, client=client))
+        docstore = SQLiteDocumentStore.from_persist_dir(persist_dir)
+        return StorageContext.from_defaults(vector_store=vector_store, docstore=docstore), vector_store
+
+    def make_scheduler():
+        return EmbeddingScheduler(
+            embed_model=LatencyEmbedding(embed_dim=64, latency=args.embed_latency, embed_batch_size=128),
+            max_concurrency=8, tokens_per_minute=10**9,
+        )
+
+    return download, storage_factory, make_scheduler
+
+
+def run_sequential(tasks, args, source_dir, run_dir):
+    from app.ingestion.ato_ruling import aindex_ato_ruling, parse_ato_ruling
+
+    download, storage_factory, make_scheduler = make_env(args, source_dir, run_dir)
+    os.makedirs(run_dir, exist_ok=True)
+    start = time.perf_counter()
+    for _, remote_key, identifier in tasks:
+        local_path = os.path.join(run_dir, os.path.basename(remote_key))
+        download(remote_key, local_path)
+        nodes, leaf_nodes = parse_ato_ruling(local_path, identifier)
+        # Like the old modules: a fresh storage context and scheduler per task
+        storage = storage_factory("ato_rulings", persist_dir=os.path.join(run_dir, "rulings"))
+        asyncio.run(aindex_ato_ruling(nodes, leaf_nodes, storage=storage, scheduler=make_scheduler()))
+    return time.perf_counter() - start
+
+
+def run_orchestrator(tasks, workers, args, source_dir, run_dir):
+    from app.ingestion.ato_ruling import aindex_ato_ruling, parse_ato_ruling
+    from app.ingestion.run_ingestion import IngestionOrchestrator
+
+    download, storage_factory, make_scheduler = make_env(args, source_dir, run_dir)
+    categories = {"ruling": (parse_ato_ruling, aindex_ato_ruling, "ato_rulings", os.path.join(run_dir, "rulings"))}
+    orchestrator = IngestionOrchestrator(
+        download=download, storage_factory=storage_factory, scheduler=make_scheduler(),
+        parse_workers=workers, download_concurrency=4, work_dir=os.path.join(run_dir, "work"),
+        categories=categories,
+    )
+    start = time.perf_counter()
+    reports = asyncio.run(orchestrator.run(tasks))
+    assert all(r["status"] == "ok" for r in reports), reports
+    return time.perf_counter() - start
+
+
+def main(args):
+    import contextlib
+    import io
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "spaces")
+        os.makedirs(source_dir)
+        tasks = []
+        for i in range(args.files):
+            name = f"TR_2024_{i}.pdf"
+            write_pdf_fixture(os.path.join(source_dir, name), args.pages)
+            tasks.append(("ruling", f"rulings/{name}", f"TR 2024/{i}"))
+        print(f"{args.files} PDFs x {args.pages} pages, {os.cpu_count()} cores, "
+              f"download {args.download_latency}s, embed request {args.embed_latency}s")
+        print(f"{'mode':>24} | {'wall s':>6} | {'speedup':>7}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            baseline = run_sequential(tasks, args, source_dir, os.path.join(tmp, "sequential"))
+        print(f"{'sequential loop':>24} | {baseline:>6.1f} | {1.0:>6.2f}x")
+        for workers in args.workers:
+            # tqdm writes to stderr, the ingestion modules print to stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = run_orchestrator(tasks, workers, args, source_dir, os.path.join(tmp, f"w{workers}"))
+            label = f"orchestrator ({workers} workers)"
+            print(f"{label:>24} | {elapsed:>6.1f} | {baseline / elapsed:>6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=150)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--download-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.2)
+    main(parser.parse_args())
@@ -0,0 +1,102 @@
+"""
+Filtered-search benchmark: latency of the private_deed filter (fund_id +
+doc_type) at 10, 1k and 10k funds, on a collection without payload indexes
+vs one bootstrapped by CollectionBootstrap (keyword indexes, fund_id as the
+tenant key, HNSW payload_m).
+
+Payload indexes only exist in server Qdrant; the in-memory client ignores
+them (and scans every point on filtered search), so pass --url to measure
+the difference:
+
+    docker run -p 6333:6333 qdrant/qdrant
+    uv run python -m benchmarks.bench_payload_indexes --url http://localhost:6333
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from qdrant_client import QdrantClient, models
+
+from app.core.qdrant import CollectionBootstrap
+from benchmarks.stubs import hashed_vector
+
+DIM = 128
+
+
+def vector(rng: random.Random):
+    return hashed_vector(" ".join(f"w{rng.randint(0, 5000)}" for _ in range(24)), DIM)
+
+
+def fill(client: QdrantClient, name: str, n_funds: int, deed_points: int, law_points: int, seed: int = 7):
+    client.create_collection(name, vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    rng = random.Random(seed)
+    payloads = [{"fund_id": "global", "doc_type": "legislation"} for _ in range(law_points)]
+    payloads += [{"fund_id": f"fund_{f}", "doc_type": "trust_deed"}
+                 for f in range(n_funds) for _ in range(deed_points)]
+    batch = []
+    for payload in payloads:
+        batch.append(models.PointStruct(id=str(uuid.uuid4()), vector=vector(rng), payload=payload))
+        if len(batch) == 1000:
+            client.upsert(name, batch, wait=True)
+            batch = []
+    if batch:
+        client.upsert(name, batch, wait=True)
+    return len(payloads)
+
+
+def wait_until_indexed(client: QdrantClient, name: str, timeout: float = 300.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get_collection(name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+
+
+def measure(client: QdrantClient, name: str, n_funds: int, queries: int, seed: int = 11):
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(queries):
+        fund = f"fund_{rng.randrange(n_funds)}"
+        query_filter = models.Filter(must=[
+            models.FieldCondition(key="fund_id", match=models.MatchValue(value=fund)),
+            models.FieldCondition(key="doc_type", match=models.MatchValue(value="trust_deed")),
+        ])
+        start = time.perf_counter()
+        hits = client.query_points(name, query=vector(rng), query_filter=query_filter, limit=5).points
+        latencies.append(time.perf_counter() - start)
+        assert all(hit.payload["fund_id"] == fund for hit in hits)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main(url: str, fund_counts, deed_points: int, law_points: int, queries: int):
+    client = QdrantClient(url=url) if url else QdrantClient(":memory:")
+    mode = url or "in-memory (payload indexes have no effect; use --url for server Qdrant)"
+    print(f"Qdrant: {mode}")
+    print(f"{'funds':>6} | {'points':>7} | {'layout':>7} | {'p50 ms':>7} | {'p95 ms':>7}")
+    for n_funds in fund_counts:
+        for layout in ("plain", "tenant"):
+            name = f"bench_{layout}_{n_funds}_{uuid.uuid4().hex[:6]}"
+            points = fill(client, name, n_funds, deed_points, law_points)
+            if layout == "tenant":
+                CollectionBootstrap(registry=None).ensure(name, client=client)
+            wait_until_indexed(client, name)
+            p50, p95 = measure(client, name, n_funds, queries)
+            print(f"{n_funds:>6} | {points:>7} | {layout:>7} | {1000 * p50:>7.2f} | {1000 * p95:>7.2f}")
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="server Qdrant URL (default: in-memory)")
+    parser.add_argument("--funds", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--deed-points", type=int, default=5, help="leaves per fund's deed")
+    parser.add_argument("--law-points", type=int, default=2000, help="global legislation leaves")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.url, args.funds, args.deed_points, args.law_points, args.queries)
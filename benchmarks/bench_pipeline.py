@@ -0,0 +1,214 @@
+"""
+Offline pipeline micro-benchmarks: times each stage of ingestion and
+answering on a fixture corpus, with in-memory Qdrant and stub models
+(LatencyEmbedding / LatencyLLM: MockEmbedding-style hashed vectors and a
+canned answer, optionally with injected latency), and writes the results to
+JSON. `compare` flags stages whose p50 got slower between two runs.
+
+Stages: chunking (HierarchicalNodeParser 2048/512/128), embedding, upsert,
+router selection, retrieval (QUERY_MODE fan-out sources) and synthesis.
+
+    uv run python -m benchmarks.bench_pipeline run --out bench-main.json
+    uv run python -m benchmarks.bench_pipeline run --out bench-branch.json
+    uv run python -m benchmarks.bench_pipeline compare bench-main.json bench-branch.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.response_synthesizers import get_response_synthesizer
+from llama_index.core.schema import QueryBundle
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from benchmarks.corpus import QUESTIONS, ROUTING_CASES, build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+STAGES = ("chunking", "embedding", "upsert", "router_selection", "retrieval", "synthesis")
+
+
+def _summary(samples, items: int) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "items": items,
+        "p50_ms": round(1000 * samples[len(samples) // 2], 3),
+        "p95_ms": round(1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(1000 * samples[0], 3),
+    }
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run_suite(funds: int = 20, legislation_copies: int = 5, repeats: int = 5,
+              embed_latency: float = 0.0, llm_latency: float = 0.0, embed_dim: int = 256) -> dict:
+    """Runs every stage `repeats` times; per-question stages are timed per question."""
+    from app.core.config import settings
+    from app.engine.fanout import build_sources
+    from app.engine.query_engine import (
+        SMSF_QA_PROMPT, build_router_selector, get_smsf_query_engine, retrieval_kwargs,
+    )
+    from app.ingestion.utils import get_parent_child_nodes
+
+    fund_ids = [f"fund_{i}" for i in range(funds)]
+    documents = build_corpus(fund_ids=fund_ids, legislation_copies=legislation_copies)
+    embed_model = LatencyEmbedding(embed_dim=embed_dim, latency=embed_latency)
+    llm = LatencyLLM(latency=llm_latency)
+    Settings.llm, Settings.embed_model = llm, embed_model
+    samples = {stage: [] for stage in STAGES}
+    items = {}
+
+    # 1. Chunking
+    for _ in range(repeats):
+        elapsed, (nodes, leaves) = _timed(lambda: get_parent_child_nodes(documents))
+        samples["chunking"].append(elapsed)
+    items["chunking"] = len(nodes)
+
+    # 2. Embedding (batched like ingestion: one request per embed_batch_size leaves)
+    texts = [leaf.get_content(metadata_mode="embed") for leaf in leaves]
+    for _ in range(repeats):
+        elapsed, embeddings = _timed(lambda: embed_model.get_text_embedding_batch(texts))
+        samples["embedding"].append(elapsed)
+    items["embedding"] = len(texts)
+    for leaf, embedding in zip(leaves, embeddings):
+        leaf.embedding = embedding
+
+    # 3. Upsert into a fresh in-memory collection each run
+    for run in range(repeats):
+        vector_store = QdrantVectorStore(collection_name=f"bench_{run}", client=QdrantClient(":memory:"))
+        elapsed, _ = _timed(lambda: vector_store.add(leaves))
+        samples["upsert"].append(elapsed)
+    items["upsert"] = len(leaves)
+    index = VectorStoreIndex.from_vector_store(
+        vector_store, storage_context=StorageContext.from_defaults(vector_store=vector_store)
+    )
+
+    # 4. Router selection (ROUTER_MODE selector over the router's tools)
+    router = get_smsf_query_engine(fund_ids[0], index)
+    selector = build_router_selector(llm)
+    questions = [q for q, _ in ROUTING_CASES]
+    for _ in range(repeats):
+        for question in questions:
+            elapsed, _ = _timed(lambda: selector.select(router._metadatas, QueryBundle(question)))
+            samples["router_selection"].append(elapsed)
+    items["router_selection"] = len(questions)
+
+    # 5. Retrieval: every fan-out source for one fund, query embedded once
+    top_k = settings.FANOUT_TOP_K_PER_SOURCE
+    sources = build_sources(fund_ids[0], index, {}, top_k=top_k, **retrieval_kwargs(top_k))
+    retrieved = {}
+    for _ in range(repeats):
+        for question in QUESTIONS:
+            bundle = QueryBundle(question, embedding=embed_model.get_query_embedding(question))
+            elapsed, results = _timed(lambda: [s.retriever.retrieve(bundle) for s in sources])
+            samples["retrieval"].append(elapsed)
+            retrieved[question] = [node for result in results for node in result][: settings.FANOUT_TOP_K]
+    items["retrieval"] = len(QUESTIONS)
+
+    # 6. Synthesis over the retrieved nodes
+    synthesizer = get_response_synthesizer(llm=llm, text_qa_template=SMSF_QA_PROMPT)
+    for _ in range(repeats):
+        for question in QUESTIONS:
+            elapsed, _ = _timed(lambda: synthesizer.synthesize(question, nodes=retrieved[question]))
+            samples["synthesis"].append(elapsed)
+    items["synthesis"] = len(QUESTIONS)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "funds": funds,
+            "legislation_copies": legislation_copies,
+            "repeats": repeats,
+            "embed_latency": embed_latency,
+            "llm_latency": llm_latency,
+            "embed_dim": embed_dim,
+            "router_mode": settings.ROUTER_MODE,
+            "retrieval_mode": settings.RETRIEVAL_MODE,
+        },
+        "stages": {stage: _summary(samples[stage], items[stage]) for stage in STAGES},
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2, min_delta_ms: float = 1.0) -> list:
+    """
+    One row per stage in both runs. A stage regresses when its p50 grew by
+    more than `threshold` (relative) and `min_delta_ms` (absolute, so noise
+    on sub-millisecond stages is not flagged).
+    """
+    rows = []
+    for stage, base in baseline["stages"].items():
+        new = current["stages"].get(stage)
+        if new is None:
+            continue
+        delta = new["p50_ms"] - base["p50_ms"]
+        ratio = new["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        rows.append({
+            "stage": stage,
+            "baseline_p50_ms": base["p50_ms"],
+            "current_p50_ms": new["p50_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and delta > min_delta_ms,
+        })
+    return rows
+
+
+def _print_run(result: dict):
+    print(f"{'stage':>16} | {'items':>6} | {'p50 ms':>9} | {'p95 ms':>9}")
+    for stage, row in result["stages"].items():
+        print(f"{stage:>16} | {row['items']:>6} | {row['p50_ms']:>9.3f} | {row['p95_ms']:>9.3f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="time every stage and write JSON")
+    run.add_argument("--out", default="bench-pipeline.json")
+    run.add_argument("--funds", type=int, default=20)
+    run.add_argument("--legislation-copies", type=int, default=5)
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--embed-latency", type=float, default=0.0, help="seconds per embedding request")
+    run.add_argument("--llm-latency", type=float, default=0.0, help="seconds per LLM call")
+    diff = commands.add_parser("compare", help="flag stages that got slower")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.2, help="relative p50 increase that counts")
+    diff.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = run_suite(args.funds, args.legislation_copies, args.repeats, args.embed_latency, args.llm_latency)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        _print_run(result)
+        print(f"📝 Wrote {args.out}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    print(f"{'stage':>16} | {'baseline ms':>11} | {'current ms':>10} | {'ratio':>6}")
+    for row in rows:
+        flag = "  ⚠️  regression" if row["regression"] else ""
+        print(f"{row['stage']:>16} | {row['baseline_p50_ms']:>11.3f} | {row['current_p50_ms']:>10.3f} | "
+              f"{row['ratio']:>6.2f}{flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Embedding storage benchmark: RAM/disk per million vectors, search latency and
+recall@k of Matryoshka truncation (EMBED_DIMENSIONS) x Qdrant quantization
+(QDRANT_QUANTIZATION, rescoring QDRANT_QUANTIZATION_OVERSAMPLING x top_k
+candidates with the originals) against full-precision 3072-dim vectors.
+
+The fixture corpus is synthetic: topic clusters with variance concentrated in
+the leading dimensions, as Matryoshka-trained models produce. Pass
+--embeddings with an (n, 3072) .npy export of real text-embedding-3-large
+leaves to measure your own data (the last --queries rows become queries).
+
+Offline, each mode is an exact scan in numpy of what Qdrant would hold in RAM
+(float32, dequantized int8, or sign bits compared by popcount), then the
+rescoring step; the in-memory Qdrant client ignores quantization. Pass --url
+to also measure server Qdrant (HNSW + quantization) latency and recall:
+
+    docker run -p 6333:6333 qdrant/qdrant
+    uv run python -m benchmarks.bench_quantization --url http://localhost:6333
+"""
+import argparse
+import os
+import time
+import uuid
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from app.core.config import EMBED_NATIVE_DIMENSIONS
+
+MODES = ("none", "scalar", "binary")
+HNSW_LINK_BYTES = 2 * 16 * 4  # level-0 links per vector at m=16
+
+
+def fixture_corpus(n_docs: int, n_queries: int, dim: int = EMBED_NATIVE_DIMENSIONS, topics: int = 300, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    spectrum = (1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)).astype(np.float32)
+    centroids = rng.standard_normal((topics, dim), dtype=np.float32)
+    raw = centroids[rng.integers(topics, size=n_docs)] + 0.8 * rng.standard_normal((n_docs, dim), dtype=np.float32)
+    # A query paraphrases one leaf: same topic and content, plus noise
+    queries = raw[rng.integers(n_docs, size=n_queries)] + 0.9 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+    return _unit(raw * spectrum), _unit(queries * spectrum)
+
+
+def _unit(x):
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def truncate(x, dim: int):
+    """What the OpenAI `dimensions` parameter returns: the first `dim` values, renormalised."""
+    return _unit(x[:, :dim])
+
+
+class ScanIndex:
+    """Exact scan over the RAM representation of one mode, then rescoring with the originals."""
+
+    def __init__(self, docs, mode: str, oversampling: float):
+        self.docs, self.mode, self.oversampling = docs, mode, oversampling
+        if mode == "scalar":
+            # int8 over the 0.99 quantile range, as Qdrant's ScalarQuantization(quantile=0.99)
+            self.low, self.high = np.quantile(docs[:: max(1, len(docs) // 2000)], [0.005, 0.995])
+            scale = np.float32((self.high - self.low) / 255)
+            self.codes = self._quantize(docs).astype(np.float32) * scale + np.float32(self.low)
+        elif mode == "binary":
+            self.bits = np.packbits(docs > 0, axis=1)
+
+    def _quantize(self, x):
+        return np.clip(np.round((x - self.low) / (self.high - self.low) * 255), 0, 255).astype(np.uint8)
+
+    def search(self, query, k: int):
+        if self.mode == "none":
+            return np.argpartition(-(self.docs @ query), k)[:k]
+        if self.mode == "scalar":
+            scores = self.codes @ query
+        else:
+            mismatches = np.bitwise_count(self.bits ^ np.packbits(query > 0)).sum(axis=1, dtype=np.int32)
+            scores = -mismatches
+        candidates = np.argpartition(-scores, int(k * self.oversampling))[: int(k * self.oversampling)]
+        exact = self.docs[candidates] @ query
+        return candidates[np.argsort(-exact)[:k]]
+
+
+def memory_per_million(dim: int, mode: str, originals_on_disk: bool = True):
+    """(RAM MB, disk MB) for 1M vectors: the in-RAM copy plus HNSW links; originals on disk when quantized."""
+    original = dim * 4
+    if mode == "none":
+        return (original + HNSW_LINK_BYTES), 0
+    quantized = dim if mode == "scalar" else dim / 8
+    if originals_on_disk:
+        return (quantized + HNSW_LINK_BYTES), original
+    return (quantized + original + HNSW_LINK_BYTES), 0
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def run_offline(docs, queries, truth, dim, mode, k, oversampling):
+    index = ScanIndex(truncate(docs, dim), mode, oversampling)
+    trunc_queries = truncate(queries, dim)
+    latencies, found = [], []
+    for query in trunc_queries:
+        start = time.perf_counter()
+        found.append(index.search(query, k))
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)), recall(found, truth)
+
+
+def run_server(client, docs, queries, truth, dim, mode, k, oversampling):
+    from app.core.config import settings
+    from app.core.qdrant import quantization_config, search_params
+
+    options = settings.model_copy(update={"QDRANT_QUANTIZATION": mode, "QDRANT_QUANTIZATION_OVERSAMPLING": oversampling})
+    name = f"bench_quant_{dim}_{mode}_{uuid.uuid4().hex[:6]}"
+    client.create_collection(
+        name,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE, on_disk=mode != "none"),
+        quantization_config=quantization_config(options),
+    )
+    vectors = truncate(docs, dim)
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        client.upsert(name, models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()), wait=True)
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    latencies, found = [], []
+    for query in truncate(queries, dim):
+        start = time.perf_counter()
+        points = client.query_points(name, query=query.tolist(), limit=k, search_params=search_params(options)).points
+        latencies.append(time.perf_counter() - start)
+        found.append([p.id for p in points])
+    client.delete_collection(name)
+    return float(np.median(latencies)), recall(found, truth)
+
+
+def main(n_docs, n_queries, dims, k, oversampling, embeddings, url):
+    if embeddings:
+        data = _unit(np.load(embeddings).astype(np.float32))
+        docs, queries = data[:-n_queries], data[-n_queries:]
+    else:
+        docs, queries = fixture_corpus(n_docs, n_queries)
+    truth = [np.argsort(-(docs @ q))[:k] for q in queries]
+    client = QdrantClient(url=url) if url else None
+
+    print(f"{len(docs)} vectors, {len(queries)} queries, recall@{k} vs full-precision "
+          f"{docs.shape[1]}-dim, oversampling {oversampling}")
+    header = f"{'dims':>5} | {'quant':>6} | {'RAM MB/1M':>9} | {'disk MB/1M':>10} | {'scan ms':>7} | {'recall':>6}"
+    if client:
+        header += f" | {'qdrant ms':>9} | {'qdrant recall':>13}"
+    print(header)
+    for dim in dims:
+        for mode in MODES:
+            ram, disk = memory_per_million(dim, mode)
+            latency, hits = run_offline(docs, queries, truth, dim, mode, k, oversampling)
+            row = f"{dim:>5} | {mode:>6} | {ram:>9.0f} | {disk:>10.0f} | {1000 * latency:>7.2f} | {hits:>6.3f}"
+            if client:
+                server_latency, server_hits = run_server(client, docs, queries, truth, dim, mode, k, oversampling)
+                row += f" | {1000 * server_latency:>9.2f} | {server_hits:>13.3f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[3072, 1024, 512, 256])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--embeddings", default=None, help="(n, dim) .npy of real embeddings")
+    parser.add_argument("--url", default=None, help="server Qdrant URL to measure as well")
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.dims, args.k, args.oversampling, args.embeddings, args.url)
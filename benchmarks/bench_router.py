@@ -0,0 +1,68 @@
+"""
+Routing benchmark: accuracy and selection latency of the LLM selector vs the
+embedding router on the labelled ROUTING_CASES, using stub models.
+The stub LLM routes by keyword, so its accuracy column describes the stub,
+not gpt-4o-mini; the latency columns are the point of comparison.
+
+    uv run python -m benchmarks.bench_router --llm-latency 0.4 --embed-latency 0.03
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core.selectors import LLMSingleSelector
+from llama_index.core.tools import ToolMetadata
+
+from benchmarks.corpus import ROUTING_CASES
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+TOOLS = [
+    ToolMetadata(name="public_law", description="Search here for SIS Act regulations and general superannuation law."),
+    ToolMetadata(name="private_deed", description="Search here for specific rules within the Trust Deed for Fund fund_1."),
+    ToolMetadata(name="fallback", description="Use this for greetings or general superannuation questions."),
+]
+
+
+async def evaluate(selector):
+    correct, latencies = 0, []
+    for question, expected in ROUTING_CASES:
+        start = time.perf_counter()
+        result = await selector.aselect(TOOLS, question)
+        latencies.append(time.perf_counter() - start)
+        correct += TOOLS[result.ind].name == expected
+    latencies.sort()
+    return correct / len(ROUTING_CASES), latencies[len(latencies) // 2], latencies[-1]
+
+
+async def main(llm_latency: float, embed_latency: float, margin: float):
+    from app.engine.router_selector import EmbeddingRouterSelector
+
+    llm_selector = LLMSingleSelector.from_defaults(llm=LatencyLLM(latency=llm_latency))
+    embedding_selector = EmbeddingRouterSelector.from_defaults(
+        embed_model=LatencyEmbedding(embed_dim=256, latency=embed_latency),
+        fallback_selector=llm_selector,
+        margin_threshold=margin,
+    )
+    # Tool/exemplar vectors are embedded once per engine; not part of per-question cost
+    await embedding_selector.aselect(TOOLS, "warm up")
+    embedding_selector.fallback_selections = 0
+
+    print(f"{'selector':>10} | {'accuracy':>8} | {'p50 ms':>7} | {'max ms':>7}")
+    for name, selector in (("llm", llm_selector), ("embedding", embedding_selector)):
+        accuracy, p50, worst = await evaluate(selector)
+        print(f"{name:>10} | {accuracy:>8.2%} | {1000 * p50:>7.1f} | {1000 * worst:>7.1f}")
+    print(f"embedding router fell back to the LLM on "
+          f"{embedding_selector.fallback_selections}/{len(ROUTING_CASES)} questions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--margin", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.llm_latency, args.embed_latency, args.margin))
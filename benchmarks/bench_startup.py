@@ -0,0 +1,117 @@
+"""
+Cold-start benchmark for the API: time to `import main`, time until the
+lifespan startup has finished (the app would now accept requests) and peak
+RSS, each in a fresh interpreter, plus which rarely-used heavy modules were
+loaded by the import alone. Exits 1 when a budget is exceeded or a lazy
+module is imported eagerly, so it can gate CI.
+
+Qdrant runs in process (":memory:"), so time-to-ready here is the CPU part of
+startup; against Qdrant Cloud add the bootstrap round trips. Working files
+(job queue, embedding cache) go to a temp directory.
+
+    uv run python -m benchmarks.bench_startup
+    uv run python -m benchmarks.bench_startup --runs 5 --budget-ready-s 4 --budget-rss-mb 400
+    git worktree add /tmp/main-tree main && uv run python -m benchmarks.bench_startup --repo /tmp/main-tree
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be loaded by `import main`: only the first storage request, an
+# upload or the lifespan needs them
+LAZY_MODULES = ("boto3", "openai", "llama_index.llms.openai", "app.ingestion.streaming", "app.ingestion.utils")
+
+_CHILD = """
+import asyncio, json, resource, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+import_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+eager = [m for m in {lazy!r} if m in sys.modules]
+
+from app.core.qdrant import qdrant_registry
+qdrant_registry._options = {{"location": ":memory:"}}
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+ready, ready_rss = asyncio.run(start())
+print("STARTUP " + json.dumps({{
+    "import_s": imported - started,
+    "ready_s": ready - started,
+    "import_rss_mb": import_rss / 1024,
+    "ready_rss_mb": ready_rss / 1024,
+    "eager_modules": eager,
+}}))
+"""
+
+
+def measure_once(repo: str = REPO_ROOT) -> dict:
+    """One cold start in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=repo, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    with tempfile.TemporaryDirectory() as workdir:
+        completed = subprocess.run(
+            [sys.executable, "-c", _CHILD.format(lazy=LAZY_MODULES)],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=300,
+        )
+    for line in completed.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):])
+    raise RuntimeError(f"startup failed (exit {completed.returncode}):\n{completed.stderr[-2000:]}")
+
+
+def check_budget(result: dict, import_s: float, ready_s: float, rss_mb: float) -> list:
+    """Human-readable budget violations (empty when within budget)."""
+    problems = []
+    if result["import_s"] > import_s:
+        problems.append(f"import took {result['import_s']:.2f}s (budget {import_s}s)")
+    if result["ready_s"] > ready_s:
+        problems.append(f"ready after {result['ready_s']:.2f}s (budget {ready_s}s)")
+    if result["ready_rss_mb"] > rss_mb:
+        problems.append(f"RSS {result['ready_rss_mb']:.0f} MB (budget {rss_mb} MB)")
+    if result["eager_modules"]:
+        problems.append(f"imported at startup: {', '.join(result['eager_modules'])}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--repo", default=REPO_ROOT, help="checkout to measure (e.g. a worktree of main)")
+    parser.add_argument("--budget-import-s", type=float, default=4.0)
+    parser.add_argument("--budget-ready-s", type=float, default=6.0)
+    parser.add_argument("--budget-rss-mb", type=float, default=450.0)
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.repo) for _ in range(args.runs)]
+    # Medians of the timings; RSS and eager modules do not vary between runs
+    result = {
+        "import_s": statistics.median(r["import_s"] for r in runs),
+        "ready_s": statistics.median(r["ready_s"] for r in runs),
+        "import_rss_mb": max(r["import_rss_mb"] for r in runs),
+        "ready_rss_mb": max(r["ready_rss_mb"] for r in runs),
+        "eager_modules": runs[-1]["eager_modules"],
+    }
+    print(f"{args.runs} cold starts of {args.repo}")
+    print(f"  import main     {result['import_s']:>6.2f} s   RSS {result['import_rss_mb']:>6.0f} MB")
+    print(f"  ready (lifespan){result['ready_s']:>6.2f} s   RSS {result['ready_rss_mb']:>6.0f} MB")
+    print(f"  lazy modules loaded by import: {', '.join(result['eager_modules']) or 'none'}")
+
+    problems = check_budget(result, args.budget_import_s, args.budget_ready_s, args.budget_rss_mb)
+    for problem in problems:
+        print(f"⚠️  {problem}")
+    if not problems:
+        print("✅ Within startup budget")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
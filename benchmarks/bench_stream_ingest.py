@@ -0,0 +1,110 @@
+"""
+/api/process-selected ingestion memory and throughput: the old read-all path
+(body.read() -> one Document -> parse everything -> embed everything) vs the
+streaming path (chunked spool -> page batches -> incremental embed/upsert),
+on generated text and PDF files of growing size. The object body is served
+from a local file and upserts are only counted, so peak RSS reflects the
+ingestion path itself. Each run is a fresh subprocess (ru_maxrss only grows).
+
+    uv run python -m benchmarks.bench_stream_ingest --pages 200 2000
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Document, Settings
+from llama_index.core.ingestion import run_transformations
+
+from benchmarks.corpus import write_pdf_fixture, write_text_fixture
+from benchmarks.stubs import CountingVectorStore, FileStreamingBody, LatencyEmbedding
+
+METADATA = {"file_name": "bench", "fund_id": "global", "doc_type": "legislation", "category": "smsf_document"}
+
+
+def make_scheduler():
+    from app.ingestion.embedding_scheduler import EmbeddingScheduler
+
+    return EmbeddingScheduler(embed_model=LatencyEmbedding(embed_dim=256, embed_batch_size=512),
+                              max_concurrency=4, tokens_per_minute=10**9)
+
+
+def run_read_all(path, file_type):
+    from app.ingestion.embedding_scheduler import aembed_and_upsert
+
+    body = FileStreamingBody(path)
+    content = body.read()
+    if file_type == "pdf":
+        from pypdf import PdfReader
+
+        text = "\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(content)).pages)
+    else:
+        text = content.decode("utf-8")
+    nodes = run_transformations([Document(text=text, metadata=METADATA)], Settings.transformations)
+    vector_store = CountingVectorStore()
+    asyncio.run(aembed_and_upsert(nodes, vector_store, scheduler=make_scheduler(), verbose=False))
+    return vector_store.nodes
+
+
+def run_streaming(path, file_type):
+    from app.ingestion.streaming import astream_to_index
+
+    vector_store = CountingVectorStore()
+    asyncio.run(astream_to_index(FileStreamingBody(path), vector_store, metadata=METADATA,
+                                 doc_id_prefix="bench", scheduler=make_scheduler()))
+    return vector_store.nodes
+
+
+def child(mode, path, file_type):
+    """Runs one ingestion in this (fresh) process and prints JSON stats."""
+    import contextlib
+
+    from app.ingestion.streaming import peak_rss_mb
+
+    # Warm up lazy imports (tokenizer, sentence splitter, pypdf) outside the measurement
+    import pypdf  # noqa: F401
+    run_transformations([Document(text="Warm up. " * 2000)], Settings.transformations)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        nodes = (run_streaming if mode == "streaming" else run_read_all)(path, file_type)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"nodes": nodes, "seconds": elapsed, "baseline_mb": baseline, "peak_mb": peak_rss_mb()}))
+
+
+def main(args):
+    print(f"{'file':>14} | {'MB':>6} | {'mode':>9} | {'nodes':>6} | {'MB/s':>6} | {'peak RSS MB':>11} | {'over import MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_type in args.types:
+            for n_pages in args.pages:
+                path = os.path.join(tmp, f"fixture_{n_pages}.{file_type}")
+                (write_pdf_fixture if file_type == "pdf" else write_text_fixture)(path, n_pages)
+                size_mb = os.path.getsize(path) / 1e6
+                for mode in ("read-all", "streaming"):
+                    out = subprocess.run(
+                        [sys.executable, "-m", "benchmarks.bench_stream_ingest", "--child", mode, path, file_type],
+                        capture_output=True, text=True, check=True,
+                    ).stdout
+                    result = json.loads(out.strip().splitlines()[-1])
+                    label = f"{file_type} {n_pages}p"
+                    print(f"{label:>14} | {size_mb:>6.1f} | {mode:>9} | {result['nodes']:>6} | "
+                          f"{size_mb / result['seconds']:>6.2f} | {result['peak_mb']:>11.0f} | "
+                          f"{result['peak_mb'] - result['baseline_mb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--types", nargs="+", default=["text", "pdf"], choices=["text", "pdf"])
+    main(parser.parse_args())
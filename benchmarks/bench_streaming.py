@@ -0,0 +1,63 @@
+"""
+Time-to-first-byte of /api/ask vs /api/ask/stream against stubbed backends.
+
+httpx's ASGI transport buffers whole responses, so this drives the route
+bodies directly: execute_rag_logic for JSON and stream_rag_events for SSE.
+
+    uv run python -m benchmarks.bench_streaming --latency 0.2 --token-latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from llama_index.core import Settings, VectorStoreIndex
+
+from benchmarks.corpus import QUESTIONS, build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+
+async def main(latency: float, token_latency: float):
+    from app.api.routes.query import QueryRequest, execute_rag_logic, stream_rag_events
+    from app.engine.engine_cache import query_engine_cache
+
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+    index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    Settings.llm = LatencyLLM(latency=latency, token_latency=token_latency)
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(vector_index=index)))
+
+    json_times, first_events, stream_times = [], [], []
+    for question in QUESTIONS:
+        query_data = QueryRequest(fund_id="fund_1", question=question)
+
+        start = time.perf_counter()
+        await execute_rag_logic(query_data, request)
+        json_times.append(time.perf_counter() - start)
+
+        engine = query_engine_cache.get("fund_1", index, streaming=True)
+        start = time.perf_counter()
+        first = None
+        async for _ in stream_rag_events(engine, query_data):
+            if first is None:
+                first = time.perf_counter() - start
+        first_events.append(first)
+        stream_times.append(time.perf_counter() - start)
+
+    def avg_ms(values):
+        return 1000 * sum(values) / len(values)
+
+    print(f"{'route':>16} | {'ttfb ms':>8} | {'total ms':>8}")
+    print(f"{'/api/ask':>16} | {avg_ms(json_times):>8.0f} | {avg_ms(json_times):>8.0f}")
+    print(f"{'/api/ask/stream':>16} | {avg_ms(first_events):>8.0f} | {avg_ms(stream_times):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.token_latency))
@@ -0,0 +1,198 @@
+"""
+Synthetic SMSF fixture corpus: SIS Act sections, ATO rulings and one trust
+deed per fund. Text is templated so benchmarks are reproducible offline.
+"""
+from llama_index.core import Document
+
+SIS_SECTIONS = [
+    ("17A", "Definition of self managed superannuation fund: fewer than 7 members, each member is a trustee."),
+    ("52B", "Covenants of trustees: act honestly, exercise care, skill and diligence, act in best interests of members."),
+    ("62", "Sole purpose test: the fund must be maintained solely for the core purposes of providing retirement benefits."),
+    ("65", "Prohibition on lending or giving financial assistance to members or relatives of members."),
+    ("66", "Prohibition on acquiring assets from related parties, except business real property and listed securities."),
+    ("67", "Borrowing by the trustee is prohibited except as permitted by this section."),
+    ("67A", "Limited recourse borrowing arrangements: the trustee may borrow to acquire a single acquirable asset held on trust."),
+    ("71", "In-house assets: a loan to, investment in or lease to a related party of the fund."),
+    ("82", "In-house assets must not exceed 5 percent of the market value of the fund assets."),
+    ("84", "Trustees must comply with the in-house asset rules in Part 8."),
+    ("103", "Trustees must keep minutes of meetings and records of decisions for at least 10 years."),
+    ("109", "Investments must be made and maintained on an arm's length basis."),
+]
+
+ATO_RULINGS = [
+    ("SMSFR 2009/2", "Meaning of business real property for the related party acquisition exception."),
+    ("SMSFR 2012/1", "Limited recourse borrowing arrangements: application of key concepts such as single acquirable asset."),
+    ("TR 2021/3", "Non-arm's length income arising from non-commercial limited recourse borrowing arrangements."),
+    ("SMSFR 2008/2", "Application of the sole purpose test to the provision of benefits other than retirement benefits."),
+]
+
+DEED_CLAUSES = [
+    ("4.1", "The trustee may invest in any investment permitted by the SIS Act including real property."),
+    ("7.2", "Contributions may be accepted from members and employers in accordance with the Relevant Law."),
+    ("9.3", "The trustee may pay a lump sum or pension benefit once a condition of release is met."),
+    ("12.4", "The trustee may borrow money under a limited recourse borrowing arrangement subject to section 67A."),
+    ("15.1", "The trustee must not lend money to a member or a relative of a member."),
+    ("18.6", "The trustee may acquire business real property from a related party at market value."),
+]
+
+
+def build_legislation_documents(copies: int = 1):
+    docs = []
+    for copy in range(copies):
+        for section, text in SIS_SECTIONS:
+            docs.append(Document(
+                text=f"Superannuation Industry (Supervision) Act 1993 section {section}. {text}",
+                metadata={
+                    "doc_type": "legislation",
+                    "category": "legislation",
+                    "fund_id": "global",
+                    "section": section,
+                    "copy": copy,
+                },
+            ))
+    return docs
+
+
+def build_ruling_documents():
+    return [
+        Document(
+            text=f"ATO ruling {ruling_id}. {text}",
+            metadata={"doc_type": "ruling", "category": "ruling", "fund_id": "global", "ruling_id": ruling_id},
+        )
+        for ruling_id, text in ATO_RULINGS
+    ]
+
+
+def build_deed_documents(fund_ids):
+    docs = []
+    for fund_id in fund_ids:
+        for clause, text in DEED_CLAUSES:
+            docs.append(Document(
+                text=f"Trust deed of {fund_id}. Clause {clause}. {text}",
+                metadata={
+                    "doc_type": "trust_deed",
+                    "category": "trust_deed",
+                    "fund_id": fund_id,
+                    "clause": clause,
+                },
+            ))
+    return docs
+
+
+def build_corpus(fund_ids=("fund_1",), legislation_copies: int = 1):
+    return (
+        build_legislation_documents(legislation_copies)
+        + build_ruling_documents()
+        + build_deed_documents(fund_ids)
+    )
+
+
+QUESTIONS = [
+    "Can my fund borrow to buy property under the SIS Act?",
+    "What are the LRBA rules in section 67A?",
+    "What is the in-house asset limit?",
+    "Does the sole purpose test apply to holiday homes?",
+    "Does our deed allow the trustee to lend to members?",
+    "What does clause 12.4 of the deed say about borrowing?",
+    "Can the fund acquire business real property from a related party?",
+    "How long must trustees keep minutes?",
+]
+
+
+# Labelled routing set (question, expected tool); kept disjoint from the
+# exemplars in app/engine/router_selector.py
+ROUTING_CASES = [
+    ("Can an SMSF borrow money to buy a property under the SIS Act?", "public_law"),
+    ("What does section 67A say about a single acquirable asset?", "public_law"),
+    ("How much of the fund can be in-house assets?", "public_law"),
+    ("Is a loan to a related party an in-house asset?", "public_law"),
+    ("Does the SIS Act prohibit giving financial assistance to members?", "public_law"),
+    ("What does the sole purpose test require?", "public_law"),
+    ("How long do trustees need to keep minutes under the SIS Regulations?", "public_law"),
+    ("Which section covers acquiring business real property from a related party?", "public_law"),
+    ("Does our trust deed let the trustee borrow under an LRBA?", "private_deed"),
+    ("What does clause 15.1 of my deed say about lending?", "private_deed"),
+    ("Can my fund accept employer contributions under the deed?", "private_deed"),
+    ("Does the deed allow my fund to buy business real property?", "private_deed"),
+    ("Which clause of our deed deals with pension payments?", "private_deed"),
+    ("Hello there", "fallback"),
+    ("Thanks, that helps", "fallback"),
+    ("Good morning, can you help?", "fallback"),
+]
+
+
+# Topics reused across many synthetic sections/clauses, so that only the
+# citation itself tells neighbouring provisions apart
+CITATION_TOPICS = [
+    ("borrowing", "Borrowing by the trustee is restricted except under a limited recourse arrangement."),
+    ("in-house assets", "In-house assets of the fund are limited to a share of total market value."),
+    ("related parties", "Acquiring assets from related parties is prohibited subject to listed exceptions."),
+    ("minutes", "Trustees must keep minutes and records of decisions for the prescribed period."),
+    ("contributions", "Contributions may be accepted from members and employers within the caps."),
+    ("benefits", "Benefits may be paid once a member satisfies a condition of release."),
+]
+
+
+def build_citation_corpus(n_sections: int = 200, n_clauses: int = 60, fund_id: str = "fund_1"):
+    """
+    Many look-alike SIS sections and deed clauses plus (question, doc_type,
+    citation key, citation) cases that name one of them, for recall@k.
+    """
+    docs, cases = [], []
+    for i in range(n_sections):
+        section = f"{100 + i // 2}{'' if i % 2 == 0 else 'A'}"
+        topic, text = CITATION_TOPICS[i % len(CITATION_TOPICS)]
+        docs.append(Document(
+            text=f"Superannuation Industry (Supervision) Act 1993 section {section}. {text}",
+            metadata={"doc_type": "legislation", "fund_id": "global", "section": section},
+        ))
+        cases.append((f"What does s {section} say about {topic}?", "legislation", "section", section))
+    for i in range(n_clauses):
+        clause = f"{1 + i // 6}.{1 + i % 6}"
+        topic, text = CITATION_TOPICS[i % len(CITATION_TOPICS)]
+        docs.append(Document(
+            text=f"Trust deed of {fund_id}. Clause {clause}. {text}",
+            metadata={"doc_type": "trust_deed", "fund_id": fund_id, "clause": clause},
+        ))
+        cases.append((f"What does Clause {clause} of our deed say about {topic}?", "trust_deed", "clause", clause))
+    return docs, cases
+
+
+def build_text_pages(n_pages: int, lines_per_page: int = 40):
+    """SIS-style pages of plain text (about 3 KB each), cycling through SIS_SECTIONS."""
+    for page in range(n_pages):
+        lines = []
+        for line in range(lines_per_page):
+            section, text = SIS_SECTIONS[(page * lines_per_page + line) % len(SIS_SECTIONS)]
+            lines.append(f"Page {page + 1} section {section}. {text}")
+        yield "\n".join(lines)
+
+
+def write_text_fixture(path: str, n_pages: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for page in build_text_pages(n_pages):
+            f.write(page + "\n\n")
+
+
+def write_pdf_fixture(path: str, n_pages: int):
+    """A text-layer PDF (Helvetica, one content stream per page) built with pypdf."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in build_text_pages(n_pages):
+        page = writer.add_blank_page(width=612, height=792)
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in text.split("\n")]
+        content = DecodedStreamObject()
+        content.set_data(("BT /F1 8 Tf 10 TL 36 760 Td " + " ".join(f"({line}) '" for line in escaped) + " ET").encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
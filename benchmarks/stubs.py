@@ -0,0 +1,373 @@
+"""
+Offline stand-ins for OpenAI and DigitalOcean Spaces used by the benchmarks
+(and some tests).
+Latency is injected with time.sleep on the sync path and asyncio.sleep on
+the async path, so blocking vs non-blocking behaviour shows up in timings.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, List
+
+from botocore.exceptions import ClientError
+
+from llama_index.core.base.llms.types import (
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+_SELECT_QUERY = re.compile(r"most relevant to the question: '(.*)'", re.DOTALL)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+DEED_HINTS = ("deed", "clause", "my fund", "our fund", "trustee of the fund")
+GREETING_HINTS = ("hello", "hi ", "thanks", "thank you", "good morning")
+
+
+def stub_route(question: str) -> int:
+    """Keyword routing used by LatencyLLM: 1 = public_law, 2 = deed, 3 = fallback."""
+    q = question.lower()
+    if any(h in q for h in GREETING_HINTS):
+        return 3
+    if any(h in q for h in DEED_HINTS):
+        return 2
+    return 1
+
+
+class LatencyLLM(CustomLLM):
+    """CustomLLM that answers after `latency` seconds and streams word by word."""
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    context_window: int = 128000
+    answer: str = (
+        "SUMMARY: It depends. LEGAL BASIS: s 67A SIS Act. "
+        "DEED PERMISSION: Clause 12.4. CONFLICTS: None."
+    )
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="latency-stub", context_window=self.context_window, num_output=512)
+
+    def _respond(self, prompt: str) -> str:
+        match = _SELECT_QUERY.search(prompt)
+        if match:
+            choice = stub_route(match.group(1))
+            return json.dumps([{"choice": choice, "reason": "stub routing"}])
+        return self.answer
+
+    def _generation_time(self, text: str) -> float:
+        return self.latency + self.token_latency * len(text.split(" "))
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = self._respond(prompt)
+        time.sleep(self._generation_time(text))
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        text = self._respond(prompt)
+        await asyncio.sleep(self._generation_time(text))
+        return CompletionResponse(text=text)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        time.sleep(self.latency)
+        text = ""
+        for word in self._respond(prompt).split(" "):
+            time.sleep(self.token_latency)
+            delta = word if not text else " " + word
+            text += delta
+            yield CompletionResponse(text=text, delta=delta)
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        async def gen():
+            await asyncio.sleep(self.latency)
+            text = ""
+            for word in self._respond(prompt).split(" "):
+                await asyncio.sleep(self.token_latency)
+                delta = word if not text else " " + word
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+
+        return gen()
+
+
+def hashed_vector(text: str, dim: int) -> List[float]:
+    """Deterministic bag-of-words vector, L2-normalised."""
+    vec = [0.0] * dim
+    for token in _TOKEN.findall(text.lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class LatencyEmbedding(MockEmbedding):
+    """MockEmbedding with hashed bag-of-words vectors and injected latency."""
+
+    latency: float = 0.0
+    item_latency: float = 0.0
+    calls: int = 0
+    requests: int = 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LatencyEmbedding"
+
+    def _round_trip(self, texts=()):
+        self.requests += 1
+
+    def _embed(self, text: str) -> List[float]:
+        self.calls += 1
+        return hashed_vector(text, self.embed_dim)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        self._round_trip()
+        time.sleep(self.latency)
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        self._round_trip()
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # One round trip per batch, like the OpenAI endpoint
+        self._round_trip(texts)
+        time.sleep(self.latency + self.item_latency * len(texts))
+        return [self._embed(t) for t in texts]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        self._round_trip()
+        await asyncio.sleep(self.latency)
+        return self._embed(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        self._round_trip()
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        self._round_trip(texts)
+        await asyncio.sleep(self.latency + self.item_latency * len(texts))
+        return [self._embed(t) for t in texts]
+
+
+class FakeRateLimitError(Exception):
+    """Looks like openai.RateLimitError to the ingestion scheduler."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 Too Many Requests")
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}})()
+
+
+class RateLimitedEmbedding(LatencyEmbedding):
+    """
+    LatencyEmbedding with a tokens-per-minute budget (one token per word)
+    enforced over a sliding window (shorter than a minute keeps benchmarks
+    quick); batches beyond it get a 429.
+    """
+
+    tokens_per_minute: int = 0
+    window_seconds: float = 60.0
+    rate_limited: int = 0
+    window: list = []
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RateLimitedEmbedding"
+
+    def _round_trip(self, texts=()):
+        super()._round_trip(texts)
+        if not self.tokens_per_minute or not texts:
+            return
+        now = time.monotonic()
+        self.window = [(t, n) for t, n in self.window if now - t < self.window_seconds]
+        tokens = sum(len(text.split()) for text in texts)
+        budget = self.tokens_per_minute * self.window_seconds / 60
+        if sum(n for _, n in self.window) + tokens > budget:
+            self.rate_limited += 1
+            oldest = min((t for t, _ in self.window), default=now)
+            raise FakeRateLimitError(retry_after=round(self.window_seconds - (now - oldest), 3))
+        self.window.append((now, tokens))
+
+
+class CitationBlindEmbedding(LatencyEmbedding):
+    """
+    LatencyEmbedding that ignores tokens containing digits, standing in for a
+    dense model that blurs "s 67A" and "s 67" together.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CitationBlindEmbedding"
+
+    def _embed(self, text: str) -> List[float]:
+        words = [t for t in _TOKEN.findall(text.lower()) if not any(c.isdigit() for c in t)]
+        return super()._embed(" ".join(words))
+
+
+class FileStreamingBody:
+    """botocore StreamingBody look-alike over a local file (read(n), close())."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+
+    def read(self, amt: int = None) -> bytes:
+        return self._file.read(-1 if amt is None else amt)
+
+    def close(self):
+        self._file.close()
+
+
+class CountingVectorStore:
+    """Vector store that only counts what is upserted, keeping stored points out of memory measurements."""
+
+    stores_text = True
+
+    def __init__(self):
+        self.nodes = 0
+
+    def add(self, nodes, **kwargs):
+        self.nodes += len(nodes)
+        return [node.node_id for node in nodes]
+
+
+def serialize_adds(vector_store):
+    """
+    Local (in-memory) Qdrant is not thread-safe, unlike the server; give a
+    vector store shared by concurrent ingestion tasks one writer at a time.
+    """
+    lock = threading.Lock()
+    add = vector_store.add
+
+    def locked_add(nodes, **kwargs):
+        with lock:
+            return add(nodes, **kwargs)
+
+    object.__setattr__(vector_store, "add", locked_add)
+    return vector_store
+
+
+def _client_error(code: str, status: int, operation: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status}},
+        operation,
+    )
+
+
+class InMemoryS3:
+    """
+    Local S3/Spaces stand-in for the boto3 calls the app makes: get/put/head/
+    delete_object, list_objects_v2 (with continuation tokens) and presigned
+    URLs. ETags and If-Match / If-None-Match behave like S3 (304 on a matching
+    conditional GET, 412 on a failed conditional PUT). `latency` seconds are
+    slept per call, outside the lock, so concurrent callers interleave.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._objects = {}  # key -> (body, etag, last_modified)
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str):
+        self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        self._call("put_object")
+        body = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        with self._lock:
+            current = self._objects.get(Key)
+            if IfNoneMatch == "*" and current is not None:
+                raise _client_error("PreconditionFailed", 412, "PutObject")
+            if IfMatch is not None and (current is None or current[1] != IfMatch):
+                raise _client_error("PreconditionFailed" if current else "NoSuchKey",
+                                    412 if current else 404, "PutObject")
+            self._objects[Key] = (body, etag, datetime.now(timezone.utc))
+        return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, IfMatch=None, **kwargs):
+        self._call("get_object")
+        with self._lock:
+            current = self._objects.get(Key)
+        if current is None:
+            raise _client_error("NoSuchKey", 404, "GetObject")
+        body, etag, modified = current
+        if IfNoneMatch is not None and IfNoneMatch in ("*", etag):
+            raise _client_error("304", 304, "GetObject")
+        if IfMatch is not None and IfMatch != etag:
+            raise _client_error("PreconditionFailed", 412, "GetObject")
+        return {"Body": io.BytesIO(body), "ETag": etag, "ContentLength": len(body), "LastModified": modified}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call("head_object")
+        with self._lock:
+            current = self._objects.get(Key)
+        if current is None:
+            raise _client_error("404", 404, "HeadObject")
+        return {"ETag": current[1], "ContentLength": len(current[0]), "LastModified": current[2]}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call("delete_object")
+        with self._lock:
+            self._objects.pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, StartAfter=None, **kwargs):
+        self._call("list_objects_v2")
+        after = ContinuationToken or StartAfter or ""
+        with self._lock:
+            keys = sorted(k for k in self._objects if k.startswith(Prefix) and k > after)
+            page = [(k, self._objects[k]) for k in keys[:MaxKeys]]
+        response = {
+            "KeyCount": len(page),
+            "IsTruncated": len(keys) > MaxKeys,
+            "Contents": [
+                {"Key": k, "Size": len(body), "ETag": etag, "LastModified": modified}
+                for k, (body, etag, modified) in page
+            ],
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1][0]
+        return response
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        self.calls["generate_presigned_url"] += 1
+        return f"https://bucket.local/{Params['Key']}?expires={int(time.time()) + ExpiresIn}"
+
+
+def add_search_latency(vector_store, seconds: float):
+    """Makes every query on vector_store take `seconds` longer (time.sleep / asyncio.sleep), like a remote Qdrant."""
+    query = vector_store.query
+
+    def slow_query(*args, **kwargs):
+        time.sleep(seconds)
+        return query(*args, **kwargs)
+
+    async def slow_aquery(*args, **kwargs):
+        await asyncio.sleep(seconds)
+        return query(*args, **kwargs)
+
+    object.__setattr__(vector_store, "query", slow_query)
+    object.__setattr__(vector_store, "aquery", slow_aquery)
+    return vector_store
@@ -1,46 +1,85 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-import qdrant_client
-from llama_index.core import VectorStoreIndex, StorageContext
-from llama_index.vector_stores.qdrant import QdrantVectorStore
+from fastapi import FastAPI, Request
 
 # Correct Absolute Imports
 from app.api.routes import query
 from app.api.routes import health
 from app.api.routes import storage
+from app.api.routes import ingestion_endpoints
+from app.api.routes import metrics
+from app.api.dependencies import get_job_queue
 # from app.api.routes.storage import router as storage_router
-from app.core.config import settings
+from app.core.config import configure_models, settings
+from app.core.qdrant import HealthProbe, collection_bootstrap, qdrant_registry, vector_store_options
+from app.core.generations import index_generations
+from app.core.instrumentation import track_stages
+from app.core.vectorstore import build_served_index
+from app.core.job_queue import FinishedJobWatcher
+from app.engine.fanout import collection_indexes
+
+# Ingestion collections: payload indexes/HNSW checked at startup, searched in fan-out mode
+INGESTION_COLLECTIONS = ("legislation", "ato_rulings", "trust_deeds")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # STARTUP
+    ingestion_collections = None
     try:
-        client = qdrant_client.QdrantClient(
-            url=settings.QDRANT_URL, 
-            api_key=settings.QDRANT_API_KEY
-        )
-        
-        vector_store = QdrantVectorStore(
-            client=client, 
-            collection_name="smsf_documents" # Ensure this matches your setup
-        )
-        
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        index = VectorStoreIndex.from_vector_store(
-            vector_store=vector_store, 
-            storage_context=storage_context
+        # OpenAI clients (and the SDK import) are set up here, not at import;
+        # the ingestion collection checks are Qdrant round trips that overlap it
+        models = asyncio.create_task(asyncio.to_thread(configure_models))
+        ingestion_collections = asyncio.gather(
+            *(asyncio.to_thread(collection_bootstrap.ensure, c) for c in INGESTION_COLLECTIONS)
         )
-        
+        await models
+
+        # The index takes Settings.embed_model, so it is built once that is set
+        index = await asyncio.to_thread(build_served_index, qdrant_registry)
         app.state.vector_index = index
+        app.state.qdrant = qdrant_registry
         print("Successfully connected to Qdrant Index.")
+
+        # Payload indexes (fund_id as tenant key) + HNSW config; ingestion
+        # collections that do not exist yet are handled after their first upsert
+        served = await asyncio.to_thread(collection_bootstrap.ensure_vector_store, index.vector_store)
+        app.state.collections = [served, *await ingestion_collections]
+
+        # Ingestion collections searched alongside the served index (fan-out mode)
+        opened = await asyncio.to_thread(
+            collection_indexes.open, qdrant_registry.client, qdrant_registry.aclient, **vector_store_options()
+        )
+        print(f"Fan-out collections: {sorted(opened) or 'none yet'}")
+        collection_indexes.start()
+
+        # /api/health serves the last background probe result
+        app.state.health_probe = HealthProbe(
+            qdrant_registry, interval=settings.HEALTH_PROBE_INTERVAL_SECONDS
+        )
+        app.state.health_probe.start()
+
+        # Ingestion runs in the worker process; invalidate this process's
+        # engine/answer caches when its jobs finish
+        app.state.job_watcher = FinishedJobWatcher(
+            get_job_queue(), index_generations, interval=settings.JOB_POLL_SECONDS
+        )
+        app.state.job_watcher.start()
         
     except Exception as e:
         print(f"CRITICAL: Failed to initialize Qdrant Index: {e}")
+        if ingestion_collections is not None:
+            # Don't leave the collection checks running (or their errors unretrieved)
+            ingestion_collections.cancel()
+            await asyncio.gather(ingestion_collections, return_exceptions=True)
         raise e
         
     yield
     # SHUTDOWN
     app.state.vector_index = None
+    await collection_indexes.close()
+    await app.state.health_probe.stop()
+    await app.state.job_watcher.stop()
+    await qdrant_registry.aclose()
 
 app = FastAPI(
     title="SMSF RAG API",
@@ -65,10 +104,25 @@ app = FastAPI(
 #     allow_headers=["Authorization", "Content-Type"],
 # )
 
+# Per-request stage breakdown (embedding, retrieval, synthesis, LLM calls and
+# tokens) as a Server-Timing header, and into the /api/metrics histograms.
+# Streaming responses report what happened before the first byte.
+@app.middleware("http")
+async def stage_timing(request: Request, call_next):
+    with track_stages("unmatched") as timings:
+        response = await call_next(request)
+        # Route template, prefix included (e.g. /api/ask), so path parameters don't multiply series
+        route = request.scope.get("route")
+        timings.operation = f"{request.method} {route.path}" if route is not None else "unmatched"
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
 # Include Routers with consistent prefixing
 app.include_router(query.router, prefix="/api", tags=["Query"])
 app.include_router(health.router, prefix="/api", tags=["System"])
 app.include_router(storage.router, prefix="/api", tags=["Storage"])
+app.include_router(ingestion_endpoints.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api", tags=["System"])
 
 @app.get("/")
 async def root():
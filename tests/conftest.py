@@ -0,0 +1,6 @@
+import os
+
+# app.core.config requires an OpenAI key at import time; tests never call OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+# Keep test runs from writing the on-disk embedding cache into ./storage
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
@@ -0,0 +1,91 @@
+
+# uv run pytest tests/test_answer_cache.py
+
+from app.core.generations import IndexGenerations
+from app.engine.answer_cache import SemanticAnswerCache
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("generations", IndexGenerations())
+    return SemanticAnswerCache(**kwargs)
+
+
+def test_similar_question_hits_within_threshold():
+    cache = make_cache(threshold=0.9)
+    cache.store("fund_a", [1.0, 0.0, 0.0], {"answer": "yes"}, llm_calls=2)
+
+    assert cache.lookup("fund_a", [0.99, 0.05, 0.0]) == {"answer": "yes"}
+    assert cache.lookup("fund_a", [0.5, 0.5, 0.5]) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["saved_llm_calls"] == 2
+
+
+def test_answers_are_scoped_to_fund():
+    cache = make_cache()
+    cache.store("fund_a", [1.0, 0.0], {"answer": "a"})
+
+    assert cache.lookup("fund_b", [1.0, 0.0]) is None
+    assert cache.lookup("fund_a", [1.0, 0.0]) == {"answer": "a"}
+
+
+def test_closest_entry_wins():
+    cache = make_cache(threshold=0.5)
+    cache.store("f", [1.0, 0.0], {"answer": "x"})
+    cache.store("f", [0.8, 0.6], {"answer": "y"})
+
+    assert cache.lookup("f", [0.7, 0.7]) == {"answer": "y"}
+
+
+def test_reingest_of_fund_or_legislation_invalidates():
+    generations = IndexGenerations()
+    cache = make_cache(generations=generations)
+    cache.store("fund_a", [1.0, 0.0], {"answer": "a"})
+    cache.store("fund_b", [1.0, 0.0], {"answer": "b"})
+
+    generations.bump("fund_a")
+    assert cache.lookup("fund_a", [1.0, 0.0]) is None
+    assert cache.lookup("fund_b", [1.0, 0.0]) == {"answer": "b"}
+
+    generations.bump("global")
+    assert cache.lookup("fund_b", [1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_bound():
+    cache = make_cache(max_size=2)
+    cache.store("f", [1.0, 0.0, 0.0], {"answer": "1"})
+    cache.store("f", [0.0, 1.0, 0.0], {"answer": "2"})
+    cache.lookup("f", [1.0, 0.0, 0.0])  # '2' is now least recently used
+    cache.store("f", [0.0, 0.0, 1.0], {"answer": "3"})
+
+    assert cache.stats()["size"] == 2
+    assert cache.lookup("f", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("f", [1.0, 0.0, 0.0]) == {"answer": "1"}
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = make_cache(ttl_seconds=60, clock=lambda: now[0])
+    cache.store("fund_a", [1.0, 0.0], {"answer": "a"})
+
+    now[0] = 59.0
+    assert cache.lookup("fund_a", [1.0, 0.0]) == {"answer": "a"}
+    # A re-ingest in another process bumps no generation here; the TTL bounds the staleness
+    now[0] = 60.0
+    assert cache.lookup("fund_a", [1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_reingest_during_query_does_not_store_a_current_answer():
+    generations = IndexGenerations()
+    cache = make_cache(generations=generations)
+
+    generation = cache.generation("fund_a")
+    assert cache.lookup("fund_a", [1.0, 0.0]) is None
+    generations.bump("global")  # legislation re-ingested while the query ran
+    cache.store("fund_a", [1.0, 0.0], {"answer": "old law"}, generation=generation)
+
+    assert cache.lookup("fund_a", [1.0, 0.0]) is None
@@ -0,0 +1,40 @@
+# uv run pytest tests/test_auto_merging.py
+
+from typing import List
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from app.core.docstore import SQLiteDocumentStore
+from app.engine.auto_merging import AutoMergeRetriever, ParentStore
+from app.ingestion.utils import get_parent_child_nodes
+from benchmarks.bench_context_packing import long_documents
+
+
+class FixedRetriever(BaseRetriever):
+    def __init__(self, nodes: List[NodeWithScore]):
+        super().__init__()
+        self._nodes = nodes
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return list(self._nodes)
+
+
+def test_leaves_are_promoted_when_most_siblings_hit(tmp_path):
+    nodes, leaves = get_parent_child_nodes(long_documents()[:1])
+    SQLiteDocumentStore.from_persist_dir(str(tmp_path)).add_documents(nodes)
+    first, second = [n for n in nodes if len(n.child_nodes or []) == 6][:2]
+    children = lambda parent: [leaf for leaf in leaves if leaf.parent_node.node_id == parent.node_id]
+
+    # 4 of 6 children of the first parent, 3 of 6 (not more than half) of the second
+    hits = [NodeWithScore(node=leaf, score=0.8) for leaf in children(first)[:4]]
+    hits += [NodeWithScore(node=leaf, score=0.6) for leaf in children(second)[:3]]
+    parents = ParentStore([str(tmp_path / "missing"), str(tmp_path)])
+    retriever = AutoMergeRetriever(FixedRetriever(hits), parents, ratio=0.5)
+
+    merged = retriever.retrieve("Can the trustee borrow?")
+    assert [n.node.node_id for n in merged] == [first.node_id] + [leaf.node_id for leaf in children(second)[:3]]
+    assert merged[0].score == 0.8 and merged[0].node.get_content() == first.get_content()
+
+    retriever.retrieve("Can the trustee borrow?")
+    assert parents.stats() == {"hits": 2, "misses": 2, "size": 2}
@@ -0,0 +1,24 @@
+
+# uv run pytest tests/test_bench_pipeline.py
+
+import json
+
+from benchmarks.bench_pipeline import STAGES, compare, main, run_suite
+
+
+def test_suite_times_every_stage_and_compare_flags_regressions(tmp_path):
+    result = run_suite(funds=2, legislation_copies=1, repeats=1)
+    assert list(result["stages"]) == list(STAGES)
+    assert all(row["items"] > 0 and row["p50_ms"] >= 0 for row in result["stages"].values())
+
+    slower = json.loads(json.dumps(result))
+    slower["stages"]["synthesis"]["p50_ms"] = result["stages"]["synthesis"]["p50_ms"] * 2 + 5
+    slower["stages"]["router_selection"]["p50_ms"] += 0.5  # under min_delta_ms: noise
+    flagged = [row["stage"] for row in compare(result, slower) if row["regression"]]
+    assert flagged == ["synthesis"]
+
+    baseline, current = tmp_path / "base.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(result))
+    current.write_text(json.dumps(slower))
+    assert main(["compare", str(baseline), str(baseline)]) == 0
+    assert main(["compare", str(baseline), str(current)]) == 1
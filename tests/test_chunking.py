@@ -0,0 +1,28 @@
+
+# uv run pytest tests/test_chunking.py
+
+from llama_index.core import Document
+from llama_index.core.node_parser import get_root_nodes
+from llama_index.core.schema import NodeRelationship
+
+from app.ingestion.utils import get_parent_child_nodes
+from benchmarks.corpus import build_corpus, build_text_pages
+
+
+def test_hierarchy_has_three_levels_and_leaves_keep_metadata():
+    documents = build_corpus(fund_ids=["fund_1"]) + [
+        Document(text="\n".join(build_text_pages(3)), metadata={"doc_type": "legislation", "fund_id": "global"})
+    ]
+    nodes, leaves = get_parent_child_nodes(documents)
+    by_id = {n.node_id: n for n in nodes}
+
+    assert leaves and len(get_root_nodes(nodes)) >= len(documents)
+    for leaf in leaves:
+        # Every leaf hangs off a 512 node, which hangs off a 2048 root
+        parent = by_id[leaf.relationships[NodeRelationship.PARENT].node_id]
+        root = by_id[parent.relationships[NodeRelationship.PARENT].node_id]
+        assert NodeRelationship.PARENT not in root.relationships
+        assert leaf.metadata["doc_type"] == root.metadata["doc_type"]
+        assert leaf.metadata["fund_id"] == root.metadata["fund_id"]
+    # The long document is split into several 128-token leaves
+    assert sum(1 for leaf in leaves if leaf.metadata["fund_id"] == "global" and "Page" in leaf.text) > 3
@@ -0,0 +1,113 @@
+
+# uv run pytest tests/test_citation.py
+
+from concurrent.futures import ProcessPoolExecutor
+
+from llama_index.core.schema import TextNode
+
+from app.core.citation_index import CLAUSE, SECTION, CitationIndex, extract_citations
+from app.core.docstore import SQLiteDocumentStore
+from app.engine.citation_lookup import CitationLookup
+
+
+def test_extract_citations_from_questions():
+    assert extract_citations("What does s 67A say?") == [(SECTION, "67A")]
+    assert extract_citations("Compare section 65 and reg 13.22C with Clause 12.4") == [
+        (SECTION, "65"), (SECTION, "13.22C"), (CLAUSE, "12.4"),
+    ]
+    assert extract_citations("Is 5 percent the in-house asset limit?") == []
+    assert extract_citations("Under s. 17A and ss 65, r 4.09") == [(SECTION, "17A"), (SECTION, "65"), (SECTION, "4.09")]
+
+
+def test_ordinary_text_is_not_read_as_a_citation():
+    for question in (
+        "What's 10 percent of the fund's balance?",
+        "Is the trustee’s 2 year plan compliant?",
+        "Can members' 3 accounts be merged?",
+        "How do I claim my 2023 tax deduction?",
+        "Is our 15 percent rate correct for 2s 10r?",
+    ):
+        assert extract_citations(question) == [], question
+
+
+def test_headings_span_following_leaves(tmp_path):
+    leaves = [
+        TextNode(id_="n1", text="Part 7\n67  Borrowing\nA trustee must not borrow money"),
+        TextNode(id_="n2", text="except as permitted by this section."),
+        TextNode(id_="n3", text="67A  Limited recourse borrowing arrangements\nThe trustee may borrow"),
+    ]
+    index = CitationIndex()
+    index.index_nodes(leaves, kind=SECTION, scope="global")
+    index.persist(str(tmp_path))
+
+    loaded = CitationIndex.from_persist_dir(str(tmp_path))
+    assert loaded.lookup(SECTION, "global", "67") == ["n1", "n2"]
+    assert loaded.lookup(SECTION, "global", "67a") == ["n3"]
+    assert loaded.lookup(SECTION, "global", "62") == []
+
+
+def test_numbered_lists_tables_and_running_headers_are_not_headings():
+    leaves = [
+        TextNode(id_="n1", text="65  Lending to members\nA trustee must not:\n1 Lend money to a member.\n"
+                                "2 Give financial assistance to a relative of a member;"),
+        TextNode(id_="n2", text="12  Superannuation Industry (Supervision) Act 1993\n"
+                                "Item  Asset  Limit\n3  Listed shares  No limit\nor a related party."),
+        TextNode(id_="n3", text="Section 66 Acquisition of assets from related parties\nA trustee must not acquire"),
+    ]
+    deed = [TextNode(id_="d1", text="12.4 Borrowing Powers\nThe trustee may:\n1.1 The trustee may borrow"
+                                    " under a limited recourse\nborrowing arrangement.")]
+    index = CitationIndex()
+    index.index_nodes(leaves, kind=SECTION, scope="global")
+    index.index_nodes(deed, kind=CLAUSE, scope="fund_1")
+
+    assert index.lookup(SECTION, "global", "65") == ["n1", "n2"]
+    assert index.lookup(SECTION, "global", "66") == ["n3"]
+    for citation in ("1", "2", "3", "12"):
+        assert index.lookup(SECTION, "global", citation) == [], citation
+    assert index.lookup(CLAUSE, "fund_1", "12.4") == ["d1"]
+    assert index.lookup(CLAUSE, "fund_1", "1.1") == []
+
+
+def test_reingesting_replaces_stale_node_ids():
+    index = CitationIndex()
+    index.index_nodes([TextNode(id_="old", text="x", metadata={"clause": "12.4"})], kind=CLAUSE, scope="fund_1")
+    index.index_nodes([TextNode(id_="new", text="x", metadata={"clause": "12.4"})], kind=CLAUSE, scope="fund_1")
+    index.index_nodes([TextNode(id_="other", text="x", metadata={"clause": "12.4"})], kind=CLAUSE, scope="fund_2")
+
+    assert index.lookup(CLAUSE, "fund_1", "12.4") == ["new"]
+    assert index.lookup(CLAUSE, "fund_2", "12.4") == ["other"]
+
+
+def test_lookup_reads_nodes_from_docstore_and_scopes_clauses_to_fund(tmp_path):
+    deed_dir = str(tmp_path / "trust_deeds")
+    node = TextNode(id_="c124", text="Clause 12.4. The trustee may borrow.", metadata={"clause": "12.4"})
+    SQLiteDocumentStore.from_persist_dir(deed_dir).add_documents([node])
+    index = CitationIndex()
+    index.index_nodes([node], kind=CLAUSE, scope="fund_1")
+    index.persist(deed_dir)
+
+    lookup = CitationLookup(legislation_dir=str(tmp_path / "legislation"), trust_deed_dir=deed_dir)
+
+    assert [n.node.node_id for n in lookup.find_nodes("fund_1", "What does clause 12.4 say?")] == ["c124"]
+    assert lookup.find_nodes("fund_2", "What does clause 12.4 say?") == []
+    assert lookup.find_nodes("global", "What does clause 12.4 say?") == []
+    assert lookup.find_nodes("fund_1", "What does s 67A say?") == []
+
+
+def _ingest_deeds(persist_dir, fund_ids):
+    from app.ingestion.utils import update_citation_index
+
+    for fund_id in fund_ids:
+        node = TextNode(id_=f"{fund_id}-c124", text="x", metadata={"clause": "12.4"})
+        update_citation_index(persist_dir, [node], kind=CLAUSE, scope=fund_id)
+
+
+def test_concurrent_processes_keep_each_others_entries(tmp_path):
+    persist_dir = str(tmp_path)
+    batches = [[f"fund_{w}_{i}" for i in range(25)] for w in range(4)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_ingest_deeds, [persist_dir] * len(batches), batches))
+
+    index = CitationIndex.from_persist_dir(persist_dir)
+    assert len(index) == 100
+    assert index.lookup(CLAUSE, "fund_3_24", "12.4") == ["fund_3_24-c124"]
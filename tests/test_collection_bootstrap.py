@@ -0,0 +1,94 @@
+# uv run pytest tests/test_collection_bootstrap.py
+
+from qdrant_client import QdrantClient, models
+
+from app.core.config import settings
+from app.core.qdrant import PAYLOAD_INDEXES, CollectionBootstrap, quantization_config, search_params, vector_store_options
+
+
+class IndexingClient:
+    """In-memory Qdrant that remembers payload indexes and HNSW config like the server does."""
+
+    def __init__(self):
+        self._local = QdrantClient(":memory:")
+        self.schema = {}
+        self.hnsw = {}
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self._local, name)
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait=True):
+        self.calls.append(("create_payload_index", field_name))
+        self.schema[field_name] = models.PayloadIndexInfo(
+            data_type=models.PayloadSchemaType.KEYWORD, params=field_schema, points=0
+        )
+
+    def update_collection(self, collection_name, hnsw_config=None, quantization_config=None, vectors_config=None):
+        if hnsw_config is not None:
+            self.calls.append(("update_collection", hnsw_config.payload_m))
+            self.hnsw.update(hnsw_config.model_dump(exclude_none=True))
+        if quantization_config is not None:
+            self.calls.append(("update_collection", "quantization"))
+            self.quantization = None if quantization_config == models.Disabled.DISABLED else quantization_config
+        if vectors_config is not None:
+            self.calls.append(("update_collection", "on_disk"))
+            self.on_disk = vectors_config[""].on_disk
+
+    def get_collection(self, collection_name):
+        info = self._local.get_collection(collection_name)
+        info.payload_schema = dict(self.schema)
+        info.config.hnsw_config = info.config.hnsw_config.model_copy(update=self.hnsw)
+        info.config.quantization_config = getattr(self, "quantization", None)
+        info.config.params.vectors.on_disk = getattr(self, "on_disk", None)
+        return info
+
+
+def test_bootstrap_creates_tenant_indexes_once_and_waits_for_missing_collections():
+    client = IndexingClient()
+    bootstrap = CollectionBootstrap(registry=None, hnsw_m=16, payload_m=16)
+
+    # Not created yet (first upsert creates it): nothing to do, checked again later
+    assert bootstrap.ensure("trust_deeds", client=client)["status"] == "missing"
+
+    client.create_collection("trust_deeds", vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE))
+    # An existing plain keyword index on fund_id is upgraded to a tenant index
+    client.schema["fund_id"] = models.PayloadIndexInfo(data_type=models.PayloadSchemaType.KEYWORD, points=0)
+    report = bootstrap.ensure("trust_deeds", client=client)
+    assert report["status"] == "ok" and report["vector_size"] == 8
+    assert report["created_indexes"] == list(PAYLOAD_INDEXES) and report["hnsw_updated"]
+    assert client.schema["fund_id"].params.is_tenant
+
+    # Verified collections are not checked again; a new process finds nothing to change
+    calls = len(client.calls)
+    assert bootstrap.ensure("trust_deeds", client=client) is report
+    fresh = CollectionBootstrap(registry=None).ensure("trust_deeds", client=client)
+    assert fresh["created_indexes"] == [] and not fresh["hnsw_updated"]
+    assert len(client.calls) == calls
+
+    assert CollectionBootstrap(registry=None, enabled=False).ensure("x", client=client)["status"] == "disabled"
+
+
+def test_quantization_is_applied_to_existing_collections_and_queries(monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "binary")
+    monkeypatch.setattr(settings, "EMBED_DIMENSIONS", 256)
+    client = IndexingClient()
+    client.create_collection("legislation", vectors_config=models.VectorParams(size=256, distance=models.Distance.COSINE))
+
+    # New collections are created quantized; queries rescore oversampled candidates
+    assert isinstance(vector_store_options()["quantization_config"], models.BinaryQuantization)
+    assert search_params().quantization.rescore and search_params().quantization.oversampling == 2.0
+
+    # Existing full-precision collections are quantized, originals moved to disk
+    bootstrap = CollectionBootstrap.from_settings(registry=None)
+    report = bootstrap.ensure("legislation", client=client)
+    assert report["status"] == "ok" and report["quantization"] == "binary" and report["quantization_updated"]
+    assert isinstance(client.quantization, models.BinaryQuantization) and client.on_disk
+
+    # A collection ingested at another size is flagged, and switching back turns quantization off
+    monkeypatch.setattr(settings, "EMBED_DIMENSIONS", 0)
+    monkeypatch.setattr(settings, "QDRANT_QUANTIZATION", "none")
+    assert quantization_config() is None and search_params() is None
+    report = CollectionBootstrap.from_settings(registry=None).ensure("legislation", client=client)
+    assert report["status"] == "dimension_mismatch" and report["quantization_updated"]
+    assert client.quantization is None
@@ -0,0 +1,54 @@
+# uv run pytest tests/test_context_packer.py
+
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+
+from app.core.bm25 import reciprocal_rank_fusion
+from app.core.config import AppSettings
+from app.engine.context_packer import ContextPacker
+from app.ingestion.utils import get_parent_child_nodes
+from benchmarks.bench_context_packing import long_documents
+
+
+def test_overlapping_sibling_leaves_are_sent_once_as_one_span():
+    nodes, leaves = get_parent_child_nodes(long_documents()[:1])
+    parent = next(n for n in nodes if n.node_id == leaves[0].parent_node.node_id)
+    siblings = [leaf for leaf in leaves if leaf.parent_node.node_id == parent.node_id][:3]
+    assert len(siblings) == 3 and siblings[1].start_char_idx < siblings[0].end_char_idx
+
+    retrieved = [NodeWithScore(node=leaf, score=0.9 - 0.1 * i) for i, leaf in enumerate(reversed(siblings))]
+    # The same leaf again from another collection
+    retrieved.append(NodeWithScore(node=siblings[1].model_copy(update={"id_": "copy"}), score=0.75))
+    packed = ContextPacker(score_cutoff=0.0, token_budget=10000).postprocess_nodes(retrieved)
+
+    assert len(packed) == 1
+    assert packed[0].node.get_content() == parent.text[siblings[0].start_char_idx:siblings[2].end_char_idx]
+    assert packed[0].score == 0.9
+
+
+def test_score_cutoff_and_token_budget():
+    text = "The trustee may borrow under a limited recourse borrowing arrangement. " * 5
+    retrieved = [
+        NodeWithScore(node=TextNode(id_="a", text="a " + text), score=0.9),
+        NodeWithScore(node=TextNode(id_="b", text="b " + text), score=0.8),
+        NodeWithScore(node=TextNode(id_="c", text="c " + text), score=0.1),
+    ]
+    ids = lambda nodes: [n.node.node_id for n in nodes]
+
+    assert ids(ContextPacker(score_cutoff=0.2, token_budget=10000).postprocess_nodes(retrieved)) == ["a", "b"]
+    assert ids(ContextPacker(score_cutoff=0.2, token_budget=80).postprocess_nodes(retrieved)) == ["a"]
+    # The best node is kept even when it alone exceeds the budget
+    assert ids(ContextPacker(score_cutoff=0.95, token_budget=1).postprocess_nodes(retrieved)) == ["a"]
+
+
+def test_rrf_scores_are_not_cut_off_in_hybrid_mode():
+    leaves = [TextNode(id_=f"n{i}", text=f"Section 6{i}: rule number {i} for trustees of the fund.") for i in range(5)]
+    fused = reciprocal_rank_fusion(
+        VectorStoreQueryResult(nodes=leaves), VectorStoreQueryResult(nodes=list(reversed(leaves))), top_k=5
+    )
+    retrieved = [NodeWithScore(node=n, score=s) for n, s in zip(fused.nodes, fused.similarities)]
+    assert max(fused.similarities) < 0.2
+
+    hybrid = AppSettings(RETRIEVAL_MODE="hybrid", CONTEXT_SCORE_CUTOFF=0.2)
+    assert len(ContextPacker.from_settings(hybrid).postprocess_nodes(retrieved)) == 5
+    assert ContextPacker.from_settings(AppSettings(RETRIEVAL_MODE="dense")).score_cutoff == 0.2
@@ -0,0 +1,99 @@
+
+# uv run pytest tests/test_docstore.py
+
+import os
+
+import pytest
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.storage.docstore import SimpleDocumentStore
+
+from app.core.docstore import DOCSTORE_FILE, SQLiteDocumentStore, SQLiteKVStore, migrate_json_docstore
+from benchmarks.corpus import build_legislation_documents
+
+
+def _nodes():
+    return SentenceSplitter(chunk_size=64, chunk_overlap=0).get_nodes_from_documents(build_legislation_documents())
+
+
+def test_nodes_survive_reopen_and_load_on_demand(tmp_path):
+    nodes = _nodes()
+    SQLiteDocumentStore.from_persist_dir(str(tmp_path)).add_documents(nodes)
+
+    reopened = SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+    assert reopened.count() == len(nodes)
+    assert reopened.get_node(nodes[3].node_id).get_content() == nodes[3].get_content()
+    assert [n.node_id for n in reopened.get_nodes([nodes[1].node_id, nodes[0].node_id])] == \
+        [nodes[1].node_id, nodes[0].node_id]
+    assert reopened.get_ref_doc_info(nodes[0].ref_doc_id).node_ids == [nodes[0].node_id]
+
+
+def test_unchanged_nodes_are_not_rewritten(tmp_path):
+    docstore = SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+    nodes = _nodes()
+    docstore.add_documents(nodes)
+
+    nodes[0].set_content("Amended text of section 17A.")
+    docstore.add_documents(nodes)
+
+    assert docstore.skipped == len(nodes) - 1
+    assert docstore.get_document_hash(nodes[0].node_id) == nodes[0].hash
+
+
+def test_failed_batch_leaves_nothing_behind(tmp_path, monkeypatch):
+    docstore = SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+    kvstore = docstore._kvstore
+    put_all = kvstore.put_all
+
+    def fail_on_metadata(kv_pairs, collection, batch_size=1):
+        if collection.endswith("/metadata"):
+            raise OSError("disk full")
+        put_all(kv_pairs, collection=collection, batch_size=batch_size)
+
+    monkeypatch.setattr(kvstore, "put_all", fail_on_metadata)
+    with pytest.raises(OSError):
+        docstore.add_documents(_nodes())
+
+    # Node data was written before the failure but rolled back with it
+    assert docstore.count() == 0
+
+
+def test_migrates_json_docstore(tmp_path):
+    nodes = _nodes()
+    legacy = SimpleDocumentStore()
+    legacy.add_documents(nodes)
+    legacy.persist(persist_path=str(tmp_path / "docstore.json"))
+
+    with pytest.raises(RuntimeError, match="migrate"):
+        SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+
+    assert migrate_json_docstore(str(tmp_path)) == len(nodes)
+    assert os.path.exists(tmp_path / DOCSTORE_FILE)
+    assert os.path.exists(tmp_path / "docstore.json.migrated")
+    migrated = SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+    assert migrated.get_all_document_hashes() == legacy.get_all_document_hashes()
+    assert migrated.get_node(nodes[5].node_id).get_content() == nodes[5].get_content()
+
+
+def test_failed_migration_leaves_no_sqlite_docstore(tmp_path, monkeypatch):
+    legacy = SimpleDocumentStore()
+    legacy.add_documents(_nodes())
+    legacy.persist(persist_path=str(tmp_path / "docstore.json"))
+
+    monkeypatch.setattr(SQLiteDocumentStore, "count", lambda self: 0)
+    with pytest.raises(RuntimeError, match="Migrated 0"):
+        migrate_json_docstore(str(tmp_path))
+
+    # The JSON docstore is untouched, the app still refuses to start on it,
+    # and the migration can simply be run again
+    assert sorted(os.listdir(tmp_path)) == ["docstore.json"]
+    with pytest.raises(RuntimeError, match="migrate"):
+        SQLiteDocumentStore.from_persist_dir(str(tmp_path))
+    monkeypatch.undo()
+    assert migrate_json_docstore(str(tmp_path)) == len(_nodes())
+    (tmp_path / "docstore.json.migrated").rename(tmp_path / "docstore.json")
+
+    # An empty store beside the JSON one (a failed migration before this fix) is refused too
+    os.remove(tmp_path / DOCSTORE_FILE)
+    SQLiteKVStore(str(tmp_path / DOCSTORE_FILE)).close()
+    with pytest.raises(RuntimeError, match="remove the empty"):
+        SQLiteDocumentStore.from_persist_dir(str(tmp_path))
@@ -0,0 +1,61 @@
+
+# uv run pytest tests/test_embedding_cache.py
+
+from llama_index.core import Document, VectorStoreIndex
+
+from app.core.embedding_cache import EmbeddingCacheStore, embedding_namespace
+from benchmarks.corpus import build_legislation_documents
+from benchmarks.stubs import LatencyEmbedding
+
+
+def make_model(path, namespace=embedding_namespace("text-embedding-3-large"), memory_size=100):
+    store = EmbeddingCacheStore(path=path, namespace=namespace, memory_size=memory_size)
+    return LatencyEmbedding(embed_dim=16, embeddings_cache=store), store
+
+
+def test_repeated_query_is_embedded_once(tmp_path):
+    model, store = make_model(str(tmp_path / "cache.sqlite3"))
+
+    first = model.get_query_embedding("Can my fund borrow to buy property?")
+    second = model.get_query_embedding("Can my fund  borrow to buy property? ")
+
+    assert model.calls == 1
+    assert second == first
+    assert store.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    model, store = make_model(path)
+    vector = model.get_query_embedding("LRBA rules")
+    store.close()
+
+    restarted, restarted_store = make_model(path)
+    assert restarted.get_query_embedding("LRBA rules") == vector
+    assert restarted.calls == 0
+    assert restarted_store.stats()["disk_hits"] == 1
+
+
+def test_reingesting_unchanged_documents_costs_no_embedding_calls(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    model, store = make_model(path, memory_size=1)
+    VectorStoreIndex.from_documents(build_legislation_documents(), embed_model=model)
+    assert model.calls > 0
+    store.close()
+
+    restarted, _ = make_model(path, memory_size=1)
+    VectorStoreIndex.from_documents(build_legislation_documents(), embed_model=restarted)
+    assert restarted.calls == 0
+
+    VectorStoreIndex.from_documents([Document(text="A brand new ruling.")], embed_model=restarted)
+    assert restarted.calls == 1
+
+
+def test_models_do_not_share_vectors(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    large, _ = make_model(path, namespace=embedding_namespace("text-embedding-3-large"))
+    truncated, _ = make_model(path, namespace=embedding_namespace("text-embedding-3-large", 256))
+
+    large.get_query_embedding("sole purpose test")
+    truncated.get_query_embedding("sole purpose test")
+    assert truncated.calls == 1
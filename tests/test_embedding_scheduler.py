@@ -0,0 +1,102 @@
+
+# uv run pytest tests/test_embedding_scheduler.py
+
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.ingestion.embedding_scheduler import (
+    EmbeddingScheduler, aembed_and_upsert, is_retryable, parse_reset_duration,
+)
+from benchmarks.stubs import FakeRateLimitError, LatencyEmbedding
+
+
+class FlakyEmbedding(LatencyEmbedding):
+    failures: int = 0
+
+    async def _aget_text_embeddings(self, texts):
+        if self.failures:
+            self.failures -= 1
+            raise FakeRateLimitError(retry_after=0.01)
+        return await super()._aget_text_embeddings(texts)
+
+
+class AuthError(Exception):
+    status_code = 401
+
+
+class RejectingEmbedding(LatencyEmbedding):
+    async def _aget_text_embeddings(self, texts):
+        raise AuthError("401 Incorrect API key provided")
+
+
+def _leaves(n):
+    return [TextNode(text=f"Section {i}. The trustee must keep records for ten years.") for i in range(n)]
+
+
+def _scheduler(embed_model, **kwargs):
+    return EmbeddingScheduler(embed_model=embed_model, tokenizer=str.split, **kwargs)
+
+
+def test_batches_respect_input_and_token_limits():
+    embed_model = LatencyEmbedding(embed_dim=8, embed_batch_size=100)
+    scheduler = _scheduler(embed_model, max_batch_inputs=4, max_batch_tokens=30)
+
+    batches = scheduler.make_batches(_leaves(10))
+
+    # 10 words per leaf: the token cap (3 leaves) binds before the input cap (4)
+    assert [len(nodes) for nodes, _, _ in batches] == [3, 3, 3, 1]
+    assert all(tokens <= 30 for _, _, tokens in batches)
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("250ms") == 0.25
+    assert parse_reset_duration("") is None
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_retried_and_slows_the_bucket():
+    embed_model = FlakyEmbedding(embed_dim=8, failures=1)
+    scheduler = _scheduler(embed_model, max_concurrency=2, max_batch_inputs=5)
+
+    nodes = await scheduler.run(_leaves(20))
+
+    assert all(node.embedding is not None for node in nodes)
+    assert scheduler.rate_limited == 1
+    assert scheduler.requests == 5
+    assert scheduler.bucket.rate < scheduler.bucket.max_rate
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_raised_without_retrying():
+    scheduler = _scheduler(RejectingEmbedding(embed_dim=8), max_concurrency=1, max_batch_inputs=5)
+
+    with pytest.raises(AuthError):
+        await scheduler.run(_leaves(5))
+
+    assert scheduler.requests == 1
+    assert scheduler.retries == 0
+
+
+def test_only_transient_errors_are_retryable():
+    assert is_retryable(FakeRateLimitError(retry_after=1))
+    assert is_retryable(type("InternalServerError", (Exception,), {"status_code": 503})())
+    assert is_retryable(type("APITimeoutError", (Exception,), {})())
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(AuthError())
+    assert not is_retryable(type("BadRequestError", (Exception,), {"status_code": 400})())
+    assert not is_retryable(ValueError("bad input"))
+
+
+@pytest.mark.asyncio
+async def test_embed_and_upsert_writes_every_leaf():
+    client = QdrantClient(":memory:")
+    vector_store = QdrantVectorStore(collection_name="scheduler_test", client=client)
+    scheduler = _scheduler(LatencyEmbedding(embed_dim=8), max_concurrency=4, max_batch_inputs=7)
+
+    stats = await aembed_and_upsert(_leaves(50), vector_store, scheduler=scheduler)
+
+    assert client.count("scheduler_test").count == 50
+    assert stats["requests"] == 8
@@ -0,0 +1,118 @@
+
+# uv run pytest tests/test_engine_cache.py
+
+import pytest
+from app.core.generations import IndexGenerations
+from app.engine.engine_cache import QueryEngineCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def builds():
+    return []
+
+
+@pytest.fixture
+def make_cache(builds):
+    def _make(**kwargs):
+        def builder(fund_id, vector_index, streaming=False):
+            engine = object()
+            builds.append((fund_id, engine))
+            return engine
+
+        kwargs.setdefault("generations", IndexGenerations())
+        return QueryEngineCache(builder=builder, **kwargs)
+
+    return _make
+
+
+def test_engine_is_reused_per_fund(make_cache, builds):
+    cache = make_cache()
+    index = object()
+
+    first = cache.get("fund_a", index)
+    assert cache.get("fund_a", index) is first
+    assert cache.get("fund_b", index) is not first
+
+    assert len(builds) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_global_aliases_share_an_entry(make_cache, builds):
+    cache = make_cache()
+    index = object()
+
+    cache.get("global", index)
+    cache.get("GLOBAL", index)
+    cache.get("", index)
+    assert len(builds) == 1
+
+
+def test_lru_eviction(make_cache, builds):
+    cache = make_cache(max_size=2)
+    index = object()
+
+    cache.get("a", index)
+    cache.get("b", index)
+    cache.get("a", index)  # 'b' is now least recently used
+    cache.get("c", index)
+
+    assert cache.stats()["size"] == 2
+    cache.get("a", index)
+    assert len(builds) == 3
+    cache.get("b", index)
+    assert len(builds) == 4
+
+
+def test_ttl_expiry(make_cache, builds):
+    clock = FakeClock()
+    cache = make_cache(ttl_seconds=10, clock=clock)
+    index = object()
+
+    first = cache.get("a", index)
+    clock.now = 9
+    assert cache.get("a", index) is first
+    clock.now = 11
+    assert cache.get("a", index) is not first
+
+
+def test_reingest_invalidates_only_that_fund(make_cache, builds):
+    generations = IndexGenerations()
+    cache = make_cache(generations=generations)
+    index = object()
+
+    deed_engine = cache.get("fund_a", index)
+    other_engine = cache.get("fund_b", index)
+
+    generations.bump("fund_a")
+
+    assert cache.get("fund_a", index) is not deed_engine
+    assert cache.get("fund_b", index) is other_engine
+
+
+def test_new_vector_index_rebuilds(make_cache, builds):
+    cache = make_cache()
+
+    first = cache.get("a", object())
+    assert cache.get("a", object()) is not first
+
+
+def test_streaming_engines_are_cached_separately(make_cache, builds):
+    cache = make_cache()
+    index = object()
+
+    plain = cache.get("a", index)
+    streaming = cache.get("a", index, streaming=True)
+    assert plain is not streaming
+    assert cache.get("a", index, streaming=True) is streaming
+
+    cache.invalidate("a")
+    assert cache.stats()["size"] == 0
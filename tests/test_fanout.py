@@ -0,0 +1,118 @@
+# uv run pytest tests/test_fanout.py
+
+import asyncio
+import time
+
+import pytest
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from qdrant_client import QdrantClient, models
+
+from app.core.instrumentation import count_llm_calls
+from app.engine.fanout import CollectionIndexes, FanOutRetriever, SearchSource, normalize_scores
+from app.engine.query_engine import get_fanout_query_engine
+from benchmarks.corpus import build_corpus, build_deed_documents, build_ruling_documents
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM, add_search_latency
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_settings():
+    Settings.llm = LatencyLLM()
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+
+
+def _indexes():
+    served = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    collections = {
+        "ato_rulings": VectorStoreIndex.from_documents(build_ruling_documents()),
+        "trust_deeds": VectorStoreIndex.from_documents(build_deed_documents(["fund_1", "fund_2"])),
+    }
+    return served, collections
+
+
+@pytest.mark.asyncio
+async def test_fanout_searches_all_sources_concurrently_and_synthesizes_once():
+    served, collections = _indexes()
+    for index in [served, *collections.values()]:
+        add_search_latency(index.vector_store, 0.2)
+    engine = get_fanout_query_engine("fund_1", served, collections=collections)
+    # public_law, rulings, private_deed on the served index + both collections
+    assert engine.retriever.source_names == ["public_law", "rulings", "private_deed", "ato_rulings", "trust_deeds"]
+
+    embed_calls = Settings.embed_model.calls
+    start = time.perf_counter()
+    with count_llm_calls() as llm_calls:
+        response = await engine.aquery("Does TR 2021/3 affect our deed's clause 12.4 borrowing?")
+    elapsed = time.perf_counter() - start
+
+    # Five 0.2s searches in parallel, not 1s in a row; one embedding, one LLM call
+    assert elapsed < 0.6
+    assert Settings.embed_model.calls == embed_calls + 1
+    assert llm_calls.count == 1
+    metadata = [n.node.metadata for n in response.source_nodes]
+    assert "TR 2021/3" in [m.get("ruling_id") for m in metadata]
+    # The fund_id filter holds in every source
+    assert {m["fund_id"] for m in metadata} <= {"fund_1", "global"}
+    assert all(0.0 <= n.score <= 1.0 for n in response.source_nodes)
+
+
+def test_failing_source_is_skipped_and_global_fund_has_no_deed_sources():
+    served, collections = _indexes()
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("collection not found")
+
+    object.__setattr__(collections["ato_rulings"].vector_store, "query", broken)
+    engine = get_fanout_query_engine("global", served, collections=collections)
+    assert engine.retriever.source_names == ["public_law", "rulings", "ato_rulings"]
+
+    nodes = engine.retriever.retrieve(QueryBundle("What is the in-house asset limit?"))
+    assert nodes and {n.node.metadata["doc_type"] for n in nodes} <= {"legislation", "ruling"}
+
+
+def test_merge_ranks_sources_on_one_scale():
+    law = TextNode(id_="s65", text="s 65: trustees must not lend to members.")
+    deed = TextNode(id_="cl3", text="Clause 3.1: the fund's name.")
+    ruling = TextNode(id_="tr", text="TR 2021/3 on lending.")
+    sources = [SearchSource("public_law", None), SearchSource("trust_deeds", None), SearchSource("rulings", None)]
+    retriever = FanOutRetriever(sources, embed_model=None)
+
+    merged = retriever._merge([
+        [NodeWithScore(node=law, score=0.82)],
+        # An unrelated deed clause: the deed's best hit, but a weak one
+        [NodeWithScore(node=deed, score=0.31)],
+        [NodeWithScore(node=ruling, score=0.64), NodeWithScore(node=TextNode(id_="tr2", text="x"), score=0.6)],
+    ])
+    assert [n.node.node_id for n in merged] == ["s65", "tr", "tr2", "cl3"]
+    assert merged[0].score == 0.82 and merged[-1].score == 0.31
+
+    # Hybrid: RRF scores rescaled by the best possible fused score, 1 / (k + 1)
+    assert normalize_scores([NodeWithScore(node=law, score=1 / 61)], rrf_k=60) == [1.0]
+
+
+@pytest.mark.asyncio
+async def test_collection_indexes_are_refreshed_in_the_background():
+    client = QdrantClient(":memory:")
+    lookups = []
+    exists = client.collection_exists
+
+    def counting_exists(name):
+        lookups.append(name)
+        return exists(name)
+
+    client.collection_exists = counting_exists
+    indexes = CollectionIndexes(["legislation", "trust_deeds"], recheck_seconds=0.05)
+    assert indexes.open(client) == {}
+    indexes.start()
+
+    # Request path: memory only, however often it is called
+    lookups.clear()
+    for _ in range(10):
+        assert indexes.get() == {}
+    assert lookups == []
+
+    client.create_collection("legislation", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    await asyncio.sleep(0.2)
+    assert list(indexes.get()) == ["legislation"] and "trust_deeds" in lookups
+    await indexes.close()
+    assert indexes.get() == {}
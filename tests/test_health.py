@@ -0,0 +1,65 @@
+
+# uv run pytest tests/test_health.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.qdrant import HealthProbe
+from main import app
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def get_collections(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("qdrant down")
+        return []
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.aclient = FakeAsyncClient()
+
+
+@pytest.mark.asyncio
+async def test_probe_reports_last_result():
+    registry = FakeRegistry()
+    probe = HealthProbe(registry, interval=60)
+    assert probe.snapshot()["status"] == "starting"
+
+    await probe.probe_once()
+    assert probe.snapshot()["status"] == "healthy"
+
+    registry.aclient.fail = True
+    await probe.probe_once()
+    snapshot = probe.snapshot()
+    assert snapshot["status"] == "unhealthy"
+    assert "qdrant down" in snapshot["checks"]["vector_db"]
+
+
+@pytest.mark.asyncio
+async def test_health_route_serves_cached_probe_without_network_calls():
+    registry = FakeRegistry()
+    probe = HealthProbe(registry, interval=0.01)
+    app.state.health_probe = probe
+    probe.start()
+    await asyncio.sleep(0.05)
+    await probe.stop()
+    probes_so_far = registry.aclient.calls
+    assert probes_so_far >= 2
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(20):
+            resp = await client.get("/api/health")
+            assert resp.status_code == 200
+            assert resp.json()["status"] == "healthy"
+
+    assert registry.aclient.calls == probes_so_far
+    del app.state.health_probe
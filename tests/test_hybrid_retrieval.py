@@ -0,0 +1,60 @@
+
+# uv run pytest tests/test_hybrid_retrieval.py
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.core.bm25 import bm25_doc_encoder, bm25_query_encoder, reciprocal_rank_fusion, term_index, tokenize
+from app.core.config import settings
+from app.core.qdrant import vector_store_options
+from app.engine.query_engine import get_smsf_query_engine
+from benchmarks.corpus import build_legislation_documents
+from benchmarks.stubs import CitationBlindEmbedding, LatencyLLM
+
+
+def _result(ids):
+    return VectorStoreQueryResult(nodes=[TextNode(id_=i, text=i) for i in ids], ids=ids)
+
+
+def test_tokenizer_keeps_citations():
+    assert tokenize("What does s 67A say about Clause 12.4?") == ["s", "67a", "clause", "12.4"]
+
+
+def test_sparse_encoders_share_term_indices():
+    (doc_indices,), (doc_values,) = bm25_doc_encoder(["section 67A borrowing borrowing"])
+    (query_indices,), (query_values,) = bm25_query_encoder(["s 67A"])
+
+    assert term_index("67a") in doc_indices and term_index("67a") in query_indices
+    weights = dict(zip(doc_indices, doc_values))
+    # Repeated terms saturate rather than doubling
+    assert weights[term_index("67a")] < weights[term_index("borrowing")] < 2 * weights[term_index("67a")]
+    assert set(query_values) == {1.0}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion(_result(["a", "b", "c"]), _result(["c", "d"]), top_k=2)
+    assert fused.ids == ["c", "a"]
+    assert len(fused.nodes) == len(fused.similarities) == 2
+
+
+def test_hybrid_retrieval_finds_cited_section(monkeypatch):
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "hybrid")
+    Settings.llm = LatencyLLM()
+    Settings.embed_model = CitationBlindEmbedding(embed_dim=64)
+    vector_store = QdrantVectorStore(
+        collection_name="hybrid_test", client=QdrantClient(":memory:"), **vector_store_options()
+    )
+    index = VectorStoreIndex.from_documents(
+        build_legislation_documents(),
+        storage_context=StorageContext.from_defaults(vector_store=vector_store),
+    )
+
+    engine = get_smsf_query_engine(fund_id="global", vector_index=index)
+    retriever = engine._query_engines[0].retriever
+    nodes = retriever.retrieve("What does s 67A say?")
+
+    assert retriever._vector_store_query_mode == "hybrid"
+    assert "67A" in [n.node.metadata["section"] for n in nodes[:2]]
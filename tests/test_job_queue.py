@@ -0,0 +1,141 @@
+
+# uv run pytest tests/test_job_queue.py
+
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from app.api.dependencies import get_job_queue, verify_api_key
+from app.core.generations import IndexGenerations
+from app.core.job_queue import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, FinishedJobWatcher, JobQueue
+from app.ingestion.worker import IngestionWorker
+from main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_failed_jobs_back_off_then_fail_and_dead_workers_lose_their_lease(tmp_path):
+    clock = FakeClock()
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=60, clock=clock)
+    first = queue.enqueue("ruling", {"fund_id": "global"}, max_attempts=2)
+    second = queue.enqueue("ruling", {"fund_id": "global"}, max_attempts=1)
+
+    assert queue.claim("w1")["job_id"] == first["job_id"]
+    # Global limit across workers: one job already running
+    assert queue.claim("w2", max_running=1) is None
+
+    assert queue.fail(first["job_id"], "boom", backoff_seconds=30)["status"] == QUEUED
+    # The retry is not due yet, so the next claim gets the other job
+    assert queue.claim("w1")["job_id"] == second["job_id"]
+    clock.now += 31
+    assert queue.claim("w2")["job_id"] == first["job_id"]
+    assert queue.fail(first["job_id"], "boom again")["status"] == FAILED
+
+    # w1 died holding `second` (last attempt): its lease expires and the job fails
+    clock.now += 61
+    assert queue.claim("w3") is None
+    assert queue.get(second["job_id"])["status"] == FAILED
+    assert queue.get(second["job_id"])["error"] == "worker lease expired"
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_retries_and_cancels_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    calls = {"flaky": 0}
+    started = asyncio.Event()
+
+    async def ok(payload, progress, scheduler):
+        progress(0.5, "halfway")
+        return {"leaves": 3}
+
+    async def flaky(payload, progress, scheduler):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise ConnectionError("qdrant unavailable")
+        return {"leaves": 1}
+
+    async def slow(payload, progress, scheduler):
+        started.set()
+        await asyncio.sleep(30)
+
+    worker = IngestionWorker(queue, handlers={"ok": ok, "flaky": flaky, "slow": slow}, scheduler=object(),
+                             concurrency=3, poll_seconds=0.01, heartbeat_seconds=0.01, retry_backoff=0)
+    jobs = [queue.enqueue(kind, {"fund_id": "fund_1"}) for kind in ("ok", "flaky", "slow")]
+
+    run = asyncio.create_task(worker.run(drain=True))
+    await started.wait()
+    queue.cancel(jobs[2]["job_id"])
+    await asyncio.wait_for(run, timeout=5)
+
+    ok_job, flaky_job, slow_job = (queue.get(job["job_id"]) for job in jobs)
+    assert ok_job["status"] == SUCCEEDED and ok_job["result"] == {"leaves": 3} and ok_job["progress"] == 1
+    assert flaky_job["status"] == SUCCEEDED and flaky_job["attempts"] == 2
+    assert slow_job["status"] == CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_shutdown_returns_running_jobs_to_the_queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    started = asyncio.Event()
+
+    async def slow(payload, progress, scheduler):
+        started.set()
+        await asyncio.sleep(30)
+
+    worker = IngestionWorker(queue, handlers={"slow": slow}, scheduler=object(), poll_seconds=0.01)
+    job = queue.enqueue("slow", {"fund_id": "fund_1"})
+    stop = asyncio.Event()
+    run = asyncio.create_task(worker.run(stop=stop))
+    await started.wait()
+    assert queue.get(job["job_id"])["status"] == RUNNING
+
+    stop.set()
+    await asyncio.wait_for(run, timeout=5)
+
+    job = queue.get(job["job_id"])
+    assert job["status"] == QUEUED and job["attempts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_is_queued_not_processed_and_can_be_cancelled(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "JOB_UPLOAD_DIR", str(tmp_path / "uploads"))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            resp = await client.post("/api/ingest/trust-deed/fund_1",
+                                     files={"file": ("deed.pdf", b"%PDF-1.7 deed", "application/pdf")})
+            assert resp.status_code == 202
+            job_id = resp.json()["job_id"]
+
+            job = (await client.get(f"/api/ingest/jobs/{job_id}")).json()
+            assert job["status"] == QUEUED and job["kind"] == "trust_deed"
+            with open(job["payload"]["file_path"], "rb") as f:
+                assert f.read() == b"%PDF-1.7 deed"
+
+            assert (await client.post(f"/api/ingest/jobs/{job_id}/cancel")).json()["status"] == CANCELLED
+            assert not os.path.exists(job["payload"]["file_path"])
+            assert (await client.get("/api/ingest/jobs", params={"status": CANCELLED})).json()["counts"] == {CANCELLED: 1}
+            assert (await client.get("/api/ingest/jobs/nope")).status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+    # The API process learns about finished jobs from the queue
+    generations = IndexGenerations()
+    watcher = FinishedJobWatcher(queue, generations, clock=lambda: 0)
+    done = queue.enqueue("ruling", {"fund_id": "global"})
+    queue.claim("w1")
+    queue.complete(done["job_id"])
+    assert watcher.poll() == 1 and generations.get("global") == 1
+    assert watcher.poll() == 0
@@ -0,0 +1,77 @@
+
+# uv run pytest tests/test_metrics.py
+
+import re
+
+import httpx
+import pytest
+from llama_index.core import Settings, VectorStoreIndex
+
+from app.api.dependencies import verify_api_key
+from app.api.routes import metrics as metrics_route, query as query_route
+from app.core.instrumentation import stage, track_stages
+from app.engine.answer_cache import SemanticAnswerCache
+from app.engine.engine_cache import query_engine_cache
+from benchmarks.corpus import build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+from main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    Settings.llm = LatencyLLM(latency=0.02)
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+    app.state.vector_index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    query_engine_cache.invalidate()
+    # A fresh answer cache, so hit/miss counters start at zero and don't leak into other tests
+    answer_cache = SemanticAnswerCache()
+    monkeypatch.setattr(query_route, "answer_cache", answer_cache)
+    monkeypatch.setattr(metrics_route, "answer_cache", answer_cache)
+    yield httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+    app.state.vector_index = None
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    label_re = ",".join(f'{k}="{re.escape(v)}"' for k, v in labels.items())
+    match = re.search(rf"^{name}{{{label_re}[^}}]*}} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name} {labels} not exported"
+    return float(match.group(1))
+
+
+@pytest.mark.asyncio
+async def test_ask_reports_stage_breakdown_and_metrics(client):
+    question = {"fund_id": "fund_1", "question": "What are the LRBA rules in section 67A?"}
+    async with client:
+        first = await client.post("/api/ask", json=question)
+        await client.post("/api/ask", json=question)  # answer cache hit
+        scrape = await client.get("/api/metrics")
+
+    timing = first.headers["Server-Timing"]
+    stages = dict(re.findall(r"(\w+);dur=([\d.]+)", timing))
+    assert {"embedding", "retrieval", "synthesis", "llm", "total"} <= set(stages)
+    assert float(stages["llm"]) >= 20 and float(stages["total"]) >= float(stages["retrieval"])
+    assert 'llm_calls;desc="1 calls' in timing
+
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = scrape.text
+    assert _sample(text, "smsf_stage_duration_seconds_count", operation="POST /ask", stage="retrieval") >= 1
+    assert _sample(text, "smsf_llm_calls_per_operation_count", operation="POST /ask") >= 2
+    assert _sample(text, "smsf_retrieved_nodes_count", operation="POST /ask") >= 1
+    assert _sample(text, "smsf_llm_tokens_total", type="prompt") > 0
+    assert _sample(text, "smsf_llm_tokens_total", type="completion") > 0
+    assert _sample(text, "smsf_cache_hit_ratio", cache="answer") == 0.5
+
+
+def test_stage_time_is_wall_time_across_nested_and_overlapping_calls():
+    with track_stages("unit") as timings:
+        with stage("retrieval"):
+            with stage("retrieval"):
+                pass
+        timings.add("synthesis", 10.0, 12.0)
+        timings.add("synthesis", 11.0, 13.0)
+        timings.add("synthesis", 20.0, 21.0)
+    seconds = timings.stage_seconds()
+    assert seconds["synthesis"] == pytest.approx(4.0)
+    assert 0 <= seconds["retrieval"] < 0.1
@@ -0,0 +1,183 @@
+
+# uv run pytest tests/test_query_route.py
+
+import json
+
+import httpx
+import pytest
+from llama_index.core import Settings, VectorStoreIndex
+
+from app.api.dependencies import verify_api_key
+from app.core.citation_index import SECTION, CitationIndex
+from app.core.docstore import SQLiteDocumentStore
+from app.core.config import settings
+from app.core.instrumentation import count_llm_calls
+from app.engine.answer_cache import answer_cache
+from app.engine import citation_lookup as citation_lookup_module
+from app.engine.citation_lookup import CitationLookup
+from app.engine.engine_cache import query_engine_cache
+from benchmarks.corpus import QUESTIONS, build_corpus, build_legislation_documents
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+from main import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Empty citation index unless a test writes one
+    monkeypatch.setattr(citation_lookup_module, "citation_lookup", CitationLookup(
+        legislation_dir=str(tmp_path / "legislation"), trust_deed_dir=str(tmp_path / "trust_deeds")
+    ))
+    Settings.llm = LatencyLLM()
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+    app.state.vector_index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    query_engine_cache.invalidate()
+    answer_cache.clear()
+
+    transport = httpx.ASGITransport(app=app)
+    yield httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    app.dependency_overrides.clear()
+    app.state.vector_index = None
+
+
+@pytest.mark.asyncio
+async def test_ask_returns_answer_and_sources(client):
+    async with client:
+        resp = await client.post("/api/ask", json={
+            "fund_id": "fund_1",
+            "question": "What are the LRBA rules in section 67A?",
+        })
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body) == {"answer", "fund_id", "sources"}
+    assert body["fund_id"] == "fund_1"
+    assert body["answer"]
+    assert body["sources"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_served_from_answer_cache(client):
+    question = {"fund_id": "fund_1", "question": "What is the in-house asset limit?"}
+    async with client:
+        with count_llm_calls() as first_calls:
+            first = await client.post("/api/ask", json=question)
+        with count_llm_calls() as second_calls:
+            second = await client.post("/api/ask", json=question)
+        other_fund = await client.post("/api/ask", json={**question, "fund_id": "fund_2"})
+
+    assert first_calls.count == 1  # fan-out retrieval + one synthesis call
+    assert second_calls.count == 0
+    assert second.json() == first.json()
+    assert other_fund.json()["fund_id"] == "fund_2"
+    assert answer_cache.stats()["saved_llm_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cited_section_is_pinned_ahead_of_retrieved_context(client, tmp_path):
+    legislation_dir = str(tmp_path / "legislation")
+    nodes = build_legislation_documents()
+    SQLiteDocumentStore.from_persist_dir(legislation_dir).add_documents(nodes)
+    citations = CitationIndex()
+    citations.index_nodes(nodes, kind=SECTION, scope="global")
+    citations.persist(legislation_dir)
+
+    question = {"fund_id": "fund_1", "question": "Does clause 12.4 of our deed allow borrowing under s 67A?"}
+    async with client:
+        with count_llm_calls() as llm_calls:
+            resp = await client.post("/api/ask", json=question)
+        with count_llm_calls() as cached_calls:
+            cached = await client.post("/api/ask", json=question)
+
+    assert resp.status_code == 200
+    assert llm_calls.count == 1
+    sources = resp.json()["sources"]
+    # s 67A first, then what retrieval found (the fund's deed included)
+    assert sources[0] == nodes[6].text[:200]
+    assert any("Clause 12.4" in source for source in sources[1:])
+    # Same path as every other answer: cached and counted
+    assert cached_calls.count == 0 and cached.json() == resp.json()
+
+
+@pytest.mark.asyncio
+async def test_missing_index_is_reported(client):
+    app.state.vector_index = None
+    async with client:
+        resp = await client.post("/api/query", json={"fund_id": "x", "question": "q"})
+
+    assert resp.status_code == 500
+    assert resp.json()["detail"] == "Index not initialized"
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_ask_stream_emits_route_sources_then_tokens(client):
+    async with client:
+        resp = await client.post("/api/ask/stream", json={
+            "fund_id": "fund_1",
+            "question": "What does clause 12.4 of the deed say about borrowing?",
+        })
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(resp.text)
+    names = [name for name, _ in events]
+    assert names[:2] == ["route", "sources"]
+    assert names[-1] == "done"
+    assert "token" in names
+
+    assert events[0][1]["tool"] == "fanout"
+    sources = events[1][1]["sources"]
+    # The fund's own deed and public law only, never another fund's deed
+    assert {s["fund_id"] for s in sources} <= {"fund_1", "global"}
+    assert "12.4" in [s.get("clause") for s in sources]
+    answer = "".join(data["text"] for name, data in events if name == "token")
+    assert answer == LatencyLLM().answer
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_streams_ndjson_with_one_embedding_request(client):
+    questions = QUESTIONS + ["Hello there"]
+    embed_model = Settings.embed_model
+    before = embed_model.requests
+
+    async with client:
+        resp = await client.post("/api/ask/batch", json={"fund_id": "fund_1", "questions": questions})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(len(questions)))
+    assert all(line["answer"] and line["fund_id"] == "fund_1" for line in lines)
+    assert all(line["question"] == questions[line["index"]] for line in lines)
+    assert embed_model.requests == before + 1
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_rejects_oversized_batches(client, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_QUESTIONS", 2)
+    async with client:
+        resp = await client.post("/api/ask/batch", json={"fund_id": "f", "questions": ["a", "b", "c"]})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_embedding_failure_is_a_server_error(client, monkeypatch):
+    async def fail(self, texts, **kwargs):
+        raise RuntimeError("embedding service unavailable")
+
+    monkeypatch.setattr(type(Settings.embed_model), "aget_text_embedding_batch", fail)
+    async with client:
+        resp = await client.post("/api/ask/batch", json={"fund_id": "fund_1", "questions": QUESTIONS})
+
+    assert resp.status_code == 502
+    assert "embedding service unavailable" in resp.json()["detail"]
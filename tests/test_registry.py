@@ -0,0 +1,155 @@
+
+# uv run pytest tests/test_registry.py
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.api.dependencies import get_storage_handler, verify_api_key
+from app.storage.do_spaces import DOSpacesHandler
+from app.storage.registry import ENTRIES, LEGACY_REGISTRY_KEY, SINGLE, RegistryService
+from benchmarks.stubs import InMemoryS3
+from main import app
+
+
+def _entry(name: str) -> dict:
+    return {"name": name, "indexed_at": "2026-01-01T00:00:00", "status": "completed"}
+
+
+def _run_updaters(s3: InMemoryS3, layout: str, updaters: int = 8, files_each: int = 5):
+    # One service per updater: separate API/worker processes, each with its own cache
+    services = [RegistryService(s3, "bucket", layout=layout, retry_backoff=0.001, max_retries=50)
+                for _ in range(updaters)]
+
+    def update(i):
+        for j in range(files_each):
+            services[i].upsert(_entry(f"fund_{i}/deed_{j}.pdf"))
+
+    with ThreadPoolExecutor(max_workers=updaters) as pool:
+        list(pool.map(update, range(updaters)))
+    return services
+
+
+@pytest.mark.parametrize("layout", [SINGLE, ENTRIES])
+def test_concurrent_updaters_never_lose_entries(layout):
+    s3 = InMemoryS3(latency=0.002)
+    services = _run_updaters(s3, layout)
+
+    names = {f["name"] for f in RegistryService(s3, "bucket", layout=layout).get()["indexed_files"]}
+    assert names == {f"fund_{i}/deed_{j}.pdf" for i in range(8) for j in range(5)}
+
+    assert services[0].remove("fund_3/deed_1.pdf") is True
+    assert services[1].remove("fund_3/deed_1.pdf") is False
+    assert len(services[2].get()["indexed_files"]) == 39
+    if layout == ENTRIES:
+        # Every update wrote only its own object
+        assert s3.calls["put_object"] == 40
+
+
+def test_cached_reads_transfer_only_what_changed():
+    s3 = InMemoryS3()
+    writer, reader = RegistryService(s3, "bucket", layout=ENTRIES), RegistryService(s3, "bucket", layout=ENTRIES)
+    for i in range(20):
+        writer.upsert(_entry(f"rulings/TR_{i}.pdf"))
+
+    assert len(reader.get()["indexed_files"]) == 20
+    gets = s3.calls["get_object"]
+    reader.get()
+    # One LIST validated all 20 cached entries
+    assert s3.calls["get_object"] == gets
+
+    writer.upsert(dict(_entry("rulings/TR_3.pdf"), status="failed"))
+    writer.remove("rulings/TR_4.pdf")
+    files = {f["name"]: f for f in reader.get()["indexed_files"]}
+    assert s3.calls["get_object"] == gets + 1
+    assert files["rulings/TR_3.pdf"]["status"] == "failed" and "rulings/TR_4.pdf" not in files
+
+    # registry.json: a conditional GET answered 304 re-downloads nothing
+    single = RegistryService(s3, "bucket", layout=SINGLE)
+    single.upsert(_entry("a.pdf"))
+    single.get()
+    single.get()
+    assert single.stats()["not_modified"] == 2 and single.stats()["fetches"] == 0
+
+
+def test_legacy_registry_json_is_migrated_to_entries():
+    s3 = InMemoryS3()
+    legacy = {"indexed_files": [_entry("legislation/SIS_Act_VOL_01_2025.pdf"), _entry("rulings/TR_2021_3.pdf")]}
+    s3.put_object(Bucket="bucket", Key=LEGACY_REGISTRY_KEY, Body=json.dumps(legacy))
+
+    registry = RegistryService(s3, "bucket", layout=ENTRIES)
+    assert registry.get() == legacy
+    registry.upsert(_entry("rulings/TR_2023_4.pdf"))
+    assert len(registry.get()["indexed_files"]) == 3
+
+
+def spaces_handler(monkeypatch, s3: InMemoryS3) -> DOSpacesHandler:
+    for var in ("REGION", "ENDPOINT", "KEY", "SECRET"):
+        monkeypatch.setenv(f"DO_SPACES_{var}", "test")
+    monkeypatch.setenv("DO_SPACES_BUCKET", "bucket")
+    return DOSpacesHandler(client=s3)
+
+
+@pytest.mark.asyncio
+async def test_registry_routes_update_single_entries(monkeypatch):
+    s3 = InMemoryS3()
+    handler = spaces_handler(monkeypatch, s3)
+    s3.put_object(Bucket="bucket", Key="legislation/SIS.pdf", Body=b"%PDF-1.7")
+
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    app.dependency_overrides[get_storage_handler] = lambda: handler
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for name in ("legislation/SIS.pdf", "rulings/TR.pdf"):
+                resp = await client.post("/api/registry/update", params={"file_key": name})
+                assert resp.status_code == 200
+            assert (await client.delete("/api/files/delete", params={"file_key": "legislation/SIS.pdf"})).status_code == 200
+            files = (await client.get("/api/registry")).json()["indexed_files"]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [f["name"] for f in files] == ["rulings/TR.pdf"]
+    assert LEGACY_REGISTRY_KEY not in {o["Key"] for o in s3.list_objects_v2(Bucket="bucket")["Contents"]}
+
+
+@pytest.mark.asyncio
+async def test_file_listing_pages_with_cursors_and_caches(monkeypatch):
+    s3 = InMemoryS3()
+    handler = spaces_handler(monkeypatch, s3)
+    for i in range(2500):
+        s3.put_object(Bucket="bucket", Key=f"deeds/fund_{i:05d}.pdf", Body=b"%PDF-1.7")
+    handler.registry.upsert(_entry("deeds/fund_00000.pdf"))
+
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    app.dependency_overrides[get_storage_handler] = lambda: handler
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = (await client.get("/api/files", params={"limit": 100})).json()
+            # The first page costs one LIST and 100 signatures, whatever the bucket size
+            assert len(first["files"]) == 100 and first["next_cursor"]
+            assert s3.calls["list_objects_v2"] == 1 and s3.calls["generate_presigned_url"] == 100
+
+            assert (await client.get("/api/files", params={"limit": 100})).json() == first
+            assert s3.calls["list_objects_v2"] == 1 and s3.calls["generate_presigned_url"] == 100
+
+            names, cursor = [], None
+            while True:
+                params = {"limit": 1000, "urls": "false"}
+                if cursor:
+                    params["cursor"] = cursor
+                page = (await client.get("/api/files", params=params)).json()
+                names += [f["path"] for f in page["files"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+
+            await client.delete("/api/files/delete", params={"file_key": "deeds/fund_00000.pdf"})
+            after_delete = (await client.get("/api/files", params={"limit": 100})).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    # Every document, no registry bookkeeping objects
+    assert names == [f"deeds/fund_{i:05d}.pdf" for i in range(2500)]
+    assert after_delete["files"][0]["path"] == "deeds/fund_00001.pdf"
@@ -0,0 +1,34 @@
+
+# uv run pytest tests/test_retrieval.py
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.engine.fanout import build_sources
+from benchmarks.corpus import build_corpus
+from benchmarks.stubs import LatencyEmbedding
+
+
+def test_sources_filter_by_doc_type_and_fund_in_qdrant():
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+    vector_store = QdrantVectorStore(collection_name="retrieval_test", client=QdrantClient(":memory:"))
+    index = VectorStoreIndex.from_documents(
+        build_corpus(fund_ids=["fund_1", "fund_2"]),
+        storage_context=StorageContext.from_defaults(vector_store=vector_store),
+    )
+
+    sources = {s.name: s.retriever for s in build_sources("fund_1", index, {}, top_k=5)}
+    assert list(sources) == ["public_law", "rulings", "private_deed"]
+
+    question = "Can the trustee borrow under clause 12.4 and the SIS Act?"
+    deed_hits = sources["private_deed"].retrieve(question)
+    assert deed_hits and {(n.node.metadata["doc_type"], n.node.metadata["fund_id"]) for n in deed_hits} == {
+        ("trust_deed", "fund_1")
+    }
+    assert deed_hits[0].node.metadata["clause"] == "12.4"
+    assert {n.node.metadata["doc_type"] for n in sources["public_law"].retrieve(question)} == {"legislation"}
+    assert {n.node.metadata["doc_type"] for n in sources["rulings"].retrieve(question)} == {"ruling"}
+
+    # The global fund never searches any deed
+    assert [s.name for s in build_sources("global", index, {})] == ["public_law", "rulings"]
@@ -3,29 +3,36 @@
 # uv run pytest tests/test_router.py
 
 import pytest
-from llama_index.core.llms import MockLLM
-from llama_index.core import Settings
-from app.engine.query_engine import get_smsf_query_engine
+from llama_index.core import Settings, VectorStoreIndex
+from app.core.config import settings
+from app.engine.query_engine import get_smsf_query_engine, selected_tool_name
+from benchmarks.corpus import build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
 
 @pytest.fixture(autouse=True)
-def setup_mock_settings():
+def setup_mock_settings(monkeypatch):
     """
-    This fixture overrides the global Settings with a MockLLM 
-    before every test to ensure no real API calls are made.
+    This fixture overrides the global Settings with a stub LLM (which answers
+    router selection prompts by keyword) before every test to ensure no real
+    API calls are made.
     """
-    Settings.llm = MockLLM(max_tokens=50)
+    Settings.llm = LatencyLLM()
     # We also mock the embedding model to avoid calls there
-    from llama_index.core.embeddings import MockEmbedding
-    Settings.embed_model = MockEmbedding(embed_dim=1536)
+    Settings.embed_model = LatencyEmbedding(embed_dim=64)
+    monkeypatch.setattr(settings, "ROUTER_MODE", "llm")
+
+@pytest.fixture
+def vector_index():
+    return VectorStoreIndex.from_documents(build_corpus(fund_ids=["test_fund_123", "SECRET_FUND_789"]))
 
 @pytest.mark.asyncio
-async def test_router_selection_logic():
+async def test_router_selection_logic(vector_index):
     """
     Verifies the router correctly identifies which tool to use.
     """
     # Initialize the engine (it will use our MockLLM from Settings)
     fund_id = "test_fund_123"
-    engine = get_smsf_query_engine(fund_id)
+    engine = get_smsf_query_engine(fund_id, vector_index)
     
     # 1. Test Legislation Routing
     query_legis = "What does the SIS Act say about borrowing?"
@@ -39,25 +46,27 @@ async def test_router_selection_logic():
     assert selection.selections[0].index == 0
     
     # 2. Test Trust Deed Routing
-    query_deed = "Does my specific fund allow property purchase?"
+    query_deed = "Does our deed allow my fund to purchase property?"
     response_deed = engine.query(query_deed)
     
     selection_deed = response_deed.metadata.get("selector_result")
     assert selection_deed.selections[0].index == 1
+    assert selected_tool_name(engine, response_deed) == "private_deed"
 
 @pytest.mark.asyncio
-async def test_fund_id_filter_application():
+async def test_fund_id_filter_application(vector_index):
     """
     Ensures that the fund_id passed to the engine is actually 
     included in the metadata filters.
     """
     fund_id = "SECRET_FUND_789"
-    engine = get_smsf_query_engine(fund_id)
+    engine = get_smsf_query_engine(fund_id, vector_index)
     
     # We look at the 'deed_tool' inside the router to verify its filters
-    # The tools are stored in the query_engine_tools list
-    deed_tool = engine._query_engine_tools[1] 
-    filters = deed_tool.query_engine._retriever._filters
+    # The router keeps each tool's query engine in _query_engines (tool order)
+    assert engine.tool_metadatas[1].name == "private_deed"
+    deed_engine = engine._query_engines[1]
+    filters = deed_engine._retriever._filters
     
     # Verify the ExactMatchFilter is set to our fund_id
     fund_filter = next(f for f in filters.filters if f.key == "fund_id")
@@ -0,0 +1,95 @@
+
+# uv run pytest tests/test_router_selector.py
+
+import pytest
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.base.base_selector import BaseSelector, SelectorResult, SingleSelection
+from llama_index.core.schema import QueryBundle
+from llama_index.core.tools import ToolMetadata
+
+from app.core.config import settings
+from app.core.instrumentation import count_llm_calls
+from app.engine.query_engine import get_smsf_query_engine, selected_tool_name
+from app.engine.router_selector import EmbeddingRouterSelector
+from benchmarks.corpus import ROUTING_CASES, build_corpus
+from benchmarks.stubs import LatencyEmbedding, LatencyLLM
+
+TOOLS = [
+    ToolMetadata(name="public_law", description="Search here for SIS Act regulations and general superannuation law."),
+    ToolMetadata(name="private_deed", description="Search here for specific rules within the Trust Deed for Fund fund_1."),
+    ToolMetadata(name="fallback", description="Use this for greetings or general superannuation questions."),
+]
+
+
+class RecordingSelector(BaseSelector):
+    def __init__(self):
+        self.calls = 0
+
+    def _get_prompts(self):
+        return {}
+
+    def _update_prompts(self, prompts):
+        pass
+
+    def _select(self, choices, query):
+        self.calls += 1
+        return SelectorResult(selections=[SingleSelection(index=0, reason="llm")])
+
+    async def _aselect(self, choices, query):
+        return self._select(choices, query)
+
+
+@pytest.fixture(autouse=True)
+def setup_mock_settings():
+    Settings.llm = LatencyLLM()
+    Settings.embed_model = LatencyEmbedding(embed_dim=256)
+
+
+def test_labelled_routing_accuracy_without_llm_calls():
+    selector = EmbeddingRouterSelector.from_defaults(fallback_selector=RecordingSelector())
+
+    correct = 0
+    with count_llm_calls() as llm_calls:
+        for question, expected in ROUTING_CASES:
+            result = selector.select(TOOLS, question)
+            correct += TOOLS[result.ind].name == expected
+
+    assert correct / len(ROUTING_CASES) >= 0.9
+    assert llm_calls.count == 0
+
+
+def test_small_margin_falls_back_to_llm_selector():
+    fallback = RecordingSelector()
+    selector = EmbeddingRouterSelector.from_defaults(fallback_selector=fallback, margin_threshold=1.0)
+
+    result = selector.select(TOOLS, "Can my fund borrow?")
+    assert result.reason == "llm"
+    assert fallback.calls == 1
+    assert selector.fallback_selections == 1
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_is_computed_once_and_kept_on_bundle():
+    embed_model = Settings.embed_model
+    selector = EmbeddingRouterSelector.from_defaults()
+    await selector.aselect(TOOLS, "warm up the tool vectors")
+
+    before = embed_model.calls
+    bundle = QueryBundle(query_str="What is the in-house asset limit?")
+    await selector.aselect(TOOLS, bundle)
+
+    assert embed_model.calls == before + 1
+    assert bundle.embedding is not None
+
+
+@pytest.mark.asyncio
+async def test_engine_in_embedding_mode_only_calls_llm_for_synthesis(monkeypatch):
+    monkeypatch.setattr(settings, "ROUTER_MODE", "embedding")
+    index = VectorStoreIndex.from_documents(build_corpus(fund_ids=["fund_1"]))
+    engine = get_smsf_query_engine(fund_id="fund_1", vector_index=index)
+
+    with count_llm_calls() as llm_calls:
+        response = await engine.aquery("Does the deed allow my fund to buy business real property?")
+
+    assert selected_tool_name(engine, response) == "private_deed"
+    assert llm_calls.count == 1
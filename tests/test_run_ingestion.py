@@ -0,0 +1,69 @@
+
+# uv run pytest tests/test_run_ingestion.py
+
+import shutil
+
+import pytest
+from llama_index.core import StorageContext
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.core.docstore import SQLiteDocumentStore
+from app.ingestion.ato_ruling import aindex_ato_ruling, parse_ato_ruling
+from app.ingestion.embedding_scheduler import EmbeddingScheduler
+from app.ingestion.run_ingestion import IngestionOrchestrator
+from benchmarks.corpus import write_text_fixture
+from benchmarks.stubs import LatencyEmbedding, serialize_adds
+
+
+async def _no_sleep(_):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_tasks_run_in_parallel_with_retries_and_a_summary(tmp_path):
+    source = tmp_path / "spaces"
+    source.mkdir()
+    for name in ("TR_2021_3.txt", "TR_2023_4.txt"):
+        write_text_fixture(str(source / name), n_pages=3)
+
+    flaky = {"rulings/TR_2021_3.txt": 1}
+
+    def download(remote_key, local_path):
+        if flaky.get(remote_key):
+            flaky[remote_key] -= 1
+            raise ConnectionError("connection reset")
+        shutil.copy(source / remote_key.split("/")[-1], local_path)
+
+    client = QdrantClient(":memory:")
+    storage_calls = []
+
+    def storage_factory(collection, persist_dir):
+        storage_calls.append(collection)
+        vector_store = serialize_adds(QdrantVectorStore(collection_name=collection, client=client))
+        docstore = SQLiteDocumentStore.from_persist_dir(persist_dir)
+        return StorageContext.from_defaults(vector_store=vector_store, docstore=docstore), vector_store
+
+    orchestrator = IngestionOrchestrator(
+        download=download,
+        storage_factory=storage_factory,
+        scheduler=EmbeddingScheduler(embed_model=LatencyEmbedding(embed_dim=8), tokenizer=str.split),
+        parse_workers=1,
+        work_dir=str(tmp_path / "work"),
+        categories={"ruling": (parse_ato_ruling, aindex_ato_ruling, "rulings_test", str(tmp_path / "rulings"))},
+        sleep=_no_sleep,
+    )
+
+    reports = await orchestrator.run([
+        ("ruling", "rulings/TR_2021_3.txt", "TR 2021/3"),
+        ("ruling", "rulings/TR_2023_4.txt", "TR 2023/4"),
+        ("ruling", "rulings/missing.txt", "TR 1999/1"),
+    ])
+
+    assert [r["status"] for r in reports] == ["ok", "ok", "failed"]
+    assert reports[0]["retries"] == 1
+    assert reports[2]["stage"] == "download" and reports[2]["retries"] == 3
+    assert client.count("rulings_test").count == reports[0]["leaves"] + reports[1]["leaves"] > 0
+    # One docstore/vector store per collection, shared by both tasks
+    assert storage_calls == ["rulings_test"]
+    assert not list((tmp_path / "work").iterdir())
@@ -0,0 +1,43 @@
+# uv run pytest tests/test_startup.py
+
+import asyncio
+import gc
+import time
+
+import pytest
+
+from benchmarks.bench_startup import check_budget, measure_once
+
+
+def test_cold_start_defers_heavy_modules_to_first_use():
+    result = measure_once()
+    assert result["eager_modules"] == []
+    assert 0 < result["import_s"] <= result["ready_s"]
+    assert check_budget(result, import_s=60, ready_s=60, rss_mb=4096) == []
+    assert check_budget(dict(result, eager_modules=["boto3"]), 60, 60, 4096) == ["imported at startup: boto3"]
+
+
+@pytest.mark.asyncio
+async def test_failed_model_setup_does_not_leave_collection_checks_behind(monkeypatch):
+    import main
+    from app.core.qdrant import collection_bootstrap
+
+    def fail():
+        raise RuntimeError("no OpenAI client")
+
+    def slow_check(collection_name):
+        time.sleep(0.05)
+        raise ValueError(f"{collection_name} unreachable")
+
+    unretrieved = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+    monkeypatch.setattr(main, "configure_models", fail)
+    monkeypatch.setattr(collection_bootstrap, "ensure", slow_check)
+
+    with pytest.raises(RuntimeError):
+        async with main.app.router.lifespan_context(main.app):
+            pass
+    await asyncio.sleep(0.1)
+    gc.collect()
+
+    assert unretrieved == []
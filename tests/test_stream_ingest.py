@@ -0,0 +1,59 @@
+
+# uv run pytest tests/test_stream_ingest.py
+
+import pytest
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from app.ingestion.embedding_scheduler import EmbeddingScheduler
+from app.ingestion.streaming import PDF, TEXT, UnsupportedFileType, astream_to_index, detect_file_type, spool_stream
+from benchmarks.corpus import write_pdf_fixture, write_text_fixture
+from benchmarks.stubs import FileStreamingBody, LatencyEmbedding, serialize_adds
+
+METADATA = {"file_name": "sis.pdf", "fund_id": "global", "doc_type": "legislation"}
+
+
+def _scheduler():
+    return EmbeddingScheduler(embed_model=LatencyEmbedding(embed_dim=8), tokenizer=str.split)
+
+
+def test_detects_pdf_text_and_rejects_binary():
+    assert detect_file_type(b"%PDF-1.7\n...") == PDF
+    # A prefix cut inside a multi-byte character is still text
+    assert detect_file_type("Section 67A — borrowing".encode("utf-8")[:-2]) == TEXT
+    with pytest.raises(UnsupportedFileType):
+        detect_file_type(b"PK\x03\x04\x14\x00\x06\x00")
+
+
+def test_spool_rolls_over_to_disk_in_chunks(tmp_path):
+    path = tmp_path / "sis.txt"
+    write_text_fixture(str(path), n_pages=20)
+
+    spool, n_bytes = spool_stream(FileStreamingBody(str(path)), chunk_size=4096, max_memory=16 * 1024)
+
+    assert n_bytes == path.stat().st_size
+    assert spool._rolled  # past max_memory the data lives in a temp file
+    assert spool.read() == path.read_bytes()
+    spool.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write_fixture, file_type", [(write_pdf_fixture, PDF), (write_text_fixture, TEXT)])
+async def test_streams_pages_into_qdrant(tmp_path, write_fixture, file_type):
+    path = tmp_path / "sis"
+    write_fixture(str(path), n_pages=12)
+    client = QdrantClient(":memory:")
+    vector_store = serialize_adds(QdrantVectorStore(collection_name="stream_test", client=client))
+
+    stats = await astream_to_index(FileStreamingBody(str(path)), vector_store, METADATA,
+                                   doc_id_prefix="sis.pdf", scheduler=_scheduler())
+
+    assert stats["file_type"] == file_type
+    assert stats["bytes"] == path.stat().st_size
+    assert client.count("stream_test").count == stats["nodes"] > 0
+    assert 0 <= stats["peak_rss_growth_mb"] <= stats["process_peak_rss_mb"]
+    points, _ = client.scroll("stream_test", limit=1000)
+    assert {p.payload["fund_id"] for p in points} == {"global"}
+    if file_type == PDF:
+        assert stats["pages"] == 12
+        assert {p.payload["page_label"] for p in points} == {str(n) for n in range(1, 13)}